@@ -8,6 +8,7 @@ import asyncio
 import json
 import logging
 import os
+import socket
 import time
 import uuid
 from datetime import datetime, timedelta
@@ -15,8 +16,9 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field, validator
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -29,6 +31,13 @@ import sys
 sys.path.append('/home/joel/ai-content-pipeline')
 
 from pipeline_single_session import SingleSessionPipelineOrchestrator
+from pipeline_core.http_clients import http_clients
+from pipeline_core.job_store import create_job_store
+from pipeline_core.job_queue import JobQueue, QueueFullError
+from pipeline_core.checkpoints import CheckpointStore
+from pipeline_core.retry import retry_budget, retry_metrics
+from pipeline_core.text_streams import text_streams
+from pipeline_core.tracing import Trace
 
 # Configure logging
 logging.basicConfig(
@@ -44,13 +53,31 @@ logger = logging.getLogger(__name__)
 # Rate limiting setup
 limiter = Limiter(key_func=get_remote_address)
 
-# Global job storage and API keys
-job_storage: Dict[str, Dict] = {}
+# Job storage (SQLite by default, shared across workers) and API keys
+job_store = create_job_store()
+checkpoint_store = CheckpointStore()
 api_keys: Dict[str, Dict] = {
-    "demo-key-001": {"name": "Demo User", "requests_used": 0, "max_requests": 10},
-    "prod-key-001": {"name": "Production User", "requests_used": 0, "max_requests": 100}
+    "demo-key-001": {"name": "Demo User", "requests_used": 0, "max_requests": 10, "priority": 10},
+    "prod-key-001": {"name": "Production User", "requests_used": 0, "max_requests": 100, "priority": 0}
 }
 
+# Default queue priority for keys without one (lower runs sooner)
+DEFAULT_JOB_PRIORITY = 10
+
+# Server-side poll interval and keep-alive period for /status/{job_id}/stream
+STATUS_STREAM_INTERVAL = float(os.getenv("STATUS_STREAM_INTERVAL", "0.5"))
+STATUS_STREAM_KEEPALIVE = float(os.getenv("STATUS_STREAM_KEEPALIVE", "15"))
+
+# How often a running job's agent output is copied to the job store, so /results/{job_id}/stream
+# can be served by any worker; 0 disables the copy (single-worker deployments)
+TEXT_STREAM_STORE_INTERVAL = float(os.getenv("TEXT_STREAM_STORE_INTERVAL", "1.0"))
+
+# This worker's identity on the jobs it owns, how often it refreshes their heartbeat,
+# and how old a heartbeat may get before another worker treats the job as orphaned
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "90"))
+
 # Results directory
 RESULTS_DIR = Path("/home/joel/ai-content-pipeline/api/results")
 RESULTS_DIR.mkdir(exist_ok=True)
@@ -67,6 +94,7 @@ class ContentRequest(BaseModel):
     include_citations: bool = Field(default=False, description="Include automatic citations and bibliography (requires research)")
     include_fact_check: bool = Field(default=False, description="Include fact-checking verification against research data (requires research)")
     generate_images: bool = Field(default=False, description="Generate AI images using DALL-E 3 (requires OpenAI API key)")
+    parallel_sections: Optional[bool] = Field(default=None, description="Draft the outline's sections concurrently (defaults to CONTENT_SECTION_PARALLEL)")
     format: str = Field(default="wordpress", pattern="^(wordpress|markdown|json)$", description="Output format")
     
     @validator('topic')
@@ -97,6 +125,8 @@ class JobStatus(BaseModel):
     updated_at: datetime
     estimated_completion: Optional[datetime]
     error_message: Optional[str]
+    stage_timings: Optional[Dict[str, float]] = None
+    running_stages: Optional[List[str]] = None
 
 class ContentResult(BaseModel):
     job_id: str
@@ -114,6 +144,8 @@ class ContentResult(BaseModel):
     processing_time: float
     created_at: datetime
     completed_at: Optional[datetime]
+    token_accounting: Optional[Dict[str, Any]] = None
+    trace: Optional[Dict[str, Any]] = None
 
 class HealthResponse(BaseModel):
     status: str
@@ -121,6 +153,7 @@ class HealthResponse(BaseModel):
     uptime: float
     active_jobs: int
     total_jobs_processed: int
+    retries: Dict[str, Dict[str, Any]] = {}
 
 # ========================
 # Authentication
@@ -160,19 +193,17 @@ async def cleanup_old_results():
     """Clean up results older than 24 hours"""
     try:
         cutoff_time = datetime.now() - timedelta(hours=24)
-        cleaned_count = 0
-        
-        for job_id, job_info in list(job_storage.items()):
-            if job_info.get("created_at") and job_info["created_at"] < cutoff_time:
-                # Remove from storage
-                del job_storage[job_id]
-                
-                # Remove result files
-                result_file = RESULTS_DIR / f"{job_id}.json"
-                if result_file.exists():
-                    result_file.unlink()
-                
-                cleaned_count += 1
+        
+        # Indexed range delete on created_at
+        expired_job_ids = await job_store.adelete_older_than(cutoff_time)
+        cleaned_count = len(expired_job_ids)
+        
+        for job_id in expired_job_ids:
+            # Remove result files and stage checkpoints
+            result_file = RESULTS_DIR / f"{job_id}.json"
+            if result_file.exists():
+                result_file.unlink()
+            checkpoint_store.clear(job_id)
         
         if cleaned_count > 0:
             logger.info(f"Cleaned up {cleaned_count} old job results")
@@ -180,6 +211,51 @@ async def cleanup_old_results():
     except Exception as e:
         logger.error(f"Error cleaning up old results: {e}")
 
+def is_orphaned(job_id: str, job_info: Dict[str, Any]) -> bool:
+    """Whether a queued/processing job has no live worker holding it"""
+    if job_info["status"] not in ("queued", "processing"):
+        return False
+    if job_id in job_queue.job_ids():
+        return False
+    # Jobs from before heartbeats were recorded fall back to their last update
+    last_seen = job_info.get("heartbeat_at") or job_info["updated_at"]
+    return (datetime.now() - last_seen).total_seconds() > JOB_STALE_SECONDS
+
+async def mark_interrupted(job_ids: List[str], reason: str):
+    """Fail jobs that will not finish, so they end for pollers and can be resumed"""
+    for job_id in job_ids:
+        await job_store.aupdate(job_id, {
+            "status": "failed",
+            "current_stage": "interrupted",
+            "running_stages": [],
+            "updated_at": datetime.now(),
+            "error_message": f"{reason}; resume with POST /jobs/{job_id}/resume"
+        })
+        text_streams.close(job_id, "failed")
+    if job_ids:
+        logger.warning(f"Marked {len(job_ids)} job(s) interrupted: {reason}")
+
+async def reconcile_orphaned_jobs():
+    """Fail queued/processing jobs whose worker stopped (crash, restart or shutdown)"""
+    try:
+        orphaned = []
+        for status in ("queued", "processing"):
+            for job_info in await job_store.alist_jobs(status=status):
+                if is_orphaned(job_info["job_id"], job_info):
+                    orphaned.append(job_info["job_id"])
+        await mark_interrupted(orphaned, "Interrupted: the worker running this job stopped")
+    except Exception as e:
+        logger.error(f"Error reconciling orphaned jobs: {e}")
+
+async def heartbeat_jobs():
+    """Refresh the heartbeat of every job this worker holds"""
+    now = datetime.now()
+    for job_id in job_queue.job_ids():
+        try:
+            await job_store.aupdate(job_id, {"owner": WORKER_ID, "heartbeat_at": now})
+        except Exception as e:
+            logger.error(f"Error updating heartbeat for job {job_id}: {e}")
+
 async def reset_rate_limits():
     """Reset rate limits every hour"""
     try:
@@ -189,40 +265,148 @@ async def reset_rate_limits():
     except Exception as e:
         logger.error(f"Error resetting rate limits: {e}")
 
-async def run_content_pipeline(job_id: str, request: ContentRequest):
-    """Background task to run the content pipeline"""
+class JobProgressTracker:
+    """Writes stage/progress transitions and per-stage timings to the job store"""
+    
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.stage_timings: Dict[str, float] = {}
+        self.stage_history: List[Dict[str, Any]] = []
+        self._open_stages: Dict[str, float] = {}
+        self._write_lock = asyncio.Lock()
+        self.status = "queued"
+    
+    async def advance(self, progress: int, current_stage: str, concurrent: bool = False, **fields):
+        """Enter a stage; sequential stages close whichever stages are still open"""
+        now = time.time()
+        if not concurrent:
+            self._close_open_stages(now)
+        self._open_stages[current_stage] = now
+        # Concurrent stages are reported together rather than as whichever started last
+        await self._record(progress, self._stage_label(current_stage), fields)
+    
+    async def finish_stage(self, current_stage: str):
+        """Close a concurrently running stage and record its duration"""
+        started_at = self._open_stages.pop(current_stage, None)
+        if started_at is not None:
+            self.stage_timings[current_stage] = round(time.time() - started_at, 2)
+            fields = {"current_stage": ", ".join(self._open_stages)} if self._open_stages else {}
+            await self._write(**fields)
+    
+    def _stage_label(self, current_stage: str) -> str:
+        return ", ".join(self._open_stages) if len(self._open_stages) > 1 else current_stage
+    
+    async def finish(self, progress: int, current_stage: str, **fields):
+        """Close all stages and write the terminal state"""
+        self._close_open_stages(time.time())
+        await self._record(progress, current_stage, fields)
+    
+    async def _record(self, progress: int, current_stage: str, fields: Dict[str, Any]):
+        self.status = fields.get("status", self.status)
+        self.stage_history.append({
+            "stage": current_stage,
+            "progress": progress,
+            "status": self.status,
+            "at": time.time()
+        })
+        await self._write(progress=progress, current_stage=current_stage, **fields)
+    
+    def _close_open_stages(self, now: float):
+        for stage, started_at in self._open_stages.items():
+            self.stage_timings[stage] = round(now - started_at, 2)
+        self._open_stages.clear()
+    
+    async def _write(self, **fields):
+        # Writes run in threads; serialize them so an older snapshot never lands last
+        async with self._write_lock:
+            await job_store.aupdate(self.job_id, {
+                **fields,
+                "updated_at": datetime.now(),
+                "stage_timings": dict(self.stage_timings),
+                "stage_history": list(self.stage_history),
+                "running_stages": list(self._open_stages)
+            })
+
+class LiveOutputWriter:
+    """Copies a job's agent output to the job store at most every TEXT_STREAM_STORE_INTERVAL seconds"""
+    
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.enabled = TEXT_STREAM_STORE_INTERVAL > 0
+        self._segments: List[Dict[str, Any]] = []
+        self._sections: Dict[Any, Dict[str, Any]] = {}
+        self._dirty = False
+        self._last_write = 0.0
+        self._write_lock = asyncio.Lock()
+    
+    async def add(self, agent: str, text: str, section: Optional[str] = None):
+        """Record a text delta; consecutive deltas of one agent, or all deltas of one section, form one segment"""
+        if not self.enabled:
+            return
+        segment = self._segments[-1] if self._segments else None
+        if section is not None:
+            # Sections are drafted concurrently, so their deltas interleave
+            segment = self._sections.get((agent, section))
+        if segment is None or segment["agent"] != agent or segment["section"] != section:
+            segment = {"agent": agent, "section": section, "parts": []}
+            self._segments.append(segment)
+            if section is not None:
+                self._sections[(agent, section)] = segment
+        segment["parts"].append(text)
+        self._dirty = True
+        if time.time() - self._last_write >= TEXT_STREAM_STORE_INTERVAL:
+            await self.flush()
+    
+    async def flush(self):
+        """Write the output recorded so far, if anything changed since the last write"""
+        async with self._write_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._last_write = time.time()
+            segments = [
+                {"agent": segment["agent"], "section": segment["section"], "text": "".join(segment["parts"])}
+                for segment in self._segments
+            ]
+            try:
+                await job_store.aupdate(self.job_id, {"live_output": segments})
+            except Exception as e:
+                logger.error(f"Error storing live output for job {self.job_id}: {e}")
+
+async def run_content_pipeline(job_id: str, request: ContentRequest, resume: bool = False, trace: Optional[Trace] = None):
+    """Background task to run the content pipeline (resume reuses checkpointed stages)"""
     start_time = time.time()
+    tracker = JobProgressTracker(job_id)
+    live_output = LiveOutputWriter(job_id)
     
     try:
         logger.info(f"Starting pipeline for job {job_id}: {request.topic}")
         
         # Update job status
-        job_storage[job_id].update({
-            "status": "processing",
-            "progress": 10,
-            "current_stage": "initializing",
-            "updated_at": datetime.now()
-        })
+        await tracker.advance(10, "initializing", status="processing")
         
         # Initialize orchestrator
-        orchestrator = SingleSessionPipelineOrchestrator()
+        orchestrator = SingleSessionPipelineOrchestrator(
+            job_id=job_id, resume=resume, checkpoints=checkpoint_store, section_parallel=request.parallel_sections,
+            trace=trace
+        )
+        
+        # Forward agent output to /results/{job_id}/stream subscribers as it is generated;
+        # the job store copy serves subscribers connected to other workers
+        async def publish_delta(agent_name: str, delta: str, section: Optional[str] = None):
+            text_streams.publish(job_id, agent_name, delta, section)
+            await live_output.add(agent_name, delta, section)
+        
+        orchestrator.on_text_delta = publish_delta
         
         # Initialize session
-        job_storage[job_id].update({
-            "progress": 20,
-            "current_stage": "session_initialization",
-            "updated_at": datetime.now()
-        })
+        await tracker.advance(20, "session_initialization")
         
         if not await orchestrator.initialize_session():
             raise Exception("Failed to initialize pipeline session")
         
         # Stage 1: Outline
-        job_storage[job_id].update({
-            "progress": 30,
-            "current_stage": "generating_outline",
-            "updated_at": datetime.now()
-        })
+        await tracker.advance(30, "generating_outline")
         
         outline_prompt = f"""Create a comprehensive SEO-optimized outline for an article about "{request.topic}".
         
@@ -239,25 +423,17 @@ Please provide:
 
 Make this outline extremely detailed and actionable for content creation."""
 
-        outline_result = await orchestrator.run_agent_in_session('outline_generator', outline_prompt)
+        outline_result = await orchestrator.run_agent_stage('outline', 'outline_generator', outline_prompt)
         
         # Stage 1.5: Research (optional)
         research_data = None
         if request.include_research:
-            job_storage[job_id].update({
-                "progress": 40,
-                "current_stage": "conducting_research",
-                "updated_at": datetime.now()
-            })
+            await tracker.advance(40, "conducting_research")
             
-            research_data = await orchestrator.run_research_stage(outline_result)
+            research_data = await orchestrator.run_research_stage(outline_result, request.topic)
             
         # Stage 2: Content
-        job_storage[job_id].update({
-            "progress": 50,
-            "current_stage": "creating_content", 
-            "updated_at": datetime.now()
-        })
+        await tracker.advance(50, "creating_content")
         
         # Build content prompt with optional research data
         if request.include_research and research_data and research_data['metadata'].get('successful_queries', 0) > 0:
@@ -293,66 +469,51 @@ Requirements:
 
 Please provide the complete article content now."""
 
-        content_result = await orchestrator.run_agent_in_session('research_content_creator', content_prompt)
+        content_result = await orchestrator.run_content_stage(
+            request.topic, content_prompt, outline_result, research_data, research_context
+        )
         
-        # Stage 2.5: Citations (optional)
-        citation_result = None
-        final_content = content_result  # Default to original content
+        # Stages 2.5-2.7: Citations, images and fact-checking (optional, run concurrently)
+        has_research = bool(request.include_research and research_data and research_data['metadata'].get('successful_queries', 0) > 0)
         
-        if request.include_citations:
-            if not request.include_research or not research_data or research_data['metadata'].get('successful_queries', 0) == 0:
-                logger.warning(f"Citations requested for job {job_id} but no research data available")
-            else:
-                job_storage[job_id].update({
-                    "progress": 60,
-                    "current_stage": "adding_citations",
-                    "updated_at": datetime.now()
-                })
-                
-                citation_result = await orchestrator.run_citation_stage(content_result, research_data)
-                
-                if citation_result['citation_count'] > 0:
-                    final_content = citation_result['cited_content']
-        
-        # Stage 2.6: Image Generation (optional)
-        image_result = None
-        
-        if request.generate_images:
-            job_storage[job_id].update({
-                "progress": 60,
-                "current_stage": "generating_images",
-                "updated_at": datetime.now()
-            })
-            
-            # Use cited content if available, otherwise original content
-            content_for_images = final_content if citation_result else content_result
-            
-            image_result = await orchestrator.run_image_generation_stage(content_for_images, outline_result, job_id)
-        
-        # Stage 2.7: Fact-Checking (optional)
-        fact_check_result = None
-        
-        if request.include_fact_check:
-            if not request.include_research or not research_data or research_data['metadata'].get('successful_queries', 0) == 0:
-                logger.warning(f"Fact-checking requested for job {job_id} but no research data available")
-            else:
-                job_storage[job_id].update({
-                    "progress": 65,
-                    "current_stage": "fact_checking",
-                    "updated_at": datetime.now()
-                })
-                
-                # Use final content (with citations if available)
-                content_for_fact_check = final_content if citation_result else content_result
-                
-                fact_check_result = await orchestrator.run_fact_check_stage(content_for_fact_check, research_data)
+        if request.include_citations and not has_research:
+            logger.warning(f"Citations requested for job {job_id} but no research data available")
+        if request.include_fact_check and not has_research:
+            logger.warning(f"Fact-checking requested for job {job_id} but no research data available")
+        
+        stage_progress = {
+            "citations": (60, "adding_citations"),
+            "images": (60, "generating_images"),
+            "fact_check": (65, "fact_checking")
+        }
+        
+        async def on_stage_start(stage_name: str):
+            progress, current_stage = stage_progress[stage_name]
+            await tracker.advance(progress, current_stage, concurrent=True)
+        
+        async def on_stage_complete(stage_name: str):
+            await tracker.finish_stage(stage_progress[stage_name][1])
+        
+        # Close "creating_content" before the concurrent stages start
+        await tracker.finish_stage("creating_content")
+        
+        enrichment = await orchestrator.run_enrichment_stages(
+            content_result,
+            outline_result,
+            research_data,
+            include_citations=request.include_citations and has_research,
+            generate_images=request.generate_images,
+            include_fact_check=request.include_fact_check and has_research,
+            job_id=job_id,
+            on_stage_start=on_stage_start,
+            on_stage_complete=on_stage_complete
+        )
+        citation_result = enrichment['citations']
+        image_result = enrichment['images']
+        fact_check_result = enrichment['fact_check']
         
         # Stage 3: SEO
-        job_storage[job_id].update({
-            "progress": 70,
-            "current_stage": "seo_optimization",
-            "updated_at": datetime.now()
-        })
+        await tracker.advance(70, "seo_optimization")
         
         # Build SEO prompt considering citations, images, and fact-checking
         content_reference = "the article content you just wrote"
@@ -401,14 +562,13 @@ Target keywords: {', '.join(request.keywords) if request.keywords else 'N/A'}
 
 Please analyze the content from our conversation and provide detailed SEO recommendations."""
 
-        seo_result = await orchestrator.run_agent_in_session('seo_optimizer', seo_prompt)
+        seo_result = await orchestrator.run_agent_stage(
+            'seo', 'seo_optimizer', seo_prompt,
+            {'content': content_result, 'citations': citation_result}
+        )
         
         # Stage 4: Publishing
-        job_storage[job_id].update({
-            "progress": 90,
-            "current_stage": "creating_publication_package",
-            "updated_at": datetime.now()
-        })
+        await tracker.advance(90, "creating_publication_package")
         
         publish_prompt = f"""Please create a complete {request.format} publication package using the article content and SEO recommendations from our conversation.
 
@@ -423,7 +583,10 @@ Requirements:
 
 Please create a comprehensive publication package ready for {request.format}."""
 
-        publish_result = await orchestrator.run_agent_in_session('publishing_coordinator', publish_prompt)
+        publish_result = await orchestrator.run_agent_stage(
+            'publish', 'publishing_coordinator', publish_prompt,
+            {'seo': seo_result}
+        )
         
         # Calculate metrics
         total_chars = len(outline_result) + len(content_result) + len(seo_result) + len(publish_result)
@@ -452,8 +615,10 @@ Please create a comprehensive publication package ready for {request.format}."""
             total_chars=total_chars,
             quality_score=quality_score,
             processing_time=processing_time,
-            created_at=job_storage[job_id]["created_at"],
-            completed_at=datetime.now()
+            created_at=(await job_store.aget(job_id))["created_at"],
+            completed_at=datetime.now(),
+            token_accounting=orchestrator.token_accounting,
+            trace=orchestrator.trace.summary()
         )
         
         # Save result to file
@@ -461,29 +626,43 @@ Please create a comprehensive publication package ready for {request.format}."""
         with open(result_file, 'w', encoding='utf-8') as f:
             json.dump(result.dict(), f, indent=2, default=str)
         
-        # Update job storage
-        job_storage[job_id].update({
-            "status": "completed",
-            "progress": 100,
-            "current_stage": "completed",
-            "updated_at": datetime.now(),
-            "total_chars": total_chars,
-            "quality_score": quality_score,
-            "processing_time": processing_time
-        })
+        # Update job storage; the full output is stored before the job reads as completed
+        await live_output.flush()
+        await tracker.finish(
+            100,
+            "completed",
+            status="completed",
+            total_chars=total_chars,
+            quality_score=quality_score,
+            processing_time=processing_time
+        )
+        text_streams.close(job_id, "completed")
         
         logger.info(f"Pipeline completed for job {job_id}: {total_chars} chars, {quality_score}% quality")
         
     except Exception as e:
         logger.error(f"Pipeline failed for job {job_id}: {e}")
         
-        job_storage[job_id].update({
-            "status": "failed",
-            "progress": 0,
-            "current_stage": "failed",
-            "updated_at": datetime.now(),
-            "error_message": str(e)
-        })
+        await live_output.flush()
+        await tracker.finish(0, "failed", status="failed", error_message=str(e))
+        text_streams.close(job_id, "failed")
+
+async def run_queued_job(job_id: str, payload: Dict[str, Any]):
+    """Job queue handler: run a new or resumed pipeline job"""
+    trace = Trace(job_id)
+    try:
+        with trace.activate("pipeline", topic=payload["request"].topic), retry_budget():
+            await run_content_pipeline(job_id, payload["request"], resume=payload.get("resume", False), trace=trace)
+    finally:
+        trace.export()
+
+# Bounded worker pool; started in the application lifespan
+job_queue = JobQueue(run_queued_job)
+
+def format_estimate(seconds: float) -> str:
+    """Human-readable admission estimate for ContentResponse.estimated_time"""
+    minutes = max(1, round(seconds / 60))
+    return f"~{minutes} minute{'s' if minutes != 1 else ''}"
 
 # ========================
 # Application Lifespan
@@ -494,15 +673,28 @@ async def lifespan(app: FastAPI):
     """Application lifespan management"""
     logger.info("Starting AI Content Pipeline API")
     
-    # Start background tasks
+    # Jobs left queued/processing by a stopped worker become failed (and resumable)
+    await reconcile_orphaned_jobs()
+    
+    # Start pipeline workers and background tasks
+    job_queue.start()
     cleanup_task = asyncio.create_task(periodic_cleanup())
     rate_limit_task = asyncio.create_task(periodic_rate_limit_reset())
+    heartbeat_task = asyncio.create_task(periodic_heartbeat())
     
     yield
     
     # Cleanup
     cleanup_task.cancel()
     rate_limit_task.cancel()
+    heartbeat_task.cancel()
+    unfinished = await job_queue.stop()
+    await mark_interrupted(unfinished, "Interrupted by API shutdown")
+    await http_clients.aclose()
+    # The image agent is imported on first use; stop its variant workers if it was
+    image_module = sys.modules.get("image_agent.agent")
+    if image_module is not None:
+        image_module.image_agent.variant_processor.shutdown()
     logger.info("Shutting down AI Content Pipeline API")
 
 async def periodic_cleanup():
@@ -511,6 +703,13 @@ async def periodic_cleanup():
         await asyncio.sleep(3600)  # 1 hour
         await cleanup_old_results()
 
+async def periodic_heartbeat():
+    """Keep this worker's jobs alive in the store and fail jobs of workers that stopped"""
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        await heartbeat_jobs()
+        await reconcile_orphaned_jobs()
+
 async def periodic_rate_limit_reset():
     """Reset rate limits every hour"""
     while True:
@@ -556,8 +755,9 @@ async def health_check():
         status="healthy",
         version="1.0.0",
         uptime=time.time() - app_start_time,
-        active_jobs=len([j for j in job_storage.values() if j.get("status") in ["queued", "processing"]]),
-        total_jobs_processed=total_jobs_processed
+        active_jobs=await job_store.acount(["queued", "processing"]),
+        total_jobs_processed=total_jobs_processed,
+        retries=retry_metrics.snapshot()
     )
 
 @app.post("/generate-content", response_model=ContentResponse)
@@ -565,7 +765,6 @@ async def health_check():
 async def generate_content(
     request: Request,
     content_request: ContentRequest,
-    background_tasks: BackgroundTasks,
     api_key_info: dict = Depends(verify_api_key)
 ):
     """Generate content using the AI pipeline"""
@@ -574,34 +773,53 @@ async def generate_content(
     try:
         # Create job ID
         job_id = str(uuid.uuid4())
+        created_at = datetime.now()
+        
+        priority = api_key_info.get("priority", DEFAULT_JOB_PRIORITY)
         
-        # Initialize job storage
-        job_storage[job_id] = {
+        # Reject with 503 when full, before anything is stored
+        job_queue.check_capacity()
+        
+        # The job record must exist before a worker can pick the job up
+        await job_store.acreate(job_id, {
             "status": "queued",
             "progress": 0,
             "current_stage": "queued",
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
-            "estimated_completion": datetime.now() + timedelta(minutes=5),
+            "created_at": created_at,
+            "updated_at": created_at,
+            "estimated_completion": created_at + timedelta(seconds=job_queue.estimate_completion(priority)),
             "request": content_request.dict(),
-            "api_key_user": api_key_info["name"]
-        }
+            "api_key_user": api_key_info["name"],
+            "owner": WORKER_ID,
+            "heartbeat_at": created_at
+        })
         
-        # Start background task
-        background_tasks.add_task(run_content_pipeline, job_id, content_request)
+        try:
+            estimated_seconds = job_queue.submit(job_id, {"request": content_request}, priority=priority)
+        except QueueFullError as e:
+            # Filled up by another request while the record was written
+            await job_store.aupdate(job_id, {"status": "failed", "current_stage": "rejected", "error_message": str(e)})
+            raise
         
         total_jobs_processed += 1
         
-        logger.info(f"Content generation started for job {job_id} by {api_key_info['name']}")
+        logger.info(f"Content generation queued for job {job_id} by {api_key_info['name']} (queue depth {job_queue.depth})")
         
         return ContentResponse(
             job_id=job_id,
             status="queued",
-            message="Content generation started. Use /status/{job_id} to check progress.",
-            estimated_time="2-5 minutes",
-            created_at=job_storage[job_id]["created_at"]
+            message="Content generation queued. Use /status/{job_id} to check progress.",
+            estimated_time=format_estimate(estimated_seconds),
+            created_at=created_at
         )
         
+    except QueueFullError as e:
+        logger.warning(f"Rejected content generation for {api_key_info['name']}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error starting content generation: {e}")
         raise HTTPException(status_code=500, detail="Failed to start content generation")
@@ -609,11 +827,10 @@ async def generate_content(
 @app.get("/status/{job_id}", response_model=JobStatus)
 async def get_job_status(job_id: str, api_key_info: dict = Depends(verify_api_key)):
     """Get job status"""
-    if job_id not in job_storage:
+    job_info = await job_store.aget(job_id)
+    if job_info is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job_info = job_storage[job_id]
-    
     return JobStatus(
         job_id=job_id,
         status=job_info["status"],
@@ -622,17 +839,168 @@ async def get_job_status(job_id: str, api_key_info: dict = Depends(verify_api_ke
         created_at=job_info["created_at"],
         updated_at=job_info["updated_at"],
         estimated_completion=job_info.get("estimated_completion"),
-        error_message=job_info.get("error_message")
+        error_message=job_info.get("error_message"),
+        stage_timings=job_info.get("stage_timings"),
+        running_stages=job_info.get("running_stages")
+    )
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def job_event_stream(job_id: str, request: Request):
+    """Yield SSE messages for each stage transition until the job finishes"""
+    sent_transitions = 0
+    sent_queued = False
+    last_message_at = time.time()
+    
+    while not await request.is_disconnected():
+        # The job store is shared, so this works whichever worker runs the job
+        job_info = await job_store.aget(job_id)
+        if job_info is None:
+            yield format_sse("error", {"job_id": job_id, "detail": "Job not found"})
+            return
+        
+        # Replay every transition recorded since the last poll, not just the latest
+        history = job_info.get("stage_history") or []
+        if len(history) < sent_transitions:
+            # The job was resumed and its history restarted
+            sent_transitions = 0
+        pending = history[sent_transitions:]
+        if not history and not sent_queued:
+            # Job still waiting for a worker: report its queued state once
+            pending = [{"stage": job_info.get("current_stage"), "progress": job_info["progress"], "status": job_info["status"]}]
+            sent_queued = True
+        for transition in pending:
+            yield format_sse("progress", {
+                "job_id": job_id,
+                "status": transition["status"],
+                "progress": transition["progress"],
+                "current_stage": transition["stage"],
+                "running_stages": job_info.get("running_stages") or [],
+                "stage_timings": job_info.get("stage_timings") or {}
+            })
+            last_message_at = time.time()
+        sent_transitions = len(history)
+        
+        if job_info["status"] in ("completed", "failed"):
+            yield format_sse(job_info["status"], {
+                "job_id": job_id,
+                "status": job_info["status"],
+                "progress": job_info["progress"],
+                "stage_timings": job_info.get("stage_timings") or {},
+                "total_chars": job_info.get("total_chars"),
+                "quality_score": job_info.get("quality_score"),
+                "processing_time": job_info.get("processing_time"),
+                "error_message": job_info.get("error_message")
+            })
+            return
+        
+        # Comment lines keep proxies from closing an idle stream
+        if time.time() - last_message_at >= STATUS_STREAM_KEEPALIVE:
+            yield ": keep-alive\n\n"
+            last_message_at = time.time()
+        
+        await asyncio.sleep(STATUS_STREAM_INTERVAL)
+
+@app.get("/status/{job_id}/stream")
+async def stream_job_status(job_id: str, request: Request, api_key_info: dict = Depends(verify_api_key)):
+    """Stream job progress as Server-Sent Events (authenticated once per stream)"""
+    if await job_store.aget(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return StreamingResponse(
+        job_event_stream(job_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def job_output_stream(job_id: str, request: Request):
+    """Yield SSE messages carrying agent text deltas until the job finishes (job run by this worker)"""
+    async for event in text_streams.subscribe(job_id, timeout=STATUS_STREAM_KEEPALIVE):
+        if await request.is_disconnected():
+            return
+        
+        if event is None:
+            # Quiet period: also catches jobs that ended before this client subscribed
+            job_info = await job_store.aget(job_id)
+            if job_info is None or job_info["status"] in ("completed", "failed"):
+                yield format_sse("done", {"job_id": job_id, "status": job_info["status"] if job_info else "unknown"})
+                return
+            yield ": keep-alive\n\n"
+            continue
+        
+        data = {key: value for key, value in event.items() if key != "event"}
+        yield format_sse(event["event"], {"job_id": job_id, **data})
+
+async def stored_output_stream(job_id: str, request: Request):
+    """Yield SSE messages from the output copied to the job store (job run by another worker)"""
+    sent_chars: List[int] = []
+    last_message_at = time.time()
+    
+    while not await request.is_disconnected():
+        job_info = await job_store.aget(job_id)
+        if job_info is None:
+            yield format_sse("error", {"job_id": job_id, "detail": "Job not found"})
+            return
+        
+        for index, segment in enumerate(job_info.get("live_output") or []):
+            section = {"section": segment["section"]} if segment.get("section") is not None else {}
+            if index == len(sent_chars):
+                # Like the in-process hub, announce an agent only when it changes
+                if not index or job_info["live_output"][index - 1]["agent"] != segment["agent"]:
+                    yield format_sse("agent_start", {"job_id": job_id, "agent": segment["agent"]})
+                sent_chars.append(0)
+            if len(segment["text"]) > sent_chars[index]:
+                yield format_sse("delta", {
+                    "job_id": job_id, "agent": segment["agent"], **section, "text": segment["text"][sent_chars[index]:]
+                })
+                sent_chars[index] = len(segment["text"])
+                last_message_at = time.time()
+        
+        # The writer stores the full output before marking the job finished
+        if job_info["status"] in ("completed", "failed"):
+            yield format_sse("done", {"job_id": job_id, "status": job_info["status"]})
+            return
+        
+        if time.time() - last_message_at >= STATUS_STREAM_KEEPALIVE:
+            yield ": keep-alive\n\n"
+            last_message_at = time.time()
+        
+        await asyncio.sleep(STATUS_STREAM_INTERVAL)
+
+@app.get("/results/{job_id}/stream")
+async def stream_job_output(job_id: str, request: Request, api_key_info: dict = Depends(verify_api_key)):
+    """Stream agent output text as it is generated (Server-Sent Events)"""
+    job_info = await job_store.aget(job_id)
+    if job_info is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job_info["status"] in ("completed", "failed"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is already {job_info['status']}; use /results/{job_id}"
+        )
+    
+    # Deltas are published in the process running the job; other workers follow the store copy
+    if job_info.get("owner") == WORKER_ID or not TEXT_STREAM_STORE_INTERVAL:
+        events = job_output_stream(job_id, request)
+    else:
+        events = stored_output_stream(job_id, request)
+    
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @app.get("/results/{job_id}", response_model=ContentResult)
 async def get_job_results(job_id: str, api_key_info: dict = Depends(verify_api_key)):
     """Get job results"""
-    if job_id not in job_storage:
+    job_info = await job_store.aget(job_id)
+    if job_info is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job_info = job_storage[job_id]
-    
     if job_info["status"] != "completed":
         raise HTTPException(
             status_code=400, 
@@ -658,20 +1026,97 @@ async def get_job_results(job_id: str, api_key_info: dict = Depends(verify_api_k
 async def list_jobs(api_key_info: dict = Depends(verify_api_key)):
     """List all jobs for debugging (admin only)"""
     jobs = []
-    for job_id, job_info in job_storage.items():
+    for job_info in await job_store.alist_jobs():
         jobs.append(JobStatus(
-            job_id=job_id,
+            job_id=job_info["job_id"],
             status=job_info["status"],
             progress=job_info["progress"],
             current_stage=job_info.get("current_stage"),
             created_at=job_info["created_at"],
             updated_at=job_info["updated_at"],
             estimated_completion=job_info.get("estimated_completion"),
-            error_message=job_info.get("error_message")
+            error_message=job_info.get("error_message"),
+            running_stages=job_info.get("running_stages")
         ))
     
     return jobs
 
+@app.post("/jobs/{job_id}/resume", response_model=ContentResponse)
+async def resume_job(job_id: str, api_key_info: dict = Depends(verify_api_key)):
+    """Re-queue a job, continuing from its last checkpointed stage"""
+    job_info = await job_store.aget(job_id)
+    if job_info is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job_info["status"] == "completed":
+        raise HTTPException(status_code=409, detail=f"Job is already completed; use /results/{job_id}")
+    
+    # A queued/processing job whose worker stopped (no live heartbeat) can be taken over
+    if job_info["status"] in ("queued", "processing") and not is_orphaned(job_id, job_info):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is already {job_info['status']}"
+        )
+    
+    if not job_info.get("request"):
+        raise HTTPException(status_code=400, detail="Job has no stored request to resume")
+    
+    content_request = ContentRequest(**job_info["request"])
+    priority = api_key_info.get("priority", DEFAULT_JOB_PRIORITY)
+    
+    try:
+        job_queue.check_capacity()
+        
+        # Mark the job queued before a worker can pick it up and move it to processing
+        await job_store.aupdate(job_id, {
+            "status": "queued",
+            "progress": 0,
+            "current_stage": "queued",
+            "updated_at": datetime.now(),
+            "estimated_completion": datetime.now() + timedelta(seconds=job_queue.estimate_completion(priority)),
+            "error_message": None,
+            "resumed_at": datetime.now(),
+            # The resumed run records its own transitions; status streams start over
+            "stage_history": [],
+            "stage_timings": {},
+            "running_stages": [],
+            "live_output": None,
+            "owner": WORKER_ID,
+            "heartbeat_at": datetime.now()
+        })
+        try:
+            estimated_seconds = job_queue.submit(job_id, {"request": content_request, "resume": True}, priority=priority)
+        except QueueFullError:
+            await job_store.aupdate(job_id, {
+                "status": job_info["status"],
+                "progress": job_info["progress"],
+                "current_stage": job_info.get("current_stage"),
+                "error_message": job_info.get("error_message"),
+                "owner": job_info.get("owner"),
+                "heartbeat_at": job_info.get("heartbeat_at"),
+                "stage_history": job_info.get("stage_history"),
+                "stage_timings": job_info.get("stage_timings"),
+                "running_stages": job_info.get("running_stages")
+            })
+            raise
+    except QueueFullError as e:
+        logger.warning(f"Rejected resume of job {job_id} for {api_key_info['name']}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    logger.info(f"Job {job_id} queued for resume by {api_key_info['name']}")
+    
+    return ContentResponse(
+        job_id=job_id,
+        status="queued",
+        message="Job queued to resume from its last completed stage. Use /status/{job_id} to check progress.",
+        estimated_time=format_estimate(estimated_seconds),
+        created_at=job_info["created_at"]
+    )
+
 # ========================
 # Error Handlers
 # ========================
@@ -15,12 +15,26 @@ from typing import Dict, List, Optional, Any, Tuple
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 
+from citation_agent.claim_index import ClaimSourceIndex, iter_sentence_matches
+from pipeline_core.tracing import traced
+from research_agent.corpus import WORD_PATTERN, ResearchCorpus
+from research_agent.sources import source_extractor
+
 # Load environment variables
 load_dotenv()
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Common words never used as matching keywords
+KEYWORD_STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
+    'of', 'with', 'by', 'from', 'up', 'about', 'into', 'through', 'during',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
+    'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might',
+    'this', 'that', 'these', 'those', 'there', 'their', 'they', 'them'
+}
+
 class CitationAgent:
     """Agent for adding citations to content based on research data"""
     
@@ -32,38 +46,40 @@ class CitationAgent:
         }
         self.default_style = "apa"
     
+    @traced("citations.identify_claims", kind="deterministic")
     def identify_claims_needing_citations(self, content: str) -> List[Dict[str, Any]]:
         """Identify claims, statistics, and statements that need citations"""
         claims = []
         
-        # Patterns for content that typically needs citations
+        # Trigger phrases for content that typically needs citations; each claim
+        # is the sentence fragment around a trigger, i.e. ([^.]*TRIGGER[^.]*)
         citation_patterns = [
             # Statistics and percentages
-            (r'([^.]*\b\d+(?:\.\d+)?%[^.]*)', 'statistic'),
+            (r'\b\d+(?:\.\d+)?%', 'statistic'),
             # Dollar amounts and financial data
-            (r'([^.]*\$\d+(?:[\d,]*)?(?:\.\d+)?\s*(?:billion|million|thousand|k)?[^.]*)', 'financial'),
+            (r'\$\d+(?:[\d,]*)?(?:\.\d+)?\s*(?:billion|million|thousand|k)?', 'financial'),
             # Growth and change statistics
-            (r'([^.]*(?:grew|increased|decreased|rose|fell|improved|declined)\s+(?:by\s+)?\d+(?:\.\d+)?%[^.]*)', 'growth'),
+            (r'(?:grew|increased|decreased|rose|fell|improved|declined)\s+(?:by\s+)?\d+(?:\.\d+)?%', 'growth'),
             # Market size and industry data
-            (r'([^.]*(?:market|industry|sector)\s+(?:size|value|worth)[^.]*\$?\d+[^.]*)', 'market_data'),
+            (r'(?:market|industry|sector)\s+(?:size|value|worth)[^.]*\$?\d+', 'market_data'),
             # Research findings and studies
-            (r'([^.]*(?:study|research|survey|report|analysis)\s+(?:shows|found|indicates|reveals|suggests)[^.]*)', 'research_finding'),
+            (r'(?:study|research|survey|report|analysis)\s+(?:shows|found|indicates|reveals|suggests)', 'research_finding'),
             # Expert opinions and quotes
-            (r'([^.]*(?:according to|experts|analysts|researchers)\s+[^.]*)', 'expert_opinion'),
+            (r'(?:according to|experts|analysts|researchers)\s+', 'expert_opinion'),
             # Specific dates and timeframes
-            (r'([^.]*(?:in\s+20\d{2}|during\s+20\d{2}|by\s+20\d{2})[^.]*)', 'temporal_claim'),
+            (r'(?:in\s+20\d{2}|during\s+20\d{2}|by\s+20\d{2})', 'temporal_claim'),
             # Comparative claims
-            (r'([^.]*(?:compared to|versus|more than|less than|higher than|lower than)[^.]*)', 'comparison'),
+            (r'(?:compared to|versus|more than|less than|higher than|lower than)', 'comparison'),
             # Definitive statements about trends
-            (r'([^.]*(?:trend|trending|popular|leading|dominant|fastest-growing)[^.]*)', 'trend_claim')
+            (r'(?:trend|trending|popular|leading|dominant|fastest-growing)', 'trend_claim')
         ]
         
         claim_id = 1
-        for pattern, claim_type in citation_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
+        seen_texts = set()
+        for trigger, claim_type in citation_patterns:
+            for match in iter_sentence_matches(trigger, content, re.IGNORECASE):
                 claim_text = match.group(1).strip()
-                if len(claim_text) > 20 and claim_text not in [c['text'] for c in claims]:
+                if len(claim_text) > 20 and claim_text not in seen_texts:
                     claims.append({
                         'id': claim_id,
                         'text': claim_text,
@@ -72,6 +88,7 @@ class CitationAgent:
                         'end_pos': match.end(1),
                         'needs_citation': True
                     })
+                    seen_texts.add(claim_text)
                     claim_id += 1
         
         # Sort by position in text
@@ -79,42 +96,33 @@ class CitationAgent:
         
         return claims
     
+    @traced("citations.match_sources", kind="deterministic")
     def match_claims_to_sources(self, claims: List[Dict], research_data: Dict) -> List[Dict]:
         """Match identified claims to research sources"""
         matched_claims = []
         
-        # Extract research content for matching
+        # Statistics, quotes and answers come pre-tokenized from the shared research corpus
+        corpus = ResearchCorpus.of(research_data)
         research_content = []
-        
-        # Add statistics
-        for stat in research_data.get('statistics', []):
-            research_content.append({
-                'text': stat,
-                'type': 'statistic',
-                'source_type': 'research_statistic'
-            })
-        
-        # Add expert quotes
-        for quote in research_data.get('expert_quotes', []):
-            research_content.append({
-                'text': quote,
-                'type': 'expert_opinion',
-                'source_type': 'expert_quote'
-            })
-        
-        # Add research results content
-        for result in research_data.get('results', []):
-            if 'answer' in result:
+        for passage in corpus.passages:
+            if passage.kind == 'statistic':
+                research_content.append({'text': passage.text, 'type': 'statistic', 'source_type': 'research_statistic'})
+            elif passage.kind == 'expert_quote':
+                research_content.append({'text': passage.text, 'type': 'expert_opinion', 'source_type': 'expert_quote'})
+            else:
                 research_content.append({
-                    'text': result['answer'],
+                    'text': passage.text,
                     'type': 'research_finding',
                     'source_type': 'research_result',
-                    'query': result.get('query', '')
+                    'query': passage.query
                 })
         
+        # Build the per-job index once, then score each claim against its candidates only
+        index = ClaimSourceIndex(research_content, self._extract_keywords, corpus.passages, self._filter_keywords)
+        
         # Match claims to research content
         for claim in claims:
-            best_match = self._find_best_source_match(claim, research_content)
+            best_match = index.find_best_match(claim)
             if best_match:
                 claim['matched_source'] = best_match
                 claim['confidence'] = best_match.get('confidence', 0.5)
@@ -126,73 +134,14 @@ class CitationAgent:
         
         return matched_claims
     
-    def _find_best_source_match(self, claim: Dict, research_content: List[Dict]) -> Optional[Dict]:
-        """Find the best matching research source for a claim"""
-        claim_text = claim['text'].lower()
-        claim_type = claim['type']
-        best_match = None
-        best_score = 0.0
-        
-        for source in research_content:
-            source_text = source['text'].lower()
-            score = 0.0
-            
-            # Type matching bonus
-            if claim_type == source['type']:
-                score += 0.3
-            
-            # Extract key terms from claim
-            claim_keywords = self._extract_keywords(claim_text)
-            source_keywords = self._extract_keywords(source_text)
-            
-            # Keyword overlap scoring
-            common_keywords = set(claim_keywords) & set(source_keywords)
-            if claim_keywords:
-                keyword_score = len(common_keywords) / len(claim_keywords)
-                score += keyword_score * 0.4
-            
-            # Specific pattern matching
-            if claim_type == 'statistic':
-                # Look for matching numbers
-                claim_numbers = re.findall(r'\d+(?:\.\d+)?', claim_text)
-                source_numbers = re.findall(r'\d+(?:\.\d+)?', source_text)
-                if claim_numbers and source_numbers:
-                    if any(num in source_numbers for num in claim_numbers):
-                        score += 0.3
-            
-            # Content similarity (simple overlap)
-            claim_words = set(claim_text.split())
-            source_words = set(source_text.split())
-            if len(claim_words) > 0:
-                overlap = len(claim_words & source_words) / len(claim_words)
-                score += overlap * 0.2
-            
-            # Update best match
-            if score > best_score and score > 0.3:  # Minimum threshold
-                best_score = score
-                best_match = {
-                    **source,
-                    'confidence': score
-                }
-        
-        return best_match
-    
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract meaningful keywords from text"""
-        # Remove common words
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-            'of', 'with', 'by', 'from', 'up', 'about', 'into', 'through', 'during',
-            'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
-            'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might',
-            'this', 'that', 'these', 'those', 'there', 'their', 'they', 'them'
-        }
-        
         # Extract words (3+ characters, not in stop words)
-        words = re.findall(r'\b[a-z]{3,}\b', text.lower())
-        keywords = [w for w in words if w not in stop_words]
-        
-        return keywords
+        return self._filter_keywords(WORD_PATTERN.findall(text.lower()))
+    
+    def _filter_keywords(self, words: List[str]) -> List[str]:
+        """Drop common words from lowercase word tokens"""
+        return [w for w in words if w not in KEYWORD_STOP_WORDS]
     
     def _select_best_source(self, sources: List[str]) -> Optional[str]:
         """Select the best source from a list (prefer URLs over text snippets)"""
@@ -203,12 +152,7 @@ class CitationAgent:
         for source in sources:
             if source.startswith(('http://', 'https://')):
                 urls.append(source)
-            elif any(org in source.lower() for org in [
-                'mckinsey', 'deloitte', 'bcg', 'boston consulting', 'gartner', 
-                'forrester', 'pwc', 'harvard', 'mit', 'stanford', 'wsj', 
-                'wall street', 'new york times', 'financial times', 'forbes', 
-                'bloomberg', 'reuters', 'techcrunch', 'wired', 'economist'
-            ]):
+            elif source_extractor.is_known_publisher(source):
                 organizations.append(source)
             else:
                 other_sources.append(source)
@@ -225,22 +169,13 @@ class CitationAgent:
     
     def _extract_source_from_text(self, text: str) -> Optional[str]:
         """Extract source information from text content"""
-        # Look for URLs in text
-        url_pattern = r'https?://[^\s\)]+[^\s\.\,\)\]]'
-        urls = re.findall(url_pattern, text)
-        if urls:
-            return urls[0]
-        
-        # Look for organization mentions
-        org_patterns = [
-            r'(?:according to |source: |via |from )?([A-Za-z\s]+(?:McKinsey|Deloitte|BCG|Boston Consulting|Gartner|Forrester|PwC|Harvard|MIT|Stanford))[^,\n.]*',
-            r'(?:according to |source: |via |from )?([A-Za-z\s]*(?:Wall Street Journal|WSJ|New York Times|Financial Times|Forbes|Bloomberg|Reuters|TechCrunch|Wired|Economist))[^,\n.]*'
-        ]
+        records = list(source_extractor.iter_sources(text))
         
-        for pattern in org_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                return matches[0].strip()
+        # Prefer a URL, then a known publisher mention
+        for kind in ('url', 'organization'):
+            for record in records:
+                if record.kind == kind:
+                    return record.text
         
         return None
     
@@ -296,6 +231,7 @@ class CitationAgent:
         
         return result[:50]  # Limit length
     
+    @traced("citations.format", kind="deterministic")
     def format_citations(self, matched_claims: List[Dict], research_data: Dict, style: str = "apa") -> Dict[str, Any]:
         """Format claims with citations and create bibliography"""
         citation_formatter = self.citation_styles.get(style, self.citation_styles[self.default_style])
@@ -305,11 +241,20 @@ class CitationAgent:
         citation_map = {}
         citation_counter = 1
         
+        # Source keys depend only on the matched text and type, so resolve each one once
+        source_keys = {}
+        
+        def source_key_for(matched_source):
+            cache_key = (matched_source.get('text', ''), matched_source.get('source_type'))
+            if cache_key not in source_keys:
+                source_keys[cache_key] = self._create_source_key(matched_source, research_data)
+            return source_keys[cache_key]
+        
         # Get unique sources
         unique_sources = set()
         for claim in matched_claims:
             if claim.get('matched_source'):
-                source_key = self._create_source_key(claim['matched_source'], research_data)
+                source_key = source_key_for(claim['matched_source'])
                 if source_key and source_key not in unique_sources:
                     unique_sources.add(source_key)
                     
@@ -322,7 +267,7 @@ class CitationAgent:
         cited_claims = []
         for claim in matched_claims:
             if claim.get('matched_source') and claim['confidence'] > 0.3:
-                source_key = self._create_source_key(claim['matched_source'], research_data)
+                source_key = source_key_for(claim['matched_source'])
                 if source_key in citation_map:
                     claim['citation_number'] = citation_map[source_key]
                     claim['has_citation'] = True
@@ -461,6 +406,7 @@ class CitationAgent:
                 'title': clean_title
             }
     
+    @traced("citations.apply", kind="deterministic")
     def apply_citations_to_content(self, content: str, citation_data: Dict) -> str:
         """Apply citations to content text"""
         cited_content = content
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Claim Index - Inverted index over research content for citation matching
+Built once per job from research_data so each claim is only scored against
+sources that share at least one keyword, number or word with it.
+"""
+
+import re
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Match, Optional, Set
+
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+# A source with no shared keyword, number or word scores at most the 0.3
+# type bonus, which never beats the minimum match threshold
+MIN_MATCH_SCORE = 0.3
+
+
+def iter_sentence_matches(trigger: str, content: str, flags: int = 0) -> Iterator[Match]:
+    """Yield the same matches as re.finditer(r'([^.]*TRIGGER[^.]*)', content)
+
+    The plain pattern retries every start offset of every sentence without a
+    trigger, which is quadratic in sentence length. Instead, find the next
+    trigger directly and anchor the full pattern at the start of its sentence.
+    """
+    trigger_re = re.compile(trigger, flags)
+    sentence_re = re.compile(r'([^.]*' + trigger + r'[^.]*)', flags)
+
+    pos = 0
+    while True:
+        hit = trigger_re.search(content, pos)
+        if hit is None:
+            return
+
+        # Leftmost possible start: after the last period before the trigger
+        start = max(pos, content.rfind('.', 0, hit.start()) + 1)
+        match = sentence_re.match(content, start)
+        if match is None:
+            pos = hit.start() + 1
+            continue
+
+        yield match
+        pos = match.end()
+
+
+class ClaimSourceIndex:
+    """Keyword, number and word postings over a job's research content"""
+
+    def __init__(self, research_content: List[Dict], extract_keywords: Callable[[str], List[str]],
+                 passages: Optional[List[Any]] = None, filter_keywords: Optional[Callable[[List[str]], List[str]]] = None):
+        """passages (aligned with research_content) supply pre-tokenized text from the ResearchCorpus"""
+        self.sources = research_content
+        self.extract_keywords = extract_keywords
+
+        self.keyword_sets: List[Set[str]] = []
+        self.word_sets: List[Set[str]] = []
+        self.number_sets: List[Set[str]] = []
+
+        self.keyword_postings: Dict[str, List[int]] = defaultdict(list)
+        self.word_postings: Dict[str, List[int]] = defaultdict(list)
+        self.number_postings: Dict[str, List[int]] = defaultdict(list)
+
+        for source_id, source in enumerate(research_content):
+            if passages is not None and filter_keywords is not None:
+                passage = passages[source_id]
+                keywords = set(filter_keywords(passage.tokens))
+                words = passage.words
+                numbers = passage.number_tokens
+            else:
+                source_text = source['text'].lower()
+                keywords = set(extract_keywords(source_text))
+                words = set(source_text.split())
+                numbers = set(NUMBER_PATTERN.findall(source_text))
+
+            self.keyword_sets.append(keywords)
+            self.word_sets.append(words)
+            self.number_sets.append(numbers)
+
+            for keyword in keywords:
+                self.keyword_postings[keyword].append(source_id)
+            for word in words:
+                self.word_postings[word].append(source_id)
+            for number in numbers:
+                self.number_postings[number].append(source_id)
+
+    def find_best_match(self, claim: Dict) -> Optional[Dict]:
+        """Find the best matching research source for a claim"""
+        claim_text = claim['text'].lower()
+        claim_type = claim['type']
+
+        claim_keywords = self.extract_keywords(claim_text)
+        claim_keyword_set = set(claim_keywords)
+        claim_words = set(claim_text.split())
+
+        # Count shared keywords / words per source straight from the postings
+        keyword_hits: Dict[int, int] = defaultdict(int)
+        for keyword in claim_keyword_set:
+            for source_id in self.keyword_postings.get(keyword, ()):
+                keyword_hits[source_id] += 1
+
+        word_hits: Dict[int, int] = defaultdict(int)
+        for word in claim_words:
+            for source_id in self.word_postings.get(word, ()):
+                word_hits[source_id] += 1
+
+        number_hits: Set[int] = set()
+        if claim_type == 'statistic':
+            for number in NUMBER_PATTERN.findall(claim_text):
+                number_hits.update(self.number_postings.get(number, ()))
+
+        candidates = set(keyword_hits) | set(word_hits) | number_hits
+
+        best_match = None
+        best_score = 0.0
+
+        # Ascending source order keeps first-best tie-breaking stable
+        for source_id in sorted(candidates):
+            source = self.sources[source_id]
+            score = 0.0
+
+            # Type matching bonus
+            if claim_type == source['type']:
+                score += 0.3
+
+            # Keyword overlap scoring
+            if claim_keywords:
+                keyword_score = keyword_hits.get(source_id, 0) / len(claim_keywords)
+                score += keyword_score * 0.4
+
+            # Matching numbers for statistical claims
+            if source_id in number_hits:
+                score += 0.3
+
+            # Content similarity (simple overlap)
+            if len(claim_words) > 0:
+                overlap = word_hits.get(source_id, 0) / len(claim_words)
+                score += overlap * 0.2
+
+            if score > best_score and score > MIN_MATCH_SCORE:
+                best_score = score
+                best_match = {
+                    **source,
+                    'confidence': score
+                }
+
+        return best_match
@@ -12,15 +12,25 @@ import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
-from difflib import SequenceMatcher
 from dotenv import load_dotenv
 
+from fact_check_agent.similarity import SimilarityEngine
+from research_agent.corpus import WORD_PATTERN, ResearchCorpus, extract_number_mentions
+from pipeline_core.tracing import traced
+
 # Load environment variables
 load_dotenv()
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Common words dropped from claim keywords
+CLAIM_STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
+    'of', 'with', 'by', 'from', 'up', 'about', 'into', 'through', 'during',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had'
+}
+
 class FactCheckAgent:
     """Agent for verifying factual claims against research data"""
     
@@ -33,6 +43,9 @@ class FactCheckAgent:
         
         # Claim patterns for extraction
         self.claim_patterns = self._initialize_claim_patterns()
+        
+        # Windowed text similarity for long research answers
+        self.similarity_engine = SimilarityEngine()
     
     def _initialize_claim_patterns(self) -> List[Dict[str, Any]]:
         """Initialize patterns for extracting factual claims"""
@@ -111,6 +124,7 @@ class FactCheckAgent:
             }
         ]
     
+    @traced("fact_check.extract_claims", kind="deterministic")
     def extract_factual_claims(self, content: str) -> List[Dict[str, Any]]:
         """Extract factual claims from content that need verification"""
         claims = []
@@ -206,21 +220,8 @@ class FactCheckAgent:
     
     def _extract_numbers(self, text: str) -> List[str]:
         """Extract numerical values from claim text"""
-        # Match various number formats
-        number_patterns = [
-            r'\d+(?:\.\d+)?%',  # Percentages
-            r'\$\d+(?:[\d,]*)?(?:\.\d+)?(?:\s*(?:billion|million|thousand|k))?',  # Money
-            r'\d+(?:[\d,]*)?(?:\.\d+)?(?:\s*(?:billion|million|thousand|k))?',  # Large numbers
-            r'\d+(?:\.\d+)?x',  # Multipliers
-            r'20\d{2}',  # Years
-        ]
-        
-        numbers = []
-        for pattern in number_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            numbers.extend(matches)
-        
-        return list(set(numbers))  # Remove duplicates
+        # Percentages, money, large numbers, multipliers and years (deduplicated)
+        return extract_number_mentions(text)
     
     def _extract_dates(self, text: str) -> List[str]:
         """Extract dates and temporal references from claim text"""
@@ -240,17 +241,13 @@ class FactCheckAgent:
     def _extract_claim_keywords(self, text: str) -> List[str]:
         """Extract keywords from claim for matching"""
         # Remove stop words and extract meaningful terms
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-            'of', 'with', 'by', 'from', 'up', 'about', 'into', 'through', 'during',
-            'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had'
-        }
-        
-        words = re.findall(r'\b[a-z]{3,}\b', text.lower())
-        keywords = [w for w in words if w not in stop_words]
-        
-        return keywords[:10]  # Limit to 10 most relevant keywords
+        return self._filter_claim_keywords(WORD_PATTERN.findall(text.lower()))
+    
+    def _filter_claim_keywords(self, words: List[str]) -> List[str]:
+        """First 10 non-stop-word tokens"""
+        return [w for w in words if w not in CLAIM_STOP_WORDS][:10]  # Limit to 10 most relevant keywords
     
+    @traced("fact_check.match_claims", kind="deterministic")
     def verify_claims_against_research(self, claims: List[Dict], research_data: Dict) -> List[Dict]:
         """Verify extracted claims against research data"""
         verified_claims = []
@@ -270,37 +267,26 @@ class FactCheckAgent:
         """Prepare research data for claim verification"""
         content = []
         
-        # Add statistics
-        for stat in research_data.get('statistics', []):
-            content.append({
-                'text': stat,
-                'type': 'statistic',
-                'source': 'research_statistics',
-                'numbers': self._extract_numbers(stat),
-                'keywords': self._extract_claim_keywords(stat)
-            })
-        
-        # Add expert quotes
-        for quote in research_data.get('expert_quotes', []):
+        # Numbers and tokens are parsed once per job by the shared research corpus
+        corpus = ResearchCorpus.of(research_data)
+        item_types = {'statistic': 'statistic', 'expert_quote': 'expert_opinion', 'result': 'research_result'}
+        for passage in corpus.passages:
+            if passage.kind == 'statistic':
+                source = 'research_statistics'
+            elif passage.kind == 'expert_quote':
+                source = 'expert_quotes'
+            else:
+                source = passage.query or 'research_query'
+            
             content.append({
-                'text': quote,
-                'type': 'expert_opinion',
-                'source': 'expert_quotes',
-                'numbers': self._extract_numbers(quote),
-                'keywords': self._extract_claim_keywords(quote)
+                'text': passage.text,
+                'type': item_types[passage.kind],
+                'source': source,
+                'numbers': passage.number_mentions(),
+                'keywords': self._filter_claim_keywords(passage.tokens),
+                'prepared_text': self.similarity_engine.prepare(passage.text)
             })
         
-        # Add research results
-        for result in research_data.get('results', []):
-            if 'answer' in result:
-                content.append({
-                    'text': result['answer'],
-                    'type': 'research_result',
-                    'source': result.get('query', 'research_query'),
-                    'numbers': self._extract_numbers(result['answer']),
-                    'keywords': self._extract_claim_keywords(result['answer'])
-                })
-        
         return content
     
     def _verify_single_claim(self, claim: Dict, research_content: List[Dict]) -> Dict:
@@ -313,7 +299,7 @@ class FactCheckAgent:
         claim_keywords = claim.get('keywords', [])
         
         for research_item in research_content:
-            confidence = self._calculate_match_confidence(claim, research_item)
+            confidence = self._calculate_match_confidence(claim, research_item, best_confidence)
             
             if confidence > best_confidence:
                 best_confidence = confidence
@@ -340,32 +326,45 @@ class FactCheckAgent:
             }
         }
     
-    def _calculate_match_confidence(self, claim: Dict, research_item: Dict) -> float:
-        """Calculate confidence score for claim-research match"""
+    def _calculate_match_confidence(self, claim: Dict, research_item: Dict, min_confidence: float = 0.0) -> float:
+        """Calculate confidence score for claim-research match
+
+        Text similarity is skipped (scored 0) when even a perfect-enough match
+        could not lift the total above min_confidence.
+        """
         score = 0.0
         
         claim_text = claim['claim'].lower()
-        research_text = research_item['text'].lower()
-        
-        # Text similarity (30% weight)
-        text_similarity = SequenceMatcher(None, claim_text, research_text).ratio()
-        score += text_similarity * 0.3
+        prepared_text = research_item.get('prepared_text') or self.similarity_engine.prepare(research_item['text'])
         
-        # Number matching (35% weight)
         claim_numbers = claim.get('extracted_numbers', [])
         research_numbers = research_item.get('numbers', [])
         number_match_score = self._calculate_number_match_score(claim_numbers, research_numbers)
-        score += number_match_score * 0.35
         
-        # Keyword overlap (25% weight)
         claim_keywords = set(claim.get('keywords', []))
         research_keywords = set(research_item.get('keywords', []))
+        keyword_overlap = None
         if claim_keywords and research_keywords:
             keyword_overlap = len(claim_keywords & research_keywords) / len(claim_keywords)
+        
+        type_match = claim['type'] == research_item['type'] or (claim['type'] == 'statistic' and research_item['type'] == 'statistic')
+        
+        # Text similarity (30% weight), scored on the best few sentence windows
+        other_score = number_match_score * 0.35 + (keyword_overlap or 0.0) * 0.25 + (0.1 if type_match else 0.0)
+        text_similarity = self.similarity_engine.similarity(
+            claim_text, prepared_text, floor=(min_confidence - other_score) / 0.3
+        )
+        score += text_similarity * 0.3
+        
+        # Number matching (35% weight)
+        score += number_match_score * 0.35
+        
+        # Keyword overlap (25% weight)
+        if keyword_overlap is not None:
             score += keyword_overlap * 0.25
         
         # Type matching bonus (10% weight)
-        if claim['type'] == research_item['type'] or (claim['type'] == 'statistic' and research_item['type'] == 'statistic'):
+        if type_match:
             score += 0.1
         
         return min(score, 1.0)  # Cap at 1.0
@@ -428,6 +427,7 @@ class FactCheckAgent:
         """Find keywords that match between claim and research"""
         return list(set(claim_keywords) & set(research_keywords))
     
+    @traced("fact_check.recommendations", kind="deterministic")
     def generate_recommendations(self, verified_claims: List[Dict]) -> List[str]:
         """Generate recommendations based on verification results"""
         recommendations = []
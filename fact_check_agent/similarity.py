@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Similarity Engine - Bounded, prefiltered text similarity for fact-checking
+Long research answers are chunked into sentence windows once per job; each
+claim is compared with SequenceMatcher only on the few windows that share the
+most tokens and numbers with it, instead of against the whole answer.
+"""
+
+import os
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import List, Optional, Set
+
+TOKEN_PATTERN = re.compile(r'\b[a-z]{3,}\b')
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# SequenceMatcher's autojunk heuristic: in texts of 200+ characters, anything
+# occurring in more than 1% of positions is never matched
+AUTOJUNK_MIN_LENGTH = 200
+JUNK_PLACEHOLDER = '\x00'
+
+
+class TextWindow:
+    """A chunk of research text with precomputed tokens and a warm matcher"""
+
+    __slots__ = ('text', 'tokens', 'numbers', 'matcher')
+
+    def __init__(self, text: str, popular: Optional[Set[str]] = None):
+        self.text = text
+        self.tokens: Set[str] = set(TOKEN_PATTERN.findall(text))
+        self.numbers: Set[str] = set(NUMBER_PATTERN.findall(text))
+
+        # Characters that were popular in the whole text stay unmatchable here
+        if popular is not None:
+            text = ''.join(JUNK_PLACEHOLDER if char in popular else char for char in text)
+
+        # SequenceMatcher caches its analysis of seq2, so reuse it across claims
+        self.matcher = SequenceMatcher(None, '', text, autojunk=popular is None)
+
+
+class PreparedText:
+    """Research text split into windows, built once per research item"""
+
+    __slots__ = ('text', 'windows', 'windowed')
+
+    def __init__(self, text: str, windows: List[TextWindow], windowed: bool):
+        self.text = text
+        self.windows = windows
+        self.windowed = windowed
+
+
+class SimilarityEngine:
+    """Computes claim/research text similarity on the full-text ratio scale"""
+
+    def __init__(self, max_window_chars: Optional[int] = None, window_sentences: Optional[int] = None,
+                 top_windows: Optional[int] = None):
+        # Texts up to this length are compared whole, exactly as before
+        self.max_window_chars = max_window_chars or int(os.getenv("FACT_CHECK_MAX_WINDOW_CHARS", "400"))
+        self.window_sentences = window_sentences or int(os.getenv("FACT_CHECK_WINDOW_SENTENCES", "2"))
+        self.top_windows = top_windows or int(os.getenv("FACT_CHECK_TOP_WINDOWS", "3"))
+
+    def prepare(self, text: str) -> PreparedText:
+        """Lowercase and chunk research text into overlapping sentence windows"""
+        text = text.lower()
+        if len(text) <= self.max_window_chars:
+            return PreparedText(text, [TextWindow(text)], windowed=False)
+
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+        span = max(1, self.window_sentences)
+        popular = self._popular_characters(text)
+        windows = [
+            TextWindow(' '.join(sentences[i:i + span]), popular)
+            for i in range(max(1, len(sentences) - span + 1))
+        ]
+        return PreparedText(text, windows, windowed=True)
+
+    @staticmethod
+    def _popular_characters(text: str) -> Set[str]:
+        """Characters a whole-text SequenceMatcher would have junked"""
+        if len(text) < AUTOJUNK_MIN_LENGTH:
+            return set()
+        limit = len(text) // 100 + 1
+        return {char for char, count in Counter(text).items() if count > limit}
+
+    def similarity(self, claim_text: str, prepared: PreparedText, floor: float = -1.0) -> float:
+        """SequenceMatcher ratio of claim vs research text, bounded by window count
+
+        Returns 0.0 without running the full comparison when a cheap upper bound
+        shows the ratio cannot exceed floor.
+        """
+        claim_text = claim_text.lower()
+
+        if not prepared.windowed:
+            matcher = prepared.windows[0].matcher
+            matcher.set_seq1(claim_text)
+            if matcher.real_quick_ratio() <= floor or matcher.quick_ratio() <= floor:
+                return 0.0
+            return matcher.ratio()
+
+        claim_tokens = set(TOKEN_PATTERN.findall(claim_text))
+        claim_numbers = set(NUMBER_PATTERN.findall(claim_text))
+
+        # Prefilter: rank windows by shared numbers (weighted) and tokens
+        scored = []
+        for window in prepared.windows:
+            shared = len(claim_tokens & window.tokens) + 2 * len(claim_numbers & window.numbers)
+            if shared:
+                scored.append((shared, window))
+        if not scored:
+            return 0.0
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        # ratio() = 2*M / (len(a) + len(b)); compare windows by M, the matched characters
+        total_length = len(claim_text) + len(prepared.text)
+        best_matched = 0
+        for _, window in scored[:self.top_windows]:
+            matcher = window.matcher
+            matcher.set_seq1(claim_text)
+            window_length = len(claim_text) + len(window.text)
+            bound = matcher.quick_ratio() * window_length / 2
+            if bound <= best_matched or 2.0 * bound / total_length <= floor:
+                continue
+            matched = sum(block.size for block in matcher.get_matching_blocks())
+            best_matched = max(best_matched, matched)
+
+        # Report on the whole-text scale so confidences stay comparable
+        similarity = 2.0 * best_matched / total_length
+        return similarity if similarity > floor else 0.0
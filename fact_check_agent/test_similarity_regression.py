@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Regression test for the windowed similarity engine
+Re-runs fact-checking on the stored API results and checks confidences,
+statuses and accuracy scores stay comparable to the recorded outputs.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fact_check_agent.agent import FactCheckAgent
+
+RESULTS_DIR = Path(__file__).parent.parent / "api" / "results"
+CONFIDENCE_TOLERANCE = 0.05
+ACCURACY_TOLERANCE = 0.02
+MIN_STATUS_AGREEMENT = 0.95
+
+
+def load_stored_results():
+    """Stored results that include research data and fact-check output"""
+    stored = []
+    for path in sorted(RESULTS_DIR.glob("*.json")):
+        with open(path) as f:
+            result = json.load(f)
+        if result.get('research') and result.get('content') and result.get('fact_check'):
+            stored.append((path.name, result))
+    return stored
+
+
+def test_similarity_regression():
+    """Fact-check confidences stay within tolerance of the stored outputs"""
+    agent = FactCheckAgent()
+
+    for name, result in load_stored_results():
+        expected = result['fact_check']
+        start = time.time()
+        actual = agent.verify_facts(result['content'], result['research'])
+        elapsed = time.time() - start
+
+        assert actual['statistics']['total_claims'] == expected['statistics']['total_claims'], name
+
+        expected_claims = expected['verified_claims']
+        actual_claims = actual['verified_claims']
+        agreeing = 0
+        for old, new in zip(expected_claims, actual_claims):
+            assert old['claim'] == new['claim'], name
+            assert abs(old['confidence'] - new['confidence']) <= CONFIDENCE_TOLERANCE, (name, old['claim'])
+            agreeing += old['status'] == new['status']
+
+        if expected_claims:
+            assert agreeing / len(expected_claims) >= MIN_STATUS_AGREEMENT, name
+        assert abs(actual['accuracy_score'] - expected['accuracy_score']) <= ACCURACY_TOLERANCE, name
+
+        print(f"✅ {name}: {len(actual_claims)} claims, accuracy "
+              f"{expected['accuracy_score']} -> {actual['accuracy_score']} ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    test_similarity_regression()
@@ -5,10 +5,12 @@ Automatically generates relevant images for content using OpenAI's DALL-E 3 API
 """
 
 import asyncio
+import hashlib
 import json
 import logging
 import os
 import re
+import tempfile
 import time
 import uuid
 from datetime import datetime
@@ -18,6 +20,13 @@ from urllib.parse import urlparse
 import httpx
 from dotenv import load_dotenv
 
+from pipeline_core.http_clients import http_clients
+from pipeline_core.rate_limiter import AsyncRateLimiter
+from pipeline_core.retry import RetryPolicy
+from pipeline_core.tracing import current_span, span, traced
+from image_agent.cache import ImageCache, link_or_copy
+from image_agent.variants import ImageVariantProcessor
+
 # Load environment variables
 load_dotenv()
 
@@ -27,7 +36,8 @@ logger = logging.getLogger(__name__)
 class ImageGenerationAgent:
     """Agent for generating contextual images using DALL-E 3"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ImageCache] = None,
+                 variant_processor: Optional[ImageVariantProcessor] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.base_url = "https://api.openai.com/v1/images/generations"
         self.model = "dall-e-3"
@@ -38,6 +48,22 @@ class ImageGenerationAgent:
         self.max_images = int(os.getenv("MAX_IMAGES", "5"))
         self.style = os.getenv("IMAGE_STYLE", "natural")  # natural|vivid
         
+        # Concurrency per job, and a process-wide limiter for OpenAI's images-per-minute quota
+        self.max_concurrency = int(os.getenv("IMAGE_MAX_CONCURRENCY", "3"))
+        self.images_per_minute = int(os.getenv("IMAGE_RATE_LIMIT_PER_MINUTE", "5"))
+        self.rate_limiter = AsyncRateLimiter(self.images_per_minute, period=60.0)
+        
+        # Timeouts are not retried: the image may already have been generated (and billed)
+        self.retry_policy = RetryPolicy("openai_images", rules={"timeout": None})
+        self.download_chunk_size = int(os.getenv("IMAGE_DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
+        
+        # Content-addressed cache of previously rendered prompts
+        self.cache = cache or ImageCache()
+        
+        # WebP/AVIF renditions and thumbnails, encoded in a process pool
+        self.variant_processor = variant_processor or ImageVariantProcessor()
+        self.srcset_sizes = os.getenv("IMAGE_SRCSET_SIZES", "(max-width: 768px) 100vw, 768px")
+        
         # Output configuration
         self.outputs_dir = Path("/home/joel/ai-content-pipeline/outputs")
         self.images_dir = self.outputs_dir / "images"
@@ -45,6 +71,7 @@ class ImageGenerationAgent:
         if not self.api_key:
             logger.warning("OPENAI_API_KEY not found. Image generation will be disabled.")
     
+    @traced("images.analyze_content", kind="deterministic")
     def analyze_content_for_images(self, content: str, outline: str) -> List[Dict[str, Any]]:
         """Analyze content and outline to identify optimal image opportunities"""
         image_opportunities = []
@@ -243,6 +270,7 @@ class ImageGenerationAgent:
         
         return "Content topic"
     
+    @traced("images.build_prompts", kind="deterministic")
     def generate_image_prompts(self, opportunities: List[Dict], topic_context: str) -> List[Dict[str, Any]]:
         """Generate DALL-E prompts for each image opportunity"""
         prompts = []
@@ -318,6 +346,7 @@ class ImageGenerationAgent:
         """Generate conclusion/summary prompt"""
         return f"Optimistic illustration showing success, achievement, or future growth related to {topic}. Upward trending elements, bright colors, positive business imagery. Clean professional style."
     
+    @traced("images.generate_one")
     async def generate_single_image(self, prompt_data: Dict[str, Any], job_id: str) -> Optional[Dict[str, Any]]:
         """Generate a single image using DALL-E 3"""
         if not self.api_key:
@@ -325,6 +354,26 @@ class ImageGenerationAgent:
             return None
         
         try:
+            image_filename = f"{job_id}_{prompt_data['type']}_{prompt_data['id']}.png"
+            cache_key = self.cache.make_key(
+                self.model, prompt_data["dalle_prompt"], self.image_size, self.image_quality, self.style
+            )
+            
+            # Identical render requested before: link the cached blob into this job
+            # (cache lookups and file copies run off the event loop)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            current_span().set("cached", bool(cached))
+            if cached:
+                image_path = self.images_dir / job_id / image_filename
+                await asyncio.to_thread(link_or_copy, cached["path"], image_path)
+                logger.info(f"Image cache hit for: {prompt_data['section']}")
+                record = self._build_image_record(
+                    prompt_data, job_id, image_filename,
+                    {"path": image_path, "bytes": cached["bytes"], "sha256": cached["sha256"]},
+                    cached["revised_prompt"] or prompt_data["dalle_prompt"], cache_key, from_cache=True
+                )
+                return await self._attach_variants(record, job_id)
+            
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
@@ -341,68 +390,143 @@ class ImageGenerationAgent:
             
             logger.info(f"Generating image for: {prompt_data['section']}")
             
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
+            client = http_clients.get_client("openai", timeout=60.0)
+            
+            async def send():
+                # Every attempt, retries included, counts against the images-per-minute quota
+                await self.rate_limiter.acquire()
+                return await client.post(
                     self.base_url,
                     headers=headers,
                     json=payload
                 )
+            
+            with span("dalle.generate", kind="http", size=self.image_size, quality=self.image_quality) as dalle_span:
+                response = await self.retry_policy.call(send)
+                dalle_span.set("status_code", response.status_code)
                 
                 if response.status_code != 200:
+                    dalle_span.fail(f"HTTP {response.status_code}")
                     logger.error(f"DALL-E API error {response.status_code}: {response.text}")
                     return None
-                
-                result = response.json()
-                image_url = result["data"][0]["url"]
-                revised_prompt = result["data"][0].get("revised_prompt", prompt_data["dalle_prompt"])
-                
-                # Download the image
-                image_filename = f"{job_id}_{prompt_data['type']}_{prompt_data['id']}.png"
-                image_path = await self._download_image(image_url, image_filename, job_id)
-                
-                if image_path:
-                    return {
-                        "filename": image_filename,
-                        "path": str(image_path),
-                        "relative_path": f"outputs/images/{job_id}/{image_filename}",
-                        "prompt": revised_prompt,
-                        "original_prompt": prompt_data["dalle_prompt"],
-                        "alt_text": prompt_data["alt_text"],
-                        "placement_suggestion": prompt_data["placement_suggestion"],
-                        "section": prompt_data["section"],
-                        "type": prompt_data["type"],
-                        "size": self.image_size,
-                        "quality": self.image_quality,
-                        "generated_at": datetime.now().isoformat()
-                    }
-                
+            
+            result = response.json()
+            image_url = result["data"][0]["url"]
+            revised_prompt = result["data"][0].get("revised_prompt", prompt_data["dalle_prompt"])
+            
+            # Download the image
+            download = await self._download_image(image_url, image_filename, job_id)
+            
+            if download:
+                await asyncio.to_thread(self.cache.put, cache_key, download["path"], revised_prompt, download["sha256"])
+                record = self._build_image_record(
+                    prompt_data, job_id, image_filename, download, revised_prompt, cache_key, from_cache=False
+                )
+                return await self._attach_variants(record, job_id)
+            
         except Exception as e:
             logger.error(f"Error generating image for {prompt_data['section']}: {e}")
             return None
     
-    async def _download_image(self, image_url: str, filename: str, job_id: str) -> Optional[Path]:
-        """Download image from URL to local storage"""
+    def _build_image_record(self, prompt_data: Dict[str, Any], job_id: str, image_filename: str, download: Dict[str, Any],
+                            revised_prompt: str, cache_key: str, from_cache: bool) -> Dict[str, Any]:
+        """Manifest entry for a generated or cached image"""
+        return {
+            "filename": image_filename,
+            "path": str(download["path"]),
+            "relative_path": f"outputs/images/{job_id}/{image_filename}",
+            "prompt": revised_prompt,
+            "original_prompt": prompt_data["dalle_prompt"],
+            "alt_text": prompt_data["alt_text"],
+            "placement_suggestion": prompt_data["placement_suggestion"],
+            "section": prompt_data["section"],
+            "type": prompt_data["type"],
+            "size": self.image_size,
+            "quality": self.image_quality,
+            "generated_at": datetime.now().isoformat(),
+            "bytes": download["bytes"],
+            "sha256": download["sha256"],
+            "from_cache": from_cache,
+            "cache_key": cache_key
+        }
+    
+    @traced("images.variants", kind="deterministic")
+    async def _attach_variants(self, record: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        """Add responsive variants, a thumbnail and srcset values to an image record"""
+        job_dir = self.images_dir / job_id
+        if not self.variant_processor.enabled:
+            return record
+        
+        # Renditions of a cached image are cached too; only new images are encoded
+        settings_key = self.variant_processor.settings_key()
+        rendered = None
+        if record["from_cache"]:
+            rendered = await asyncio.to_thread(
+                self.cache.get_variants, record["cache_key"], settings_key, job_dir, Path(record["path"]).stem
+            )
+        if rendered is None:
+            rendered = await self.variant_processor.process(Path(record["path"]), job_dir)
+            if not rendered:
+                return record
+            await asyncio.to_thread(self.cache.put_variants, record["cache_key"], settings_key, rendered)
+        
+        for item in rendered["variants"] + [rendered["thumbnail"]]:
+            item["relative_path"] = f"outputs/images/{job_id}/{Path(item['path']).relative_to(job_dir).as_posix()}"
+        
+        record["variants"] = rendered["variants"]
+        record["thumbnail"] = rendered["thumbnail"]
+        record["srcset"] = self.variant_processor.build_srcset(rendered["variants"])
+        return record
+    
+    @traced("images.download", kind="http")
+    async def _download_image(self, image_url: str, filename: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """Stream an image to local storage; returns its path, size and SHA-256"""
+        tmp_path = None
         try:
             # Create job-specific directory
             job_dir = self.images_dir / job_id
-            job_dir.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(job_dir.mkdir, parents=True, exist_ok=True)
             
             image_path = job_dir / filename
+            fd, tmp_path = await asyncio.to_thread(tempfile.mkstemp, dir=job_dir, suffix=".part")
+            
+            digest = hashlib.sha256()
+            size = 0
+            
+            # Wrap the descriptor straight away so a failed request still closes it
+            with os.fdopen(fd, 'wb') as f:
+                client = http_clients.get_client("image_downloads", timeout=30.0)
+                async with client.stream("GET", image_url) as response:
+                    response.raise_for_status()
+                    expected_size = response.headers.get("content-length")
+                    encoded = response.headers.get("content-encoding", "identity") != "identity"
+                    
+                    # Chunks go straight to disk; file writes happen off the event loop
+                    async for chunk in response.aiter_bytes(chunk_size=self.download_chunk_size):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+            
+            if expected_size and not encoded and int(expected_size) != size:
+                raise IOError(f"Incomplete download: got {size} of {expected_size} bytes")
+            
+            # Atomic rename: readers never see a partially written image
+            await asyncio.to_thread(os.replace, tmp_path, image_path)
+            tmp_path = None
+            
+            current_span().add("bytes", size)
+            logger.info(f"Downloaded image: {image_path} ({size} bytes)")
+            return {"path": image_path, "bytes": size, "sha256": digest.hexdigest()}
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(image_url)
-                response.raise_for_status()
-                
-                with open(image_path, 'wb') as f:
-                    f.write(response.content)
-                
-                logger.info(f"Downloaded image: {image_path}")
-                return image_path
-                
         except Exception as e:
+            current_span().fail(str(e))
             logger.error(f"Error downloading image {filename}: {e}")
             return None
+        finally:
+            if tmp_path:
+                await asyncio.to_thread(Path(tmp_path).unlink, missing_ok=True)
     
+    @traced("images.manifest", kind="deterministic")
     def create_image_manifest(self, images: List[Dict], job_id: str, topic: str) -> Dict[str, Any]:
         """Create manifest file with image metadata"""
         manifest = {
@@ -418,10 +542,21 @@ class ImageGenerationAgent:
                 "style": self.style,
                 "max_images": self.max_images
             },
+            "responsive": {
+                "enabled": self.variant_processor.enabled,
+                "formats": self.variant_processor.formats,
+                "widths": self.variant_processor.widths,
+                "thumbnail_size": self.variant_processor.thumbnail_size,
+                "sizes": self.srcset_sizes,
+                "srcset": {
+                    img["filename"]: img["srcset"] for img in images if img.get("srcset")
+                }
+            },
             "usage_instructions": {
                 "wordpress": "Upload images to WordPress media library and insert using placement suggestions",
                 "markdown": "Reference images using relative paths: ![alt_text](relative_path)",
-                "html": "Use <img> tags with alt attributes for accessibility"
+                "html": "Use <img> tags with alt attributes for accessibility",
+                "responsive": "Wrap each image in <picture> with one <source type=\"image/<format>\" srcset=\"...\" sizes=\"...\"> per responsive.srcset format, keeping the PNG <img> as fallback"
             }
         }
         
@@ -469,13 +604,19 @@ class ImageGenerationAgent:
             topic_context = self._extract_main_topic(outline, content)
             prompts = self.generate_image_prompts(opportunities, topic_context)
             
-            # Step 3: Generate images
-            generated_images = []
+            # Step 3: Generate and download images concurrently (bounded per job)
+            semaphore = asyncio.Semaphore(self.max_concurrency)
             
-            for prompt_data in prompts:
-                if not self.api_key:
-                    # Create placeholder entry for missing API key
-                    placeholder = {
+            async def generate_bounded(prompt_data):
+                async with semaphore:
+                    return await self.generate_single_image(prompt_data, job_id)
+            
+            if self.api_key:
+                results = await asyncio.gather(*(generate_bounded(prompt_data) for prompt_data in prompts))
+            else:
+                # Create placeholder entries for missing API key
+                results = [
+                    {
                         "filename": f"placeholder_{prompt_data['type']}.png",
                         "path": "API_KEY_REQUIRED",
                         "relative_path": f"outputs/images/{job_id}/placeholder_{prompt_data['type']}.png",
@@ -486,20 +627,17 @@ class ImageGenerationAgent:
                         "type": prompt_data.get("type", ""),
                         "status": "api_key_required"
                     }
-                    generated_images.append(placeholder)
-                    continue
-                
-                image_result = await self.generate_single_image(prompt_data, job_id)
-                if image_result:
-                    generated_images.append(image_result)
-                
-                # Small delay between API calls
-                await asyncio.sleep(1)
+                    for prompt_data in prompts
+                ]
+            
+            # gather() keeps prompt order, which is already sorted by opportunity priority
+            generated_images = [image for image in results if image]
             
             # Step 4: Create manifest
             manifest = self.create_image_manifest(generated_images, job_id, topic_context)
             
             processing_time = time.time() - start_time
+            cache_stats = await asyncio.to_thread(self.cache.stats)
             
             result = {
                 "images": generated_images,
@@ -511,7 +649,11 @@ class ImageGenerationAgent:
                     "opportunities_identified": len(opportunities),
                     "prompts_generated": len(prompts),
                     "images_created": len([img for img in generated_images if img.get("status") != "api_key_required"]),
-                    "api_available": bool(self.api_key)
+                    "api_available": bool(self.api_key),
+                    "max_concurrency": self.max_concurrency,
+                    "images_per_minute": self.images_per_minute,
+                    "cached_images": len([img for img in generated_images if img.get("from_cache")]),
+                    "cache": cache_stats
                 }
             }
             
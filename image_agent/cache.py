@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Image Cache - Content-addressed store for generated images
+Blobs are keyed by a hash of model + prompt + size + quality + style, hard-linked
+into each job's output directory and evicted least-recently-used once the
+cache exceeds its total size bound. Responsive variants rendered from a blob are
+kept next to it, per variant settings, and linked into later jobs the same way.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "outputs" / "cache" / "images"
+
+
+def link_or_copy(source: Path, destination: Path) -> None:
+    """Hard-link source to destination, copying when linking is not possible"""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if destination.exists():
+        destination.unlink()
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Different filesystem or no hard-link support
+        shutil.copy2(source, destination)
+
+
+class ImageCache:
+    """Content-addressed image blob store with an SQLite index and byte-bounded LRU eviction"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.cache_dir = Path(cache_dir or os.getenv("IMAGE_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+        self.enabled = enabled if enabled is not None else os.getenv("IMAGE_CACHE_ENABLED", "true").lower() == "true"
+        self.db_path = self.cache_dir / "index.sqlite3"
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def make_key(model: str, prompt: str, size: str, quality: str, style: str) -> str:
+        """Cache key for one DALL-E rendering request"""
+        return hashlib.sha256("\n".join([model, prompt, size, quality, style]).encode('utf-8')).hexdigest()
+
+    def _blob_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _variants_dir(self, key: str, settings_key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{settings_key}"
+
+    def _remove_variants(self, key: str) -> None:
+        for path in self._blob_path(key).parent.glob(f"{key}.*"):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS image_cache (
+                    key TEXT PRIMARY KEY,
+                    revised_prompt TEXT,
+                    sha256 TEXT,
+                    bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_image_cache_accessed ON image_cache(last_accessed)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {'path', 'revised_prompt', 'bytes', 'sha256'} for a cached image, or None"""
+        if not self.enabled:
+            return None
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        "SELECT revised_prompt, bytes, sha256 FROM image_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    blob_path = self._blob_path(key)
+
+                    if row is None or not blob_path.exists():
+                        if row is not None:
+                            # Blob removed behind our back; drop the stale index row
+                            conn.execute("DELETE FROM image_cache WHERE key = ?", (key,))
+                            conn.commit()
+                        self.misses += 1
+                        return None
+
+                    conn.execute(
+                        "UPDATE image_cache SET last_accessed = ?, hit_count = hit_count + 1 WHERE key = ?",
+                        (time.time(), key)
+                    )
+                    conn.commit()
+                    self.hits += 1
+                    return {"path": blob_path, "revised_prompt": row[0], "bytes": row[1], "sha256": row[2]}
+                finally:
+                    conn.close()
+
+        except Exception as e:
+            logger.warning(f"Image cache read failed: {e}")
+            self.misses += 1
+            return None
+
+    def put(self, key: str, image_path: Path, revised_prompt: Optional[str] = None,
+            sha256: Optional[str] = None) -> None:
+        """Add a downloaded image to the cache and enforce the size bound"""
+        if not self.enabled:
+            return
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    blob_path = self._blob_path(key)
+                    link_or_copy(Path(image_path), blob_path)
+                    # Variants of a replaced blob no longer match it
+                    self._remove_variants(key)
+                    now = time.time()
+
+                    conn.execute(
+                        "INSERT OR REPLACE INTO image_cache (key, revised_prompt, sha256, bytes, created_at, last_accessed, hit_count) "
+                        "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                        (key, revised_prompt, sha256, blob_path.stat().st_size, now, now)
+                    )
+                    conn.commit()
+                    self._evict(conn)
+                finally:
+                    conn.close()
+
+        except Exception as e:
+            logger.warning(f"Image cache write failed: {e}")
+
+    def get_variants(self, key: str, settings_key: str, job_dir: Path, stem: str) -> Optional[Dict[str, Any]]:
+        """Link a cached image's variants into job_dir under stem, in render_variants() shape; None if not cached"""
+        if not self.enabled:
+            return None
+
+        try:
+            variants_dir = self._variants_dir(key, settings_key)
+            manifest_path = variants_dir / "variants.json"
+            if not manifest_path.exists():
+                return None
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            def link(item: Dict[str, Any], destination: Path) -> Dict[str, Any]:
+                link_or_copy(variants_dir / item["name"], destination)
+                return {**{k: v for k, v in item.items() if k != "name"}, "path": str(destination)}
+
+            return {
+                "variants": [
+                    link(item, job_dir / "variants" / f"{stem}-{item['width']}w.{item['format']}")
+                    for item in manifest["variants"]
+                ],
+                "thumbnail": link(manifest["thumbnail"], job_dir / "thumbs" / f"{stem}.{manifest['thumbnail']['format']}")
+            }
+
+        except Exception as e:
+            logger.warning(f"Image variant cache read failed: {e}")
+            return None
+
+    def put_variants(self, key: str, settings_key: str, rendered: Dict[str, Any]) -> None:
+        """Keep a cached image's rendered variants for later jobs and count them toward the size bound"""
+        if not self.enabled:
+            return
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    if conn.execute("SELECT 1 FROM image_cache WHERE key = ?", (key,)).fetchone() is None:
+                        return
+                    variants_dir = self._variants_dir(key, settings_key)
+                    manifest_path = variants_dir / "variants.json"
+                    if manifest_path.exists():
+                        return
+
+                    def store(item: Dict[str, Any], name: str) -> Dict[str, Any]:
+                        link_or_copy(Path(item["path"]), variants_dir / name)
+                        return {**{k: v for k, v in item.items() if k not in ("path", "relative_path")}, "name": name}
+
+                    variants: List[Dict[str, Any]] = [
+                        store(item, f"{item['width']}w.{item['format']}") for item in rendered["variants"]
+                    ]
+                    thumbnail = store(rendered["thumbnail"], f"thumb.{rendered['thumbnail']['format']}")
+
+                    # The manifest is written last, so a partly stored set is never used
+                    tmp_path = manifest_path.with_suffix(".tmp")
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump({"variants": variants, "thumbnail": thumbnail}, f)
+                    os.replace(tmp_path, manifest_path)
+
+                    added = sum(item["bytes"] for item in variants) + thumbnail["bytes"]
+                    conn.execute("UPDATE image_cache SET bytes = bytes + ? WHERE key = ?", (added, key))
+                    conn.commit()
+                    self._evict(conn)
+                finally:
+                    conn.close()
+
+        except Exception as e:
+            logger.warning(f"Image variant cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least-recently-used blobs until the cache fits in max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM image_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in conn.execute("SELECT key, bytes FROM image_cache ORDER BY last_accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            # Job directories hold hard links, so their copies survive eviction
+            self._blob_path(key).unlink(missing_ok=True)
+            self._remove_variants(key)
+            conn.execute("DELETE FROM image_cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        conn.commit()
+        logger.info(f"Evicted {evicted} cached images ({total} bytes remain)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus current entry count and size"""
+        entries, total_bytes = 0, 0
+        if self.enabled and self.db_path.exists():
+            try:
+                with self._lock:
+                    conn = self._connect()
+                    try:
+                        entries, total_bytes = conn.execute(
+                            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM image_cache"
+                        ).fetchone()
+                    finally:
+                        conn.close()
+            except Exception as e:
+                logger.warning(f"Image cache stats failed: {e}")
+
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": total_bytes
+        }
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Image Variants - Responsive renditions and thumbnails for generated images
+Encodes each downloaded PNG into WebP (and optionally AVIF) at a set of widths
+plus a square-bounded thumbnail. Encoding is CPU-bound, so it runs in a
+process pool instead of on the orchestrator's event loop.
+"""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+try:
+    from PIL import Image, features
+except ImportError:
+    # Pillow is optional; without it images are published as the original PNGs
+    Image = None
+    features = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def render_variants(source_path: str, output_dir: str, stem: str, widths: List[int], formats: List[str],
+                    quality: int, thumbnail_size: int) -> Dict[str, Any]:
+    """Encode resized renditions and a thumbnail of one image (runs in a worker process)"""
+    variants_dir = Path(output_dir) / "variants"
+    thumbs_dir = Path(output_dir) / "thumbs"
+    variants_dir.mkdir(parents=True, exist_ok=True)
+    thumbs_dir.mkdir(parents=True, exist_ok=True)
+
+    variants = []
+    with Image.open(source_path) as source:
+        source.load()
+        image = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+    # Never upscale: widths beyond the original collapse to the original width
+    target_widths = sorted({min(width, image.width) for width in widths})
+
+    for width in target_widths:
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            path = variants_dir / f"{stem}-{width}w.{fmt}"
+            resized.save(path, format=fmt.upper(), quality=quality)
+            variants.append({
+                "format": fmt,
+                "width": width,
+                "height": height,
+                "path": str(path),
+                "bytes": path.stat().st_size
+            })
+
+    thumb = image.copy()
+    thumb.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+    thumb_path = thumbs_dir / f"{stem}.{formats[0]}"
+    thumb.save(thumb_path, format=formats[0].upper(), quality=quality)
+
+    return {
+        "variants": variants,
+        "thumbnail": {
+            "format": formats[0],
+            "width": thumb.width,
+            "height": thumb.height,
+            "path": str(thumb_path),
+            "bytes": thumb_path.stat().st_size
+        }
+    }
+
+
+class ImageVariantProcessor:
+    """Generates responsive renditions of downloaded images in a process pool"""
+
+    def __init__(self, widths: Optional[List[int]] = None, formats: Optional[List[str]] = None,
+                 quality: Optional[int] = None, thumbnail_size: Optional[int] = None,
+                 max_workers: Optional[int] = None, enabled: Optional[bool] = None):
+        self.widths = widths or [int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "480,768,1024").split(",") if w.strip()]
+        self.formats = formats or [f.strip().lower() for f in os.getenv("IMAGE_VARIANT_FORMATS", "webp").split(",") if f.strip()]
+        self.quality = quality or int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+        self.thumbnail_size = thumbnail_size or int(os.getenv("IMAGE_THUMBNAIL_SIZE", "256"))
+        self.max_workers = max_workers or int(os.getenv("IMAGE_VARIANT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.enabled = enabled if enabled is not None else os.getenv("IMAGE_VARIANTS_ENABLED", "true").lower() == "true"
+
+        if self.enabled and Image is None:
+            logger.warning("Pillow not installed. Responsive image variants will be disabled.")
+            self.enabled = False
+
+        if self.enabled:
+            supported = [fmt for fmt in self.formats if features.check(fmt)]
+            for fmt in set(self.formats) - set(supported):
+                logger.warning(f"Pillow was built without {fmt} support; skipping {fmt} variants")
+            self.formats = supported
+            self.enabled = bool(self.formats)
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the API process runs threads (sqlite, asyncio.to_thread)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def settings_key(self) -> str:
+        """Short hash of the settings that determine the rendered files"""
+        settings = f"{sorted(self.widths)}|{self.formats}|{self.quality}|{self.thumbnail_size}"
+        return hashlib.sha256(settings.encode('utf-8')).hexdigest()[:12]
+
+    async def process(self, image_path: Path, job_dir: Path) -> Optional[Dict[str, Any]]:
+        """Return {'variants', 'thumbnail'} for an image, or None if disabled or encoding failed"""
+        if not self.enabled:
+            return None
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_pool(), render_variants,
+                str(image_path), str(job_dir), Path(image_path).stem,
+                self.widths, self.formats, self.quality, self.thumbnail_size
+            )
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM); start a fresh pool for the next image
+            logger.error(f"Variant worker crashed on {image_path}: {e}")
+            self.shutdown()
+            return None
+        except Exception as e:
+            logger.error(f"Error creating variants for {image_path}: {e}")
+            return None
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def build_srcset(variants: List[Dict[str, Any]]) -> Dict[str, str]:
+        """srcset attribute value per format, built from the variants' relative paths"""
+        srcset: Dict[str, List[str]] = {}
+        for variant in variants:
+            srcset.setdefault(variant["format"], []).append(f"{variant['relative_path']} {variant['width']}w")
+        return {fmt: ", ".join(entries) for fmt, entries in srcset.items()}
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Batch Pipeline Runner - Non-interactive pipeline runs for many topics
+Reads topics and per-topic options from a JSONL or CSV file and runs them
+through the single-session pipeline with a bounded number of concurrent jobs.
+All jobs share one process, so HTTP connection pools, the agent registry and
+the image/research caches are reused across topics. Each finished job is
+written to its own result file as soon as it completes and recorded in
+progress.jsonl; re-running the same batch skips completed jobs and resumes the
+rest from their stage checkpoints.
+
+Usage:
+    python3 pipeline_batch.py topics.jsonl --concurrency 3
+    python3 pipeline_batch.py topics.csv --name march-articles --output-dir outputs/batches
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from pipeline_single_session import SingleSessionPipelineOrchestrator
+from pipeline_core.http_clients import http_clients
+from pipeline_core.job_queue import JobQueue
+
+DEFAULT_BATCH_DIR = Path(__file__).parent / "outputs" / "batches"
+
+# Row option -> default, matching the run_pipeline() arguments
+PIPELINE_OPTIONS: Dict[str, bool] = {
+    "include_images": True,
+    "include_research": False,
+    "include_citations": False,
+    "generate_images": False,
+    "include_fact_check": False,
+}
+
+
+def parse_bool(value: Any, default: Optional[bool] = None) -> Optional[bool]:
+    """Interpret CSV/JSON option values such as "y", "true", "1" or ""."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("y", "yes", "true", "1")
+
+
+def load_topics(path: Path) -> List[Dict[str, Any]]:
+    """Read batch rows from a .jsonl or .csv file; each row needs a topic"""
+    rows: List[Dict[str, Any]] = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == ".csv":
+            rows = [dict(row) for row in csv.DictReader(f)]
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_number}: invalid JSON ({e})")
+
+    jobs = []
+    seen_ids = set()
+    for number, row in enumerate(rows, 1):
+        topic = (row.get("topic") or "").strip()
+        if not topic:
+            print(f"⚠️  Skipping row {number}: no topic")
+            continue
+
+        options = {name: parse_bool(row.get(name), default) for name, default in PIPELINE_OPTIONS.items()}
+        parallel_sections = parse_bool(row.get("parallel_sections"))
+        job_id = (row.get("id") or "").strip() or job_id_for(topic, options)
+        if job_id in seen_ids:
+            print(f"⚠️  Skipping row {number}: duplicate job {job_id}")
+            continue
+        seen_ids.add(job_id)
+
+        jobs.append({
+            "job_id": job_id,
+            "topic": topic,
+            "options": options,
+            "parallel_sections": parallel_sections,
+            "priority": int(row.get("priority") or 0)
+        })
+    return jobs
+
+
+def job_id_for(topic: str, options: Dict[str, bool]) -> str:
+    """Stable job ID so a re-run of the batch finds the same checkpoints"""
+    encoded = json.dumps({"topic": topic, "options": options}, sort_keys=True)
+    return f"batch_{hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:12]}"
+
+
+def write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    """Write JSON to a temp file, then rename, so a crash never leaves a partial result"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+class BatchRunner:
+    """Runs batch rows through the pipeline with a global concurrency budget"""
+
+    def __init__(self, output_dir: Path, concurrency: Optional[int] = None, restart: bool = False):
+        self.output_dir = output_dir
+        self.concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "3"))
+        self.restart = restart
+        self.progress_path = output_dir / "progress.jsonl"
+        self.summary: Dict[str, List[str]] = {"completed": [], "failed": [], "skipped": []}
+
+    def completed_jobs(self) -> set:
+        """Job IDs with a completed result from an earlier run of this batch"""
+        completed = set()
+        for result_file in self.output_dir.glob("*.json"):
+            try:
+                with open(result_file, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+            except Exception:
+                continue
+            if result.get("status") == "completed":
+                completed.add(result.get("job_id"))
+        return completed
+
+    def record_progress(self, entry: Dict[str, Any]) -> None:
+        """Append one line to the batch progress log"""
+        with open(self.progress_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+    async def run_job(self, job_id: str, job: Dict[str, Any]) -> None:
+        """Run one topic end to end and write its result file"""
+        started_at = time.time()
+        self.record_progress({"job_id": job_id, "event": "started", "topic": job["topic"], "at": started_at})
+
+        orchestrator = SingleSessionPipelineOrchestrator(
+            job_id=job_id,
+            resume=not self.restart,
+            section_parallel=job["parallel_sections"],
+            interactive=False
+        )
+
+        error = None
+        stages: Dict[str, Any] = {}
+        try:
+            stages = await orchestrator.run_pipeline(job["topic"], **job["options"])
+        except Exception as e:
+            error = str(e)
+
+        # Stage failures come back as "Error running <agent>: ..." text
+        if error is None and not stages:
+            error = "Pipeline returned no output"
+        if error is None:
+            failed = [stage for stage, output in stages.items() if isinstance(output, str) and output.startswith("Error")]
+            if failed:
+                error = f"Stage(s) failed: {', '.join(failed)}"
+
+        status = "failed" if error else "completed"
+        completed_at = time.time()
+        write_json_atomic(self.output_dir / f"{job_id}.json", {
+            "job_id": job_id,
+            "topic": job["topic"],
+            "options": job["options"],
+            "status": status,
+            "error": error,
+            "started_at": started_at,
+            "completed_at": completed_at,
+            "duration_seconds": round(completed_at - started_at, 2),
+            "stages": stages,
+            "token_accounting": orchestrator.token_accounting,
+            "trace": orchestrator.trace.summary()
+        })
+        self.record_progress({"job_id": job_id, "event": status, "error": error, "at": completed_at})
+        self.summary[status].append(job_id)
+        print(f"{'✅' if status == 'completed' else '❌'} [{job_id}] {job['topic']}: {status}"
+              f"{f' ({error})' if error else ''} in {completed_at - started_at:.1f}s")
+
+    async def run(self, jobs: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Run every job not already completed and return job IDs by outcome"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        done = set() if self.restart else self.completed_jobs()
+        pending = [job for job in jobs if job["job_id"] not in done]
+        self.summary["skipped"] = [job["job_id"] for job in jobs if job["job_id"] in done]
+
+        print(f"📦 Batch: {len(jobs)} topics, {len(self.summary['skipped'])} already completed, "
+              f"{len(pending)} to run with concurrency {self.concurrency}")
+        if not pending:
+            return self.summary
+
+        queue = JobQueue(self.run_job, max_workers=self.concurrency, max_queue_depth=len(pending))
+        queue.start()
+        try:
+            for job in pending:
+                queue.submit(job["job_id"], job, priority=job["priority"])
+            await queue.join()
+        finally:
+            await queue.stop()
+        return self.summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run the content pipeline for every topic in a JSONL or CSV file")
+    parser.add_argument("topics", help="JSONL or CSV file with a topic per row and optional pipeline options")
+    parser.add_argument("--concurrency", type=int, default=None, help="Pipelines to run at once (default: BATCH_CONCURRENCY or 3)")
+    parser.add_argument("--name", default=None, help="Batch name; results go to <output-dir>/<name> (default: input file name)")
+    parser.add_argument("--output-dir", default=os.getenv("BATCH_OUTPUT_DIR", str(DEFAULT_BATCH_DIR)), help="Directory for batch results")
+    parser.add_argument("--restart", action="store_true", help="Ignore earlier results and checkpoints and run every topic again")
+    args = parser.parse_args()
+
+    topics_path = Path(args.topics)
+    jobs = load_topics(topics_path)
+    output_dir = Path(args.output_dir) / (args.name or topics_path.stem)
+    runner = BatchRunner(output_dir, concurrency=args.concurrency, restart=args.restart)
+
+    start_time = time.time()
+    try:
+        summary = await runner.run(jobs)
+    finally:
+        await http_clients.aclose()
+        # The image agent is imported on first use; stop its variant workers if it was
+        image_module = sys.modules.get("image_agent.agent")
+        if image_module is not None:
+            image_module.image_agent.variant_processor.shutdown()
+
+    print("\n" + "=" * 60)
+    print(f"📊 BATCH SUMMARY ({time.time() - start_time:.1f}s)")
+    print(f"  Completed: {len(summary['completed'])}")
+    print(f"  Failed: {len(summary['failed'])}")
+    print(f"  Skipped (already completed): {len(summary['skipped'])}")
+    print(f"💾 Results in: {output_dir}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        # Ctrl-C cancels main() (its finally block still runs); asyncio.run re-raises it here
+        print("\n⚠️  Batch interrupted; re-run the same command to resume")
+        sys.exit(130)
@@ -0,0 +1,3 @@
+"""
+Pipeline Core - shared infrastructure used by the orchestrator, agents and API
+"""
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Agent Registry - Name-to-agent resolution with cached ADK Runners
+Maps pipeline agent names to the modules that define them, imports each agent
+once, and keeps one Runner per (session service, agent) so repeated stages in
+a session reuse it instead of rebuilding it.
+"""
+
+import importlib
+import logging
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+from google.adk import Runner
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+APP_NAME = "ai-content-pipeline"
+
+# Pipeline agent name -> module exposing it as root_agent
+PIPELINE_AGENTS: Dict[str, str] = {
+    "outline_generator": "outline_generator.agent",
+    "research_agent": "research_agent.agent",
+    "research_content_creator": "research_content_creator.agent",
+    "citation_agent": "citation_agent.agent",
+    "image_agent": "image_agent.agent",
+    "fact_check_agent": "fact_check_agent.agent",
+    "seo_optimizer": "seo_optimizer.agent",
+    "publishing_coordinator": "publishing_coordinator.agent",
+}
+
+
+class AgentRegistry:
+    """Resolves agent names to ADK agents and caches Runners per session service"""
+
+    def __init__(self, agents: Optional[Dict[str, str]] = None, app_name: str = APP_NAME):
+        self.app_name = app_name
+        self._modules: Dict[str, str] = dict(agents if agents is not None else PIPELINE_AGENTS)
+        self._agents: Dict[str, Any] = {}
+        # Runners die with their session service (one per pipeline orchestrator)
+        self._runners: "weakref.WeakKeyDictionary[Any, Dict[str, Runner]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, module_path: str) -> None:
+        """Add or replace an agent; module_path must expose root_agent"""
+        with self._lock:
+            self._modules[name] = module_path
+            self._agents.pop(name, None)
+            for runners in self._runners.values():
+                runners.pop(name, None)
+
+    def names(self) -> List[str]:
+        """Registered agent names, in pipeline order"""
+        return list(self._modules)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._modules
+
+    def get_agent(self, name: str) -> Any:
+        """Import (once) and return the root_agent for a registered name"""
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+
+        if name not in self._modules:
+            raise KeyError(f"Unknown agent {name}. Available agents: {', '.join(self.names())}")
+
+        with self._lock:
+            if name not in self._agents:
+                module = importlib.import_module(self._modules[name])
+                self._agents[name] = module.root_agent
+                logger.info(f"Loaded agent {name} from {self._modules[name]}")
+            return self._agents[name]
+
+    def get_runner(self, name: str, session_service: Any) -> Runner:
+        """Runner for an agent bound to a session service, created on first use"""
+        runners = self._runners.get(session_service)
+        if runners is not None and name in runners:
+            return runners[name]
+
+        agent = self.get_agent(name)
+        with self._lock:
+            runners = self._runners.setdefault(session_service, {})
+            if name not in runners:
+                runners[name] = Runner(
+                    app_name=self.app_name,
+                    agent=agent,
+                    session_service=session_service
+                )
+            return runners[name]
+
+
+# Process-wide registry shared by all orchestrators
+agent_registry = AgentRegistry()
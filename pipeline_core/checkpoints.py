@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Checkpoint Store - Per-stage pipeline outputs persisted for resume
+Each stage output is saved under outputs/checkpoints/<job_id>/<stage>.json
+together with a hash of the stage inputs, so a resumed job reuses a stage only
+when everything it was computed from is unchanged.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = Path(__file__).parent.parent / "outputs" / "checkpoints"
+
+
+class CheckpointStore:
+    """File-backed checkpoints keyed by job ID, stage name and stage inputs"""
+
+    def __init__(self, base_dir: Optional[str] = None, enabled: Optional[bool] = None):
+        self.base_dir = Path(base_dir or os.getenv("PIPELINE_CHECKPOINT_DIR", str(DEFAULT_CHECKPOINT_DIR)))
+        self.enabled = enabled if enabled is not None else os.getenv("PIPELINE_CHECKPOINTS", "true").lower() == "true"
+
+    @staticmethod
+    def inputs_key(inputs: Dict[str, Any]) -> str:
+        """Stable hash of a stage's inputs"""
+        encoded = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def _path(self, job_id: str, stage: str) -> Path:
+        return self.base_dir / job_id / f"{stage}.json"
+
+    def save(self, job_id: str, stage: str, inputs: Dict[str, Any], output: Any) -> None:
+        """Persist a stage output atomically (write to temp file, then rename)"""
+        if not self.enabled or not job_id:
+            return
+
+        path = self._path(job_id, stage)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            checkpoint = {
+                "job_id": job_id,
+                "stage": stage,
+                "inputs_key": self.inputs_key(inputs),
+                "created_at": time.time(),
+                "output": output
+            }
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to save checkpoint {job_id}/{stage}: {e}")
+
+    def load(self, job_id: str, stage: str, inputs: Dict[str, Any]) -> Optional[Any]:
+        """Return a stage output if it was checkpointed for these exact inputs"""
+        if not self.enabled or not job_id:
+            return None
+
+        path = self._path(job_id, stage)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            logger.warning(f"Unreadable checkpoint {job_id}/{stage}: {e}")
+            return None
+
+        if checkpoint.get("inputs_key") != self.inputs_key(inputs):
+            logger.info(f"Checkpoint {job_id}/{stage} is stale (inputs changed)")
+            return None
+        return checkpoint.get("output")
+
+    def stages(self, job_id: str) -> List[str]:
+        """Names of the stages checkpointed for a job"""
+        job_dir = self.base_dir / job_id
+        if not job_dir.exists():
+            return []
+        return sorted(path.stem for path in job_dir.glob("*.json"))
+
+    def clear(self, job_id: str) -> None:
+        """Delete every checkpoint for a job"""
+        shutil.rmtree(self.base_dir / job_id, ignore_errors=True)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+History Compaction - Keeps the shared pipeline session small between stages
+Every agent runs in one ADK session, so later stages would otherwise receive
+every earlier prompt, output and tool call as context. Before each agent runs,
+earlier exchanges are rewritten: outputs the next agent builds on are kept
+verbatim, everything else becomes a short structured summary, long prompts are
+truncated and tool-call chatter is dropped. Token counts before and after are
+reported so the savings can be measured per stage.
+"""
+
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Any, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Next agent -> earlier agents whose full output it works from
+DEFAULT_KEEP_FULL: Dict[str, List[str]] = {
+    "outline_generator": [],
+    "research_agent": ["outline_generator"],
+    "research_content_creator": ["outline_generator", "research_agent"],
+    "citation_agent": ["research_content_creator", "research_agent"],
+    "image_agent": ["outline_generator", "research_content_creator"],
+    "fact_check_agent": ["research_content_creator", "research_agent", "citation_agent"],
+    "seo_optimizer": ["research_content_creator", "citation_agent"],
+    "publishing_coordinator": ["research_content_creator", "citation_agent", "seo_optimizer"],
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose)"""
+    return math.ceil(len(text) / 4)
+
+
+def event_text(event: Any) -> str:
+    """Text parts of an event joined together"""
+    if not (getattr(event, "content", None) and event.content.parts):
+        return ""
+    return "".join(part.text for part in event.content.parts if part.text)
+
+
+def event_tokens(event: Any) -> int:
+    """Estimated context tokens an event contributes, including tool calls and results"""
+    if not (getattr(event, "content", None) and event.content.parts):
+        return 0
+
+    total = 0
+    for part in event.content.parts:
+        if part.text:
+            total += estimate_tokens(part.text)
+        if part.function_call:
+            total += estimate_tokens(json.dumps(part.function_call.args or {}, default=str)) + 10
+        if part.function_response:
+            total += estimate_tokens(json.dumps(part.function_response.response or {}, default=str)) + 10
+    return total
+
+
+def summarize_output(agent: str, text: str, max_headings: int = 15) -> str:
+    """Structured stand-in for an agent output that the next agent does not need in full"""
+    headings = [line.strip() for line in text.splitlines() if line.lstrip().startswith("#")]
+    lines = [f"[Earlier output from {agent}, compacted: {len(text)} chars, ~{estimate_tokens(text)} tokens]"]
+    if headings:
+        lines.append("Sections:")
+        lines.extend(f"- {heading.lstrip('#').strip()}" for heading in headings[:max_headings])
+        if len(headings) > max_headings:
+            lines.append(f"- ... {len(headings) - max_headings} more")
+    else:
+        first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+        if first_line:
+            lines.append(f"Opening: {first_line[:200]}")
+    return "\n".join(lines)
+
+
+class HistoryCompactionPolicy:
+    """Decides how earlier session exchanges are rewritten before an agent runs"""
+
+    def __init__(self, keep_full: Optional[Dict[str, List[str]]] = None, max_prompt_chars: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.keep_full = keep_full if keep_full is not None else DEFAULT_KEEP_FULL
+        self.max_prompt_chars = max_prompt_chars or int(os.getenv("PIPELINE_COMPACTION_PROMPT_CHARS", "500"))
+        self.enabled = enabled if enabled is not None else os.getenv("PIPELINE_HISTORY_COMPACTION", "true").lower() == "true"
+
+    def applies_to(self, next_agent: str) -> bool:
+        """Agents without a keep list get the full history untouched"""
+        return self.enabled and next_agent in self.keep_full
+
+    @staticmethod
+    def group_exchanges(events: List[Any]) -> List[Dict[str, Any]]:
+        """Split session events into prompt/response exchanges"""
+        exchanges: List[Dict[str, Any]] = []
+        for event in events:
+            text = event_text(event)
+            if event.author == "user" and text:
+                exchanges.append({"prompt": text, "agent": None, "response": [], "events": [event]})
+                continue
+            if not exchanges:
+                exchanges.append({"prompt": "", "agent": None, "response": [], "events": []})
+            exchange = exchanges[-1]
+            exchange["events"].append(event)
+            if text:
+                exchange["agent"] = event.author
+                exchange["response"].append(text)
+        return exchanges
+
+    def compact(self, events: List[Any], next_agent: str) -> Tuple[List[Tuple[str, str, str]], Dict[str, Any]]:
+        """Return compacted (author, role, text) messages and a token report"""
+        keep = set(self.keep_full.get(next_agent, []))
+        messages: List[Tuple[str, str, str]] = []
+        kept, summarized = [], []
+
+        for exchange in self.group_exchanges(events):
+            prompt = exchange["prompt"]
+            if prompt:
+                if len(prompt) > self.max_prompt_chars:
+                    prompt = prompt[:self.max_prompt_chars] + f"\n[... prompt truncated, {len(exchange['prompt'])} chars]"
+                messages.append(("user", "user", prompt))
+
+            agent = exchange["agent"]
+            if agent is None:
+                continue
+
+            # Tool calls and results are dropped; only the final text is carried forward
+            response = "".join(exchange["response"])
+            if agent in keep:
+                messages.append((agent, "model", response))
+                kept.append(agent)
+            else:
+                messages.append((agent, "model", summarize_output(agent, response)))
+                summarized.append(agent)
+
+        tokens_before = sum(event_tokens(event) for event in events)
+        tokens_after = sum(estimate_tokens(text) for _, _, text in messages)
+        report = {
+            "next_agent": next_agent,
+            "events_before": len(events),
+            "events_after": len(messages),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+            "kept_full": kept,
+            "summarized": summarized
+        }
+        return messages, report
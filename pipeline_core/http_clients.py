@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+HTTP Client Manager - Shared, pooled httpx.AsyncClient instances
+One keep-alive client per upstream (Perplexity, OpenAI, image downloads) so
+requests and retries reuse TCP/TLS connections instead of re-handshaking.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional 'h2' package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class HTTPClientManager:
+    """Process-wide registry of pooled async HTTP clients, one per upstream host"""
+
+    def __init__(self):
+        # Connection limits apply per client, i.e. per upstream host
+        self.max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+        self.max_keepalive = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+        self.keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http2 = HTTP2_AVAILABLE and os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
+
+        self._clients: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+
+    def get_client(self, name: str = "default", timeout: float = 30.0) -> httpx.AsyncClient:
+        """Return the shared client for an upstream, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(name)
+
+        # Pooled connections are bound to the loop that opened them
+        if entry and not entry[0].is_closed and entry[1] is loop:
+            return entry[0]
+
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry
+            )
+        )
+        self._clients[name] = (client, loop)
+        logger.info(f"Created pooled HTTP client '{name}' (http2={self.http2}, max_connections={self.max_connections})")
+        return client
+
+    async def aclose(self, name: Optional[str] = None) -> None:
+        """Close one client, or every client when no name is given"""
+        names = [name] if name else list(self._clients.keys())
+        for client_name in names:
+            entry = self._clients.pop(client_name, None)
+            if entry and not entry[0].is_closed:
+                try:
+                    await entry[0].aclose()
+                except Exception as e:
+                    logger.warning(f"Error closing HTTP client '{client_name}': {e}")
+
+
+# Shared instance used by all agents
+http_clients = HTTPClientManager()
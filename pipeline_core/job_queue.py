@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Job Queue - Bounded async worker pool with priority scheduling
+Caps how many pipeline jobs run at once, orders waiting jobs by priority
+(lower runs sooner, FIFO within a priority) and rejects submissions once the
+queue is full so a burst cannot degrade every in-flight job.
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+import os
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a queue at its depth limit"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """Priority queue drained by a fixed number of async workers"""
+
+    def __init__(self, handler: Callable[[str, Any], Awaitable[None]], max_workers: Optional[int] = None,
+                 max_queue_depth: Optional[int] = None, default_job_seconds: Optional[float] = None):
+        self.handler = handler
+        self.max_workers = max_workers or int(os.getenv("MAX_CONCURRENT_JOBS", "5"))
+        self.max_queue_depth = max_queue_depth or int(os.getenv("MAX_QUEUE_DEPTH", "50"))
+
+        # Running average of job duration, seeded until real jobs complete
+        self.avg_job_seconds = default_job_seconds or float(os.getenv("DEFAULT_JOB_SECONDS", "180"))
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._queued_priorities: List[int] = []
+        self._queued_jobs: List[str] = []
+        self._running_jobs: Set[str] = set()
+        self.running = 0
+        self.completed = 0
+
+    def start(self) -> None:
+        """Spawn the worker tasks on the running event loop"""
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(worker_id))
+            for worker_id in range(self.max_workers)
+        ]
+        logger.info(f"Job queue started with {self.max_workers} workers (max depth {self.max_queue_depth})")
+
+    async def stop(self) -> List[str]:
+        """Cancel the workers and drop queued jobs; returns the IDs of jobs left unfinished"""
+        unfinished = list(self._running_jobs) + list(self._queued_jobs)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._queued_jobs.clear()
+        self._queued_priorities.clear()
+        return unfinished
+
+    async def join(self) -> None:
+        """Wait until every submitted job has been handled"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def job_ids(self) -> List[str]:
+        """IDs of the jobs this queue is running or holding"""
+        return list(self._running_jobs) + list(self._queued_jobs)
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return len(self._queued_priorities)
+
+    def check_capacity(self) -> None:
+        """Raise QueueFullError if a job submitted now would be rejected"""
+        if self.depth >= self.max_queue_depth:
+            raise QueueFullError(
+                f"Job queue is full ({self.depth} jobs waiting)",
+                retry_after=self.retry_after()
+            )
+
+    def submit(self, job_id: str, payload: Any, priority: int = 0) -> float:
+        """Queue a job and return its estimated seconds until completion"""
+        if self._queue is None:
+            raise RuntimeError("Job queue has not been started")
+
+        self.check_capacity()
+
+        estimate = self.estimate_completion(priority)
+        self._queued_priorities.append(priority)
+        self._queued_jobs.append(job_id)
+        self._queue.put_nowait((priority, next(self._sequence), job_id, payload))
+        logger.info(f"Queued job {job_id} (priority {priority}, depth {self.depth}, running {self.running})")
+        return estimate
+
+    def estimate_completion(self, priority: int = 0) -> float:
+        """Estimated seconds until a job submitted now at this priority finishes"""
+        # Jobs at the same or better priority are served first
+        ahead = sum(1 for queued in self._queued_priorities if queued <= priority)
+        busy = self.running + ahead
+
+        # Full "waves" of work to clear before a worker is free for this job
+        waves = math.ceil((busy - self.max_workers + 1) / self.max_workers) if busy >= self.max_workers else 0
+        return (waves + 1) * self.avg_job_seconds
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait before resubmitting"""
+        return max(1, math.ceil(self.avg_job_seconds / self.max_workers))
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            priority, _, job_id, payload = await self._queue.get()
+            self._queued_priorities.remove(priority)
+            self._queued_jobs.remove(job_id)
+            self._running_jobs.add(job_id)
+            self.running += 1
+            start_time = time.time()
+            try:
+                await self.handler(job_id, payload)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed job {job_id}: {e}")
+            finally:
+                self._running_jobs.discard(job_id)
+                self.running -= 1
+                self.completed += 1
+                duration = time.time() - start_time
+                # Exponential moving average keeps estimates tracking recent load
+                self.avg_job_seconds = 0.8 * self.avg_job_seconds + 0.2 * duration
+                self._queue.task_done()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Job Store - Persistent storage for API job state
+Pluggable backends behind one interface: SQLite by default, so jobs survive
+restarts and are shared by every uvicorn worker, and an in-memory store for
+single-process development.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_STORE_PATH = Path(__file__).parent.parent / "api" / "jobs" / "jobs.sqlite3"
+
+# Fields kept in their own indexed/queryable columns; everything else lives in a JSON blob
+COLUMN_FIELDS = ("status", "progress", "current_stage", "created_at", "updated_at")
+DATETIME_FIELDS = ("created_at", "updated_at", "estimated_completion", "completed_at", "heartbeat_at", "resumed_at")
+
+
+class JobStore:
+    """Interface for job state storage"""
+
+    def create(self, job_id: str, job_info: Dict[str, Any]) -> None:
+        """Insert a new job"""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's info, or None if unknown"""
+        raise NotImplementedError
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        """Atomically merge fields into a job; False if the job does not exist"""
+        raise NotImplementedError
+
+    def list_jobs(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Jobs newest first, each with its job_id, optionally filtered by status"""
+        raise NotImplementedError
+
+    def count(self, statuses: Optional[List[str]] = None) -> int:
+        """Number of jobs, optionally only those in the given statuses"""
+        raise NotImplementedError
+
+    def delete_older_than(self, cutoff: datetime) -> List[str]:
+        """Delete jobs created before cutoff and return their ids"""
+        raise NotImplementedError
+
+    # Async variants for request handlers: the blocking calls (SQLite may wait on another
+    # worker's write lock) run in a thread so the event loop keeps serving other requests
+
+    async def acreate(self, job_id: str, job_info: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.create, job_id, job_info)
+
+    async def aget(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, job_id)
+
+    async def aupdate(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(self.update, job_id, fields)
+
+    async def alist_jobs(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.list_jobs, status, limit)
+
+    async def acount(self, statuses: Optional[List[str]] = None) -> int:
+        return await asyncio.to_thread(self.count, statuses)
+
+    async def adelete_older_than(self, cutoff: datetime) -> List[str]:
+        return await asyncio.to_thread(self.delete_older_than, cutoff)
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local dict store (jobs are lost on restart and not shared between workers)"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, job_info: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id] = dict(job_info)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job_info = self._jobs.get(job_id)
+            return dict(job_info) if job_info is not None else None
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            if job_id not in self._jobs:
+                return False
+            self._jobs[job_id].update(fields)
+            return True
+
+    def list_jobs(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = [
+                {**job_info, "job_id": job_id}
+                for job_id, job_info in self._jobs.items()
+                if status is None or job_info.get("status") == status
+            ]
+        jobs.sort(key=lambda job: job["created_at"], reverse=True)
+        return jobs[:limit] if limit else jobs
+
+    def count(self, statuses: Optional[List[str]] = None) -> int:
+        with self._lock:
+            if statuses is None:
+                return len(self._jobs)
+            return sum(1 for job_info in self._jobs.values() if job_info.get("status") in statuses)
+
+    def delete_older_than(self, cutoff: datetime) -> List[str]:
+        with self._lock:
+            expired = [job_id for job_id, job_info in self._jobs.items()
+                       if job_info.get("created_at") and job_info["created_at"] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return expired
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite-backed job store, safe to share between processes"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = Path(db_path or os.getenv("JOB_STORE_PATH", str(DEFAULT_JOB_STORE_PATH)))
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        if not self._initialized:
+            # WAL lets status reads from other workers proceed during writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    current_stage TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    data TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _encode(value: Any) -> Any:
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    @staticmethod
+    def _split_fields(fields: Dict[str, Any]):
+        """Separate column values (datetimes as timestamps) from JSON blob values"""
+        columns = {}
+        data = {}
+        for key, value in fields.items():
+            if key in COLUMN_FIELDS:
+                columns[key] = value.timestamp() if isinstance(value, datetime) else value
+            else:
+                data[key] = SQLiteJobStore._encode(value)
+        return columns, data
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job_info = json.loads(row["data"])
+        for key in DATETIME_FIELDS:
+            if isinstance(job_info.get(key), str):
+                job_info[key] = datetime.fromisoformat(job_info[key])
+        job_info.update({
+            "status": row["status"],
+            "progress": row["progress"],
+            "current_stage": row["current_stage"],
+            "created_at": datetime.fromtimestamp(row["created_at"]),
+            "updated_at": datetime.fromtimestamp(row["updated_at"])
+        })
+        return job_info
+
+    def create(self, job_id: str, job_info: Dict[str, Any]) -> None:
+        now = datetime.now()
+        columns, data = self._split_fields(job_info)
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, status, progress, current_stage, created_at, updated_at, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job_id,
+                        columns.get("status", "queued"),
+                        columns.get("progress", 0),
+                        columns.get("current_stage"),
+                        columns.get("created_at", now.timestamp()),
+                        columns.get("updated_at", now.timestamp()),
+                        json.dumps(data, default=str)
+                    )
+                )
+            finally:
+                conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row) if row else None
+        finally:
+            conn.close()
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        columns, data = self._split_fields(fields)
+        with self._lock:
+            conn = self._connect()
+            try:
+                # BEGIN IMMEDIATE takes the write lock up front, so the
+                # read-merge-write of the JSON blob cannot interleave with another worker
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                    if row is None:
+                        conn.execute("ROLLBACK")
+                        return False
+
+                    assignments = [f"{column} = ?" for column in columns]
+                    values = list(columns.values())
+                    if data:
+                        merged = {**json.loads(row[0]), **data}
+                        assignments.append("data = ?")
+                        values.append(json.dumps(merged, default=str))
+
+                    if assignments:
+                        conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE job_id = ?", (*values, job_id))
+                    conn.execute("COMMIT")
+                    return True
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+
+    def list_jobs(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM jobs"
+        params: List[Any] = []
+        if status is not None:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            return [{**self._row_to_job(row), "job_id": row["job_id"]} for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def count(self, statuses: Optional[List[str]] = None) -> int:
+        conn = self._connect()
+        try:
+            if statuses is None:
+                return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            placeholders = ", ".join("?" for _ in statuses)
+            return conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({placeholders})", list(statuses)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def delete_older_than(self, cutoff: datetime) -> List[str]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Both statements are range scans on idx_jobs_created_at
+                    expired = [row[0] for row in conn.execute(
+                        "SELECT job_id FROM jobs WHERE created_at < ?", (cutoff.timestamp(),)
+                    )]
+                    conn.execute("DELETE FROM jobs WHERE created_at < ?", (cutoff.timestamp(),))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                return expired
+            finally:
+                conn.close()
+
+
+def create_job_store(backend: Optional[str] = None) -> JobStore:
+    """Build the job store selected by JOB_STORE_BACKEND (sqlite or memory)"""
+    backend = (backend or os.getenv("JOB_STORE_BACKEND", "sqlite")).lower()
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend != "sqlite":
+        logger.warning(f"Unknown JOB_STORE_BACKEND '{backend}', using sqlite")
+    return SQLiteJobStore()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Sliding-window limiter for upstream API quotas
+Callers await acquire() before each request; at most max_calls requests start
+in any rolling period (e.g. OpenAI's images-per-minute limit).
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque
+
+
+class AsyncRateLimiter:
+    """Allow at most max_calls acquisitions per rolling period (seconds)"""
+
+    def __init__(self, max_calls: int, period: float = 60.0):
+        self.max_calls = max(1, max_calls)
+        self.period = period
+        self._calls: Deque[float] = deque()
+
+    async def acquire(self) -> None:
+        """Wait until a call slot is free, then claim it"""
+        # No await between the check and the append, so this is race-free on one loop
+        while True:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= self.period:
+                self._calls.popleft()
+
+            if len(self._calls) < self.max_calls:
+                self._calls.append(now)
+                return
+
+            await asyncio.sleep(self.period - (now - self._calls[0]))
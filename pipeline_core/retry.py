@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Retry Policy - Shared retry engine for upstream API calls
+Classifies each failure (rate limit, server error, timeout, connection error),
+applies that class's rule, and sleeps with exponential backoff and full jitter
+so concurrent jobs spread their retries instead of hitting a provider in
+lockstep. A Retry-After (or retry-after-ms) header sets the minimum wait. Every
+job has a retry budget shared by all its calls, so a degraded provider cannot
+multiply one job's traffic. Retry counts and backoff time are recorded on the
+current tracing span and in process-wide per-service metrics.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Any
+
+import httpx
+
+from pipeline_core.tracing import current_span
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408: "timeout", 429: "rate_limit", 500: "server", 502: "server", 503: "server", 504: "server"}
+
+
+class RetryRule:
+    """How often and how patiently one error class is retried"""
+
+    __slots__ = ("max_retries", "base_delay", "max_delay")
+
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, retry_number: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential delay"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry_number))
+
+
+# Error class -> rule; classes without a rule are not retried
+DEFAULT_RULES: Dict[str, RetryRule] = {
+    "rate_limit": RetryRule(max_retries=4, base_delay=2.0, max_delay=60.0),
+    "server": RetryRule(max_retries=3, base_delay=1.0, max_delay=20.0),
+    "timeout": RetryRule(max_retries=2, base_delay=1.0, max_delay=10.0),
+    "connection": RetryRule(max_retries=3, base_delay=0.5, max_delay=10.0),
+}
+
+
+class RetryBudget:
+    """Retries one job may spend across all of its upstream calls"""
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit if limit is not None else int(os.getenv("RETRY_BUDGET_PER_JOB", "20"))
+        self.spent = 0
+
+    def take(self) -> bool:
+        """Claim one retry; False once the budget is exhausted"""
+        if self.spent >= self.limit:
+            return False
+        self.spent += 1
+        return True
+
+
+_current_budget: ContextVar[Optional[RetryBudget]] = ContextVar("retry_budget", default=None)
+
+
+@contextmanager
+def retry_budget(limit: Optional[int] = None) -> Iterator[RetryBudget]:
+    """Give the calls made inside this block (one job) a shared retry budget"""
+    active = _current_budget.get()
+    if active is not None:
+        # A job resumed inside another job's context keeps the outer budget
+        yield active
+        return
+
+    budget = RetryBudget(limit)
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        try:
+            _current_budget.reset(token)
+        except ValueError:
+            _current_budget.set(None)
+
+
+class RetryMetrics:
+    """Process-wide retry counters per service"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._services: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, service: str, event: str, error_class: Optional[str] = None, backoff: float = 0.0) -> None:
+        with self._lock:
+            stats = self._services.setdefault(service, {
+                "calls": 0, "retries": 0, "backoff_seconds": 0.0, "gave_up": 0, "budget_exhausted": 0, "by_class": {}
+            })
+            stats[event] += 1
+            if event == "retries":
+                stats["backoff_seconds"] += backoff
+                stats["by_class"][error_class] = stats["by_class"].get(error_class, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of the counters, with backoff time rounded"""
+        with self._lock:
+            return {
+                service: {**stats, "by_class": dict(stats["by_class"]), "backoff_seconds": round(stats["backoff_seconds"], 2)}
+                for service, stats in self._services.items()
+            }
+
+
+retry_metrics = RetryMetrics()
+
+
+def classify_response(response: httpx.Response) -> Optional[str]:
+    """Error class of a response, or None when it should not be retried"""
+    return RETRYABLE_STATUS.get(response.status_code)
+
+
+def classify_exception(error: Exception) -> Optional[str]:
+    """Error class of a transport exception, or None when it should not be retried"""
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.TransportError):
+        return "connection"
+    return None
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds requested by retry-after-ms or Retry-After (delta seconds or HTTP date)"""
+    retry_after_ms = response.headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = response.headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Retries an async HTTP call according to per-error-class rules"""
+
+    def __init__(self, service: str, rules: Optional[Dict[str, Optional[RetryRule]]] = None,
+                 max_retry_after: Optional[float] = None):
+        self.service = service
+        self.rules = {name: rule for name, rule in {**DEFAULT_RULES, **(rules or {})}.items() if rule is not None}
+        # A provider asking for a longer wait than this is treated as a final failure
+        self.max_retry_after = max_retry_after or float(os.getenv("RETRY_MAX_RETRY_AFTER", "60"))
+
+    async def call(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Run send() until it succeeds or is not retryable; returns the last response
+
+        Transport errors are re-raised once retries for their class run out.
+        """
+        retries: Dict[str, int] = {}
+        retry_metrics.record(self.service, "calls")
+        while True:
+            response = None
+            try:
+                response = await send()
+            except Exception as e:
+                error_class = classify_exception(e)
+                if not await self._wait(error_class, retries, None, str(e) or type(e).__name__):
+                    raise
+                continue
+
+            error_class = classify_response(response)
+            if error_class is None or not await self._wait(error_class, retries, response, f"HTTP {response.status_code}"):
+                return response
+
+    async def _wait(self, error_class: Optional[str], retries: Dict[str, int], response: Optional[httpx.Response],
+                    reason: str) -> bool:
+        """Sleep before the next attempt; False when the failure is final"""
+        rule = self.rules.get(error_class) if error_class else None
+        if rule is None:
+            return False
+
+        attempt = retries.get(error_class, 0)
+        if attempt >= rule.max_retries:
+            retry_metrics.record(self.service, "gave_up")
+            return False
+
+        delay = rule.backoff(attempt)
+        retry_after = parse_retry_after(response) if response is not None else None
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                logger.warning(f"{self.service}: Retry-After {retry_after:.0f}s exceeds {self.max_retry_after:.0f}s, giving up")
+                retry_metrics.record(self.service, "gave_up")
+                return False
+            # Wait at least as long as asked, jittered so callers told the same time do not return together
+            delay = retry_after + random.uniform(0, rule.base_delay)
+
+        budget = _current_budget.get()
+        if budget is not None and not budget.take():
+            logger.warning(f"{self.service}: job retry budget ({budget.limit}) exhausted, not retrying {reason}")
+            retry_metrics.record(self.service, "budget_exhausted")
+            return False
+
+        retries[error_class] = attempt + 1
+        retry_metrics.record(self.service, "retries", error_class, delay)
+        retry_span = current_span()
+        retry_span.add("retries")
+        retry_span.add("retry.backoff_seconds", round(delay, 3))
+
+        logger.warning(f"{self.service}: {reason} ({error_class}), retry {attempt + 1}/{rule.max_retries} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        return True
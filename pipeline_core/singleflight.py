@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Single Flight - Coalesce concurrent identical async calls
+While a call for a key is in flight, later callers with the same key wait for
+its result instead of starting their own. The call runs as its own task, so a
+cancelled caller does not cancel it for the others. Nothing is kept once the
+call completes; caching finished results is left to the caller.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Shares one in-flight call per key among concurrent callers"""
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of func() for this key, and whether it came from another caller's call"""
+        loop = asyncio.get_running_loop()
+        # Tasks belong to one event loop, so callers on different loops never share
+        flight_key = (id(loop), key)
+
+        with self._lock:
+            self.calls += 1
+            task = self._inflight.get(flight_key)
+            shared = task is not None
+            if shared:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(func())
+                self._inflight[flight_key] = task
+                task.add_done_callback(lambda done: self._forget(flight_key, done))
+
+        if shared:
+            logger.info(f"{self.name}: joined in-flight call {key[:12]}")
+        return await asyncio.shield(task), shared
+
+    def _forget(self, flight_key: Tuple[int, str], task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(flight_key) is task:
+                del self._inflight[flight_key]
+        # Retrieve the exception so an unawaited failure is not reported as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, coalesced calls and the share of calls that did not reach upstream"""
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.calls - self.coalesced,
+            "coalesced": self.coalesced,
+            "coalescing_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "in_flight": self.in_flight
+        }
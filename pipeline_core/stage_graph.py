@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Stage Graph - Declarative DAG scheduler for pipeline stages
+Each stage declares the artifacts it consumes and produces; every stage whose
+inputs are available is started concurrently on the running event loop.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+StageCallback = Callable[[str], Awaitable[None]]
+
+
+@dataclass
+class Stage:
+    """A single pipeline stage and the artifacts it reads and writes"""
+    name: str
+    run: StageFunc
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    enabled: bool = True
+
+
+class StageGraphError(Exception):
+    """Raised when a stage graph is malformed (missing producer or cycle)"""
+
+
+class StageGraph:
+    """Runs a set of stages as a dependency graph, overlapping independent stages"""
+
+    def __init__(self, stages: Optional[List[Stage]] = None):
+        self.stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, float] = {}
+        for stage in stages or []:
+            self.add(stage)
+
+    def add(self, stage: Stage) -> "StageGraph":
+        """Register a stage; names must be unique within a graph"""
+        if stage.name in self.stages:
+            raise StageGraphError(f"Duplicate stage name: {stage.name}")
+        self.stages[stage.name] = stage
+        return self
+
+    def validate(self, available: List[str]) -> None:
+        """Check every input has a producer and the graph is acyclic"""
+        producers = {}
+        for stage in self.stages.values():
+            for output in stage.outputs:
+                if output in producers:
+                    raise StageGraphError(f"Artifact '{output}' produced by both {producers[output]} and {stage.name}")
+                producers[output] = stage.name
+
+        for stage in self.stages.values():
+            for artifact in stage.inputs:
+                if artifact not in producers and artifact not in available:
+                    raise StageGraphError(f"Stage {stage.name} needs '{artifact}' but nothing produces it")
+
+        # Kahn's algorithm over stage -> stage edges
+        depends_on = {
+            name: {producers[a] for a in stage.inputs if a in producers}
+            for name, stage in self.stages.items()
+        }
+        resolved = set()
+        while len(resolved) < len(depends_on):
+            ready = [n for n, deps in depends_on.items() if n not in resolved and deps <= resolved]
+            if not ready:
+                cycle = sorted(set(depends_on) - resolved)
+                raise StageGraphError(f"Stage graph has a cycle among: {', '.join(cycle)}")
+            resolved.update(ready)
+
+    async def run(self, initial: Optional[Dict[str, Any]] = None,
+                  on_stage_start: Optional[StageCallback] = None,
+                  on_stage_complete: Optional[StageCallback] = None) -> Dict[str, Any]:
+        """Execute all stages, starting each one as soon as its inputs exist"""
+        artifacts: Dict[str, Any] = dict(initial or {})
+        self.validate(list(artifacts.keys()))
+
+        # Disabled stages still "produce" their outputs (as None) so dependents can run
+        pending = {}
+        for name, stage in self.stages.items():
+            if stage.enabled:
+                pending[name] = stage
+            else:
+                for output in stage.outputs:
+                    artifacts.setdefault(output, None)
+
+        running: Dict[asyncio.Task, str] = {}
+        started_at: Dict[str, float] = {}
+
+        try:
+            while pending or running:
+                ready = [s for s in pending.values() if all(a in artifacts for a in s.inputs)]
+                for stage in ready:
+                    del pending[stage.name]
+                    if on_stage_start:
+                        await on_stage_start(stage.name)
+                    stage_inputs = {a: artifacts[a] for a in stage.inputs}
+                    started_at[stage.name] = time.time()
+                    task = asyncio.create_task(stage.run(stage_inputs))
+                    running[task] = stage.name
+                    logger.info(f"Stage started: {stage.name}")
+
+                if not running:
+                    blocked = ', '.join(sorted(pending))
+                    raise StageGraphError(f"No runnable stages; blocked: {blocked}")
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    result = task.result()
+                    self.timings[name] = time.time() - started_at[name]
+
+                    stage = self.stages[name]
+                    for output in stage.outputs:
+                        artifacts[output] = (result or {}).get(output)
+
+                    logger.info(f"Stage completed: {name} in {self.timings[name]:.2f}s")
+                    if on_stage_complete:
+                        await on_stage_complete(name)
+        finally:
+            # A failed stage aborts the graph; don't leave siblings running, and let their
+            # cancellation finish before the failure propagates
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return artifacts
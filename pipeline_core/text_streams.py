@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Text Streams - In-process fan-out of live agent output per job
+The pipeline publishes text deltas as agents generate them; any number of
+subscribers (e.g. SSE clients) receive them live. Each job keeps the text of
+the agent currently running so a late subscriber starts with what it missed.
+Deltas of sections drafted concurrently carry their section and are buffered
+per section, so a late subscriber gets each section's text in one piece.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class _JobChannel:
+    """Live state for one job: current agent, its text so far, subscribers"""
+
+    __slots__ = ("agent", "buffer", "subscribers", "closed")
+
+    def __init__(self):
+        self.agent: Optional[str] = None
+        self.buffer: Dict[Optional[str], List[str]] = {}  # section (None when untagged) -> text
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.closed = False
+
+
+class TextStreamHub:
+    """Publish/subscribe hub for agent text deltas, keyed by job ID"""
+
+    def __init__(self):
+        self._channels: Dict[str, _JobChannel] = {}
+
+    def publish(self, job_id: str, agent: str, text: str, section: Optional[str] = None) -> None:
+        """Send a text delta from an agent (and section, if any) to every subscriber of the job"""
+        channel = self._channels.setdefault(job_id, _JobChannel())
+        if channel.agent != agent:
+            # New stage: subscribers joining from now on only need this agent's text
+            channel.agent = agent
+            channel.buffer = {}
+            self._broadcast(channel, {"event": "agent_start", "agent": agent})
+
+        channel.buffer.setdefault(section, []).append(text)
+        self._broadcast(channel, self._delta(agent, text, section))
+
+    def close(self, job_id: str, status: str) -> None:
+        """Mark a job's stream finished and release its buffered text"""
+        channel = self._channels.pop(job_id, None)
+        if channel is None:
+            return
+        channel.closed = True
+        self._broadcast(channel, {"event": "done", "status": status})
+
+    def active_jobs(self) -> List[str]:
+        """Job IDs with a live channel"""
+        return list(self._channels)
+
+    async def subscribe(self, job_id: str, timeout: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield events for a job until it closes; yields None after timeout seconds of silence"""
+        channel = self._channels.setdefault(job_id, _JobChannel())
+        queue: asyncio.Queue = asyncio.Queue()
+
+        # Catch up on the running agent's output before going live
+        if channel.agent is not None:
+            queue.put_nowait({"event": "agent_start", "agent": channel.agent})
+            for section, parts in channel.buffer.items():
+                queue.put_nowait(self._delta(channel.agent, "".join(parts), section))
+        channel.subscribers.add(queue)
+
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                yield event
+                if event["event"] == "done":
+                    return
+        finally:
+            channel.subscribers.discard(queue)
+            # Drop channels that only ever had listeners (job never published)
+            if not channel.subscribers and channel.agent is None and self._channels.get(job_id) is channel:
+                del self._channels[job_id]
+
+    @staticmethod
+    def _delta(agent: str, text: str, section: Optional[str]) -> Dict[str, Any]:
+        event = {"event": "delta", "agent": agent, "text": text}
+        if section is not None:
+            event["section"] = section
+        return event
+
+    @staticmethod
+    def _broadcast(channel: _JobChannel, event: Dict[str, Any]) -> None:
+        for queue in channel.subscribers:
+            queue.put_nowait(event)
+
+
+# Process-wide hub shared by the pipeline runner and streaming endpoints
+text_streams = TextStreamHub()
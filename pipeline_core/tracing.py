@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Tracing - Lightweight spans for pipeline stages, model calls and I/O
+Each job gets a Trace; while it is active, span() records a timed, nested span
+for stages, LLM calls, Perplexity and DALL-E requests, downloads and the
+deterministic steps in between, with counters for tokens, bytes and retries.
+Spans follow the asyncio task (and asyncio.to_thread) that opened them through
+context variables, so concurrent stages nest correctly. Outside an active trace
+span() is a no-op. A finished trace exports as JSONL (one span per line) and as
+OTLP/JSON, which OpenTelemetry collectors and viewers accept.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_DIR = Path(__file__).parent.parent / "outputs" / "traces"
+SERVICE_NAME = "ai-content-pipeline"
+
+# Counter attributes summed across spans in the trace summary
+COUNTERS = ("tokens.prompt", "tokens.output", "bytes", "retries", "retry.backoff_seconds")
+
+# Span kinds that talk to another service are exported as OTLP CLIENT spans
+CLIENT_KINDS = ("llm", "http")
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("pipeline_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("pipeline_span", default=None)
+
+
+class Span:
+    """One timed operation with attributes and counters"""
+
+    __slots__ = ("name", "kind", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, kind: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an attribute"""
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float = 1) -> None:
+        """Increment a counter attribute (tokens, bytes, retries, ...)"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, error: str) -> None:
+        """Mark the span as failed without raising"""
+        self.status = "error"
+        self.error = error
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end (or to now while still open)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self, trace_id: str) -> Dict[str, Any]:
+        return {
+            "trace_id": trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_ns / 1e9,
+            "end_time": self.end_ns / 1e9 if self.end_ns else None,
+            "duration_seconds": round(self.duration, 4),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when no trace is active; every call does nothing"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: float = 1) -> None:
+        pass
+
+    def fail(self, error: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """All spans recorded for one pipeline job"""
+
+    def __init__(self, job_id: str, enabled: Optional[bool] = None):
+        self.job_id = job_id
+        self.trace_id = secrets.token_hex(16)
+        self.enabled = enabled if enabled is not None else os.getenv("PIPELINE_TRACING", "true").lower() == "true"
+        self.spans: List[Span] = []
+
+    @contextmanager
+    def activate(self, name: str = "pipeline", **attributes) -> Iterator[Any]:
+        """Make this the current trace and open its root span for the duration"""
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        trace_token = _current_trace.set(self)
+        span_token = _current_span.set(None)
+        try:
+            with span(name, kind="job", job_id=self.job_id, **attributes) as root:
+                yield root
+        finally:
+            _reset(_current_span, span_token, None)
+            _reset(_current_trace, trace_token, None)
+
+    def summary(self, slowest: int = 5) -> Dict[str, Any]:
+        """Where the time went: per-stage and per-kind durations, counter totals, slowest spans"""
+        if not self.spans:
+            return {"trace_id": self.trace_id, "span_count": 0}
+
+        start_ns = min(s.start_ns for s in self.spans)
+        end_ns = max(s.end_ns or time.time_ns() for s in self.spans)
+
+        kinds_by_id = {s.span_id: s.kind for s in self.spans}
+        stages: Dict[str, float] = {}
+        by_kind: Dict[str, Dict[str, Any]] = {}
+        totals = {counter: 0 for counter in COUNTERS}
+        for s in self.spans:
+            # A stage that falls back to another stage runner is counted once, at the outer span
+            if s.kind == "stage" and kinds_by_id.get(s.parent_id) != "stage":
+                stages[s.name] = round(stages.get(s.name, 0) + s.duration, 2)
+            kind = by_kind.setdefault(s.kind, {"count": 0, "seconds": 0.0, "errors": 0})
+            kind["count"] += 1
+            kind["seconds"] += s.duration
+            kind["errors"] += s.status == "error"
+            for counter in COUNTERS:
+                totals[counter] += s.attributes.get(counter, 0)
+
+        for kind in by_kind.values():
+            kind["seconds"] = round(kind["seconds"], 2)
+        totals = {counter: round(value, 3) for counter, value in totals.items()}
+
+        leaves = sorted((s for s in self.spans if s.kind not in ("job", "stage")), key=lambda s: s.duration, reverse=True)
+        return {
+            "trace_id": self.trace_id,
+            "span_count": len(self.spans),
+            "total_seconds": round((end_ns - start_ns) / 1e9, 2),
+            "stages": stages,
+            "by_kind": by_kind,
+            "totals": totals,
+            "slowest": [{"name": s.name, "kind": s.kind, "seconds": round(s.duration, 2)} for s in leaves[:slowest]]
+        }
+
+    def to_jsonl(self) -> str:
+        """One JSON object per span, in start order"""
+        ordered = sorted(self.spans, key=lambda s: s.start_ns)
+        return "".join(json.dumps(s.to_dict(self.trace_id), default=str) + "\n" for s in ordered)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON ExportTraceServiceRequest for this trace"""
+        spans = []
+        for s in self.spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                # SPAN_KIND_CLIENT = 3, SPAN_KIND_INTERNAL = 1
+                "kind": 3 if s.kind in CLIENT_KINDS else 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                "attributes": _otlp_attributes({"pipeline.kind": s.kind, **s.attributes}),
+                # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+                "status": {"code": 2, "message": s.error or ""} if s.status == "error" else {"code": 1}
+            }
+            if s.parent_id:
+                otlp_span["parentSpanId"] = s.parent_id
+            spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, "pipeline.job_id": self.job_id})},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}]
+            }]
+        }
+
+    def export(self, directory: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Write <job_id>.trace.jsonl and <job_id>.otlp.json; returns their paths"""
+        if not self.enabled or not self.spans:
+            return None
+
+        base_dir = Path(directory or os.getenv("PIPELINE_TRACE_DIR", str(DEFAULT_TRACE_DIR)))
+        try:
+            base_dir.mkdir(parents=True, exist_ok=True)
+            jsonl_path = base_dir / f"{self.job_id}.trace.jsonl"
+            otlp_path = base_dir / f"{self.job_id}.otlp.json"
+            jsonl_path.write_text(self.to_jsonl(), encoding='utf-8')
+            otlp_path.write_text(json.dumps(self.to_otlp(), default=str), encoding='utf-8')
+        except Exception as e:
+            logger.warning(f"Failed to export trace for {self.job_id}: {e}")
+            return None
+        return {"jsonl": str(jsonl_path), "otlp": str(otlp_path)}
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Any]:
+    """Record a span under the current one; a no-op when no trace is active"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(name, kind, parent.span_id if parent else None, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _reset(_current_span, token, parent)
+
+
+def current_span() -> Any:
+    """The innermost open span, or a no-op span outside a trace"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str, kind: str = "internal"):
+    """Decorator recording each call of a sync or async function as a span"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _reset(var: ContextVar, token: Any, fallback: Any) -> None:
+    # Async generators can be finalized in another context, where the token is invalid
+    try:
+        var.reset(token)
+    except ValueError:
+        var.set(fallback)
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """OTLP AnyValue key/value list"""
+    encoded = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            any_value = {"boolValue": value}
+        elif isinstance(value, int):
+            any_value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            any_value = {"doubleValue": value}
+        elif isinstance(value, str):
+            any_value = {"stringValue": value}
+        else:
+            any_value = {"stringValue": json.dumps(value, default=str)}
+        encoded.append({"key": key, "value": any_value})
+    return encoded
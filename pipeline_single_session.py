@@ -24,14 +24,26 @@ for agent_dir in ['outline_generator', 'research_content_creator', 'seo_optimize
 # Add agent directories to path for imports
 sys.path.append('/home/joel/ai-content-pipeline')
 
-from google.adk import Runner
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+from pipeline_core.agent_registry import agent_registry
+from pipeline_core.checkpoints import CheckpointStore
+from pipeline_core.history_compaction import HistoryCompactionPolicy
+from pipeline_core.http_clients import http_clients
+from pipeline_core.retry import retry_budget
+from pipeline_core.stage_graph import Stage, StageGraph
+from pipeline_core.tracing import Trace, current_span, span, traced
+from research_agent.corpus import ResearchCorpus
+from research_content_creator.sections import build_section_prompt, parse_outline_sections, stitch_sections
+
 class SingleSessionPipelineOrchestrator:
     """Single session orchestrator using natural conversation flow"""
     
-    def __init__(self):
+    def __init__(self, job_id=None, resume=False, checkpoints=None, compaction=None, section_parallel=None,
+                 interactive=True, trace=None):
         self.workflow_data = {}
         self.session_service = InMemorySessionService()
         self.session = None
@@ -39,14 +51,42 @@ class SingleSessionPipelineOrchestrator:
         self.user_id = f"pipeline_user_{int(time.time())}"
         self.session_id = f"pipeline_session_{int(time.time())}"
         
+        # Stage outputs are checkpointed per job; resume reuses them instead of re-running
+        self.job_id = job_id or f"pipeline_{int(time.time())}"
+        self.resume = resume
+        self.checkpoints = checkpoints or CheckpointStore()
+        
+        # Optional async callback(agent_name, delta, section=None) for live agent output;
+        # section drafts written in parallel pass their heading as section
+        self.on_text_delta = None
+        
+        # Earlier exchanges are compacted before each agent runs; per-agent token usage is recorded
+        self.compaction = compaction or HistoryCompactionPolicy()
+        self.base_session_id = self.session_id
+        self.compactions = 0
+        self.token_accounting = {}
+        
+        # Optional mode: draft each outline H2 section concurrently in the content stage
+        self.section_parallel = section_parallel if section_parallel is not None else os.getenv("CONTENT_SECTION_PARALLEL", "false").lower() == "true"
+        self.section_concurrency = int(os.getenv("CONTENT_SECTION_CONCURRENCY", "4"))
+        
+        # Batch runs approve every stage automatically instead of prompting
+        self.interactive = interactive
+        
+        # Spans for stages, model calls and I/O; summarized in results and exported per job
+        self.trace = trace or Trace(self.job_id)
+        
+    def confirm(self, question):
+        """Ask the operator to approve a stage; always approves when not interactive"""
+        if not self.interactive:
+            return True
+        return input(question).lower() == 'y'
+    
     async def initialize_session(self):
         """Initialize single session for entire pipeline"""
         try:
             print("🔧 Initializing single session for pipeline...")
             
-            # Create session service
-            self.session_service = InMemorySessionService()
-            
             # Create the session that will be used throughout
             self.session = await self.session_service.create_session(
                 app_name="ai-content-pipeline",
@@ -63,77 +103,312 @@ class SingleSessionPipelineOrchestrator:
             print(f"❌ Error initializing session: {e}")
             return False
     
-    async def run_agent_in_session(self, agent_name, prompt):
-        """Run agent in the existing session (preserves conversation history)"""
-        try:
-            print(f"🤖 Running {agent_name} in continuous session...")
-            print(f"   Session ID: {self.session_id}")
-            print(f"   Prompt: {prompt[:100]}...")
-            
-            # Import the specific agent - Updated for all 8 agents
-            if agent_name == 'outline_generator':
-                from outline_generator.agent import root_agent as agent
-            elif agent_name == 'research_agent':
-                from research_agent.agent import root_agent as agent
-            elif agent_name == 'research_content_creator':
-                from research_content_creator.agent import root_agent as agent
-            elif agent_name == 'citation_agent':
-                from citation_agent.agent import root_agent as agent
-            elif agent_name == 'image_agent':
-                from image_agent.agent import root_agent as agent
-            elif agent_name == 'fact_check_agent':
-                from fact_check_agent.agent import root_agent as agent
-            elif agent_name == 'seo_optimizer':
-                from seo_optimizer.agent import root_agent as agent
-            elif agent_name == 'publishing_coordinator':
-                from publishing_coordinator.agent import root_agent as agent
-            else:
-                return f"Error: Unknown agent {agent_name}. Available agents: outline_generator, research_agent, research_content_creator, citation_agent, image_agent, fact_check_agent, seo_optimizer, publishing_coordinator"
-            
-            # Create runner for this agent (but use same session)
-            runner = Runner(
-                app_name="ai-content-pipeline",
-                agent=agent,
-                session_service=self.session_service
-            )
-            
-            # Create message
-            message = types.Content(parts=[types.Part(text=prompt)])
-            
-            # Run agent in the SAME session
-            response_text = ""
+    async def stream_agent_in_session(self, agent_name, prompt):
+        """Run agent in the existing session, yielding response text deltas as they arrive"""
+        print(f"🤖 Running {agent_name} in continuous session...")
+        print(f"   Session ID: {self.session_id}")
+        print(f"   Prompt: {prompt[:100]}...")
+        
+        if agent_name not in agent_registry:
+            raise ValueError(f"Unknown agent {agent_name}. Available agents: {', '.join(agent_registry.names())}")
+        
+        # Agents are imported once and Runners reused for this session service
+        runner = agent_registry.get_runner(agent_name, self.session_service)
+        
+        stage_start = time.time()
+        compaction_report = await self.compact_history(agent_name)
+        
+        # Run agent in the SAME session
+        response_chars = 0
+        usage = {'prompt_tokens': 0, 'output_tokens': 0}
+        async for delta in self.stream_response(runner, self.session_id, prompt, usage):
+            response_chars += len(delta)
+            yield delta
+        
+        print(f"   ✅ {agent_name} completed - {response_chars} characters")
+        
+        self.token_accounting[agent_name] = {
+            **(compaction_report or {}),
+            "prompt_tokens": usage['prompt_tokens'] or None,
+            "output_tokens": usage['output_tokens'] or None,
+            "duration_seconds": round(time.time() - stage_start, 2)
+        }
+        
+        # Get updated session to see conversation history
+        updated_session = await self.session_service.get_session(
+            app_name="ai-content-pipeline",
+            user_id=self.user_id,
+            session_id=self.session_id
+        )
+        
+        print(f"   Session now has {len(updated_session.events)} events in history")
+    
+    async def stream_response(self, runner, session_id, prompt, usage):
+        """Yield text deltas of one agent run in a session, adding token usage into usage"""
+        # Create message
+        message = types.Content(parts=[types.Part(text=prompt)])
+        
+        # SSE mode makes ADK emit partial events as the model generates
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+        
+        streamed_partials = False
+        with span(f"llm.{runner.agent.name}", kind="llm", session_id=session_id, prompt_chars=len(prompt)) as llm_span:
             async for event in runner.run_async(
                 user_id=self.user_id,
-                session_id=self.session_id,  # Same session for all agents!
-                new_message=message
+                session_id=session_id,
+                new_message=message,
+                run_config=run_config
             ):
+                event_usage = getattr(event, 'usage_metadata', None)
+                if event_usage and not getattr(event, 'partial', False):
+                    # One usage report per model call; tool loops make several calls
+                    usage['prompt_tokens'] += event_usage.prompt_token_count or 0
+                    usage['output_tokens'] += event_usage.candidates_token_count or 0
+                    llm_span.add("tokens.prompt", event_usage.prompt_token_count or 0)
+                    llm_span.add("tokens.output", event_usage.candidates_token_count or 0)
+                    llm_span.add("model_calls")
+                
+                if not (hasattr(event, 'content') and event.content and event.content.parts):
+                    continue
+                
+                if getattr(event, 'partial', False):
+                    streamed_partials = True
+                elif streamed_partials:
+                    # The final aggregated event repeats text already yielded as partials
+                    streamed_partials = False
+                    continue
+                
                 # Extract text from events
-                if hasattr(event, 'content') and event.content:
-                    for part in event.content.parts:
-                        if hasattr(part, 'text'):
-                            response_text += part.text
-            
-            print(f"   ✅ {agent_name} completed - {len(response_text)} characters")
-            
-            # Get updated session to see conversation history
-            updated_session = await self.session_service.get_session(
-                app_name="ai-content-pipeline",
-                user_id=self.user_id,
-                session_id=self.session_id
-            )
-            
-            print(f"   Session now has {len(updated_session.events)} events in history")
+                for part in event.content.parts:
+                    if part.text:
+                        llm_span.add("output_chars", len(part.text))
+                        yield part.text
+    
+    @traced("history.compact", kind="deterministic")
+    async def compact_history(self, next_agent):
+        """Move the session onto a compacted copy of its history before next_agent runs"""
+        if not self.compaction.applies_to(next_agent):
+            return None
+        
+        session = await self.session_service.get_session(
+            app_name="ai-content-pipeline",
+            user_id=self.user_id,
+            session_id=self.session_id
+        )
+        messages, report = self.compaction.compact(session.events, next_agent)
+        current_span().set("tokens_before", report["tokens_before"])
+        current_span().set("tokens_after", report["tokens_after"])
+        
+        if report["tokens_after"] >= report["tokens_before"]:
+            report.update(tokens_after=report["tokens_before"], tokens_saved=0, compacted=False)
+            return report
+        
+        # ADK has no API to rewrite history in place, so continue in a fresh session
+        self.compactions += 1
+        compacted_session = await self.session_service.create_session(
+            app_name="ai-content-pipeline",
+            user_id=self.user_id,
+            session_id=f"{self.base_session_id}_c{self.compactions}",
+            state={key: value for key, value in session.state.items() if ':' not in key}
+        )
+        invocation_id = f"compaction-{uuid.uuid4()}"
+        for author, role, text in messages:
+            await self.session_service.append_event(compacted_session, Event(
+                invocation_id=invocation_id,
+                author=author,
+                content=types.Content(role=role, parts=[types.Part(text=text)])
+            ))
+        
+        await self.session_service.delete_session(
+            app_name="ai-content-pipeline",
+            user_id=self.user_id,
+            session_id=self.session_id
+        )
+        self.session_id = compacted_session.id
+        
+        report["compacted"] = True
+        print(f"   🗜️  Compacted history for {next_agent}: ~{report['tokens_before']} → ~{report['tokens_after']} tokens "
+              f"({report['events_before']} → {report['events_after']} events)")
+        return report
+    
+    async def run_agent_in_session(self, agent_name, prompt):
+        """Run agent in the existing session (preserves conversation history)"""
+        result, _ = await self.run_agent_with_status(agent_name, prompt)
+        return result
+    
+    async def run_agent_with_status(self, agent_name, prompt):
+        """Run agent in the existing session; returns the response text and whether the run succeeded"""
+        try:
+            response_parts = []
+            async for delta in self.stream_agent_in_session(agent_name, prompt):
+                response_parts.append(delta)
+                if self.on_text_delta:
+                    await self.on_text_delta(agent_name, delta)
             
-            return response_text
+            result = "".join(response_parts)
+            return result, bool(result.strip())
             
         except Exception as e:
             print(f"❌ Error running {agent_name} in session: {e}")
             import traceback
             traceback.print_exc()
-            return f"Error running {agent_name}: {e}"
+            return f"Error running {agent_name}: {e}", False
+    
+    def load_checkpoint(self, stage, inputs):
+        """Return a stage's checkpointed output when resuming, otherwise None"""
+        if not self.resume:
+            return None
+        
+        output = self.checkpoints.load(self.job_id, stage, inputs)
+        if output is not None:
+            print(f"   ♻️  Resumed {stage} from checkpoint")
+            self.workflow_data[stage] = output
+        return output
+    
+    def save_checkpoint(self, stage, inputs, output):
+        """Checkpoint a successful stage output for this job"""
+        self.checkpoints.save(self.job_id, stage, inputs, output)
     
-    async def run_research_stage(self, outline_content):
+    async def run_agent_stage(self, stage, agent_name, prompt, inputs=None):
+        """Run an agent in the session as a checkpointed pipeline stage"""
+        checkpoint_inputs = {'prompt': prompt, **(inputs or {})}
+        
+        with span(f"stage.{stage}", kind="stage", agent=agent_name) as stage_span:
+            cached = self.load_checkpoint(stage, checkpoint_inputs)
+            if cached is not None:
+                # Later agents rely on conversation history, so replay the exchange
+                stage_span.set("checkpoint_hit", True)
+                await self.replay_in_session(agent_name, prompt, cached)
+                if self.on_text_delta:
+                    await self.on_text_delta(agent_name, cached)
+                return cached
+            
+            result, succeeded = await self.run_agent_with_status(agent_name, prompt)
+            
+            # Failures come back as error text; only checkpoint runs that succeeded
+            if succeeded:
+                self.save_checkpoint(stage, checkpoint_inputs, result)
+            else:
+                stage_span.fail(result[:200] or "empty response")
+            return result
+    
+    async def replay_in_session(self, agent_name, prompt, response):
+        """Append a checkpointed prompt/response exchange to the session history"""
+        session = await self.session_service.get_session(
+            app_name="ai-content-pipeline",
+            user_id=self.user_id,
+            session_id=self.session_id
+        )
+        invocation_id = f"resume-{uuid.uuid4()}"
+        
+        await self.session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author="user",
+            content=types.Content(role="user", parts=[types.Part(text=prompt)])
+        ))
+        await self.session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author=agent_name,
+            content=types.Content(role="model", parts=[types.Part(text=response)])
+        ))
+    
+    @traced("stage.content", kind="stage")
+    async def run_content_stage(self, topic, content_prompt, outline_result, research_data=None, research_context=""):
+        """Stage 2: write the article, drafting outline sections in parallel when enabled"""
+        inputs = {'outline': outline_result, 'research': research_data}
+        
+        parsed = parse_outline_sections(outline_result) if self.section_parallel else None
+        if not parsed or len(parsed['sections']) < 2:
+            if parsed is not None:
+                print("   ⚠️  Could not find two or more outline sections; writing the article in one pass")
+            return await self.run_agent_stage('content', 'research_content_creator', content_prompt, inputs)
+        
+        checkpoint_inputs = {'prompt': content_prompt, 'mode': 'sections', **inputs}
+        cached = self.load_checkpoint('content', checkpoint_inputs)
+        if cached is not None:
+            await self.replay_in_session('research_content_creator', content_prompt, cached)
+            if self.on_text_delta:
+                await self.on_text_delta('research_content_creator', cached)
+            return cached
+        
+        sections = parsed['sections']
+        print(f"✍️  Drafting {len(sections)} sections in parallel (up to {self.section_concurrency} at a time)...")
+        stage_start = time.time()
+        
+        runner = agent_registry.get_runner('research_content_creator', self.session_service)
+        semaphore = asyncio.Semaphore(self.section_concurrency)
+        usage = {'prompt_tokens': 0, 'output_tokens': 0}
+        default_words = max(200, 3000 // len(sections))
+        
+        async def draft(index, section):
+            prompt = build_section_prompt(
+                topic, outline_result, section, index, len(sections), research_context, default_words
+            )
+            async with semaphore:
+                # Each section runs in its own throwaway session so drafts never see each other
+                session = await self.session_service.create_session(
+                    app_name="ai-content-pipeline",
+                    user_id=self.user_id,
+                    session_id=f"{self.session_id}_section_{index}_{uuid.uuid4().hex[:8]}",
+                    state={}
+                )
+                try:
+                    chunks = []
+                    async for delta in self.stream_response(runner, session.id, prompt, usage):
+                        chunks.append(delta)
+                        # Drafts stream as they are written; the stitched article follows untagged
+                        if self.on_text_delta:
+                            await self.on_text_delta('research_content_creator', delta, section=section['heading'])
+                finally:
+                    await self.session_service.delete_session(
+                        app_name="ai-content-pipeline",
+                        user_id=self.user_id,
+                        session_id=session.id
+                    )
+            print(f"   ✅ Section {index + 1}/{len(sections)} drafted: {section['heading']}")
+            return "".join(chunks)
+        
+        drafts = await asyncio.gather(
+            *(draft(index, section) for index, section in enumerate(sections)),
+            return_exceptions=True
+        )
+        
+        failed = [sections[i]['heading'] for i, d in enumerate(drafts) if isinstance(d, Exception) or not d.strip()]
+        if failed:
+            print(f"   ⚠️  {len(failed)} section(s) failed ({', '.join(failed)}); writing the article in one pass")
+            return await self.run_agent_stage('content', 'research_content_creator', content_prompt, inputs)
+        
+        article = stitch_sections(parsed['title'], sections, drafts, topic)
+        print(f"   ✅ Article stitched from {len(sections)} sections - {len(article)} characters")
+        
+        self.token_accounting['research_content_creator'] = {
+            "sections": len(sections),
+            "prompt_tokens": usage['prompt_tokens'] or None,
+            "output_tokens": usage['output_tokens'] or None,
+            "duration_seconds": round(time.time() - stage_start, 2)
+        }
+        
+        # Later agents read the article from the shared conversation history
+        await self.replay_in_session('research_content_creator', content_prompt, article)
+        if self.on_text_delta:
+            await self.on_text_delta('research_content_creator', article)
+        
+        self.save_checkpoint('content', checkpoint_inputs, article)
+        return article
+    
+    @traced("stage.research", kind="stage")
+    async def run_research_stage(self, outline_content, topic=None):
         """Stage 1.5: Conduct research using Perplexity API"""
+        checkpoint_inputs = {'outline': outline_content}
+        if topic:
+            checkpoint_inputs['topic'] = topic
+        cached = self.load_checkpoint('research', checkpoint_inputs)
+        if cached is not None:
+            # Checkpoints hold plain JSON; parse the corpus once for the later stages
+            research_data = ResearchCorpus.attach(cached)
+            self.workflow_data['research'] = research_data
+            return research_data
+        
         try:
             print("🔍 Stage 1.5: Conducting real-time research...")
             
@@ -141,10 +416,12 @@ class SingleSessionPipelineOrchestrator:
             from research_agent.agent import research_agent
             
             # Conduct research
-            research_data = await research_agent.conduct_research(outline_content)
+            research_data = await research_agent.conduct_research(outline_content, topic)
             
-            # Store research data
+            # Store research data (only checkpoint research that actually found something)
             self.workflow_data['research'] = research_data
+            if research_data['metadata'].get('successful_queries', 0) > 0:
+                self.save_checkpoint('research', checkpoint_inputs, research_data)
             
             print(f"   ✅ Research completed: {research_data['metadata']['successful_queries']}/{research_data['metadata']['total_queries']} queries successful")
             print(f"   📊 Found: {len(research_data['statistics'])} statistics, {len(research_data['expert_quotes'])} quotes")
@@ -163,19 +440,26 @@ class SingleSessionPipelineOrchestrator:
                 "metadata": {"error": str(e), "successful_queries": 0, "total_queries": 0}
             }
     
+    @traced("stage.citations", kind="stage")
     async def run_citation_stage(self, content, research_data):
         """Stage 2.5: Add citations to content based on research data"""
+        checkpoint_inputs = {'content': content, 'research': research_data}
+        cached = self.load_checkpoint('citations', checkpoint_inputs)
+        if cached is not None:
+            return cached
+        
         try:
             print("📚 Stage 2.5: Adding citations to content...")
             
             # Import citation agent
             from citation_agent.agent import citation_agent
             
-            # Add citations
-            citation_result = citation_agent.add_citations(content, research_data)
+            # Add citations (CPU-bound, keep it off the event loop)
+            citation_result = await asyncio.to_thread(citation_agent.add_citations, content, research_data)
             
             # Store citation data
             self.workflow_data['citations'] = citation_result
+            self.save_checkpoint('citations', checkpoint_inputs, citation_result)
             
             print(f"   ✅ Citations added: {citation_result['citation_count']} citations")
             print(f"   📖 Bibliography entries: {len(citation_result['bibliography'])}")
@@ -195,8 +479,14 @@ class SingleSessionPipelineOrchestrator:
                 "metadata": {"error": str(e)}
             }
 
+    @traced("stage.images", kind="stage")
     async def run_image_generation_stage(self, content, outline, job_id=None):
         """Stage 2.6: Generate images for content"""
+        checkpoint_inputs = {'content': content, 'outline': outline}
+        cached = self.load_checkpoint('images', checkpoint_inputs)
+        if cached is not None:
+            return cached
+        
         try:
             print("🎨 Stage 2.6: Generating contextual images...")
             
@@ -208,6 +498,7 @@ class SingleSessionPipelineOrchestrator:
             
             # Store image data
             self.workflow_data['images'] = image_result
+            self.save_checkpoint('images', checkpoint_inputs, image_result)
             
             print(f"   ✅ Images generated: {image_result['count']} images")
             if image_result['count'] > 0:
@@ -227,19 +518,26 @@ class SingleSessionPipelineOrchestrator:
                 "metadata": {"error": str(e)}
             }
 
+    @traced("stage.fact_check", kind="stage")
     async def run_fact_check_stage(self, content, research_data):
         """Stage 2.7: Fact-check content against research data"""
+        checkpoint_inputs = {'content': content, 'research': research_data}
+        cached = self.load_checkpoint('fact_check', checkpoint_inputs)
+        if cached is not None:
+            return cached
+        
         try:
             print("🔍 Stage 2.7: Fact-checking content claims...")
             
             # Import fact-checking agent
             from fact_check_agent.agent import fact_check_agent
             
-            # Verify facts
-            fact_check_result = fact_check_agent.verify_facts(content, research_data)
+            # Verify facts (CPU-bound, keep it off the event loop)
+            fact_check_result = await asyncio.to_thread(fact_check_agent.verify_facts, content, research_data)
             
             # Store fact-checking data
             self.workflow_data['fact_check'] = fact_check_result
+            self.save_checkpoint('fact_check', checkpoint_inputs, fact_check_result)
             
             print(f"   ✅ Fact-checking completed: {fact_check_result['statistics']['verified']}/{fact_check_result['statistics']['total_claims']} claims verified")
             print(f"   📊 Accuracy score: {fact_check_result['accuracy_score']:.2f}")
@@ -264,11 +562,58 @@ class SingleSessionPipelineOrchestrator:
                 "metadata": {"error": str(e)}
             }
 
+    async def run_enrichment_stages(self, content, outline, research_data=None, include_citations=False,
+                                    generate_images=False, include_fact_check=False, job_id=None,
+                                    on_stage_start=None, on_stage_complete=None):
+        """Stages 2.5-2.7: Run citations, images and fact-checking as a stage graph
+
+        Citations and fact-checking only need content + research, and images only
+        need content + outline, so all enabled stages run concurrently.
+        """
+        async def citations(inputs):
+            return {'citations': await self.run_citation_stage(inputs['content'], inputs['research'])}
+
+        async def images(inputs):
+            return {'images': await self.run_image_generation_stage(inputs['content'], inputs['outline'], job_id)}
+
+        async def fact_check(inputs):
+            return {'fact_check': await self.run_fact_check_stage(inputs['content'], inputs['research'])}
+
+        graph = StageGraph([
+            Stage('citations', citations, inputs=['content', 'research'], outputs=['citations'], enabled=include_citations),
+            Stage('images', images, inputs=['content', 'outline'], outputs=['images'], enabled=generate_images),
+            Stage('fact_check', fact_check, inputs=['content', 'research'], outputs=['fact_check'], enabled=include_fact_check),
+        ])
+
+        artifacts = await graph.run(
+            {'content': content, 'outline': outline, 'research': research_data},
+            on_stage_start=on_stage_start,
+            on_stage_complete=on_stage_complete
+        )
+
+        if graph.timings:
+            print("   ⏱️  Stage timings: " + ", ".join(f"{name} {secs:.1f}s" for name, secs in graph.timings.items()))
+
+        return {
+            'citations': artifacts.get('citations'),
+            'images': artifacts.get('images'),
+            'fact_check': artifacts.get('fact_check')
+        }
+
     async def run_pipeline(self, topic, include_images=True, include_research=False, include_citations=False, generate_images=False, include_fact_check=False):
         """Execute the complete single-session pipeline"""
-        
+        try:
+            with self.trace.activate("pipeline", topic=topic), retry_budget():
+                return await self._run_pipeline(
+                    topic, include_images, include_research, include_citations, generate_images, include_fact_check
+                )
+        finally:
+            self.trace.export()
+    
+    async def _run_pipeline(self, topic, include_images, include_research, include_citations, generate_images, include_fact_check):
         print(f"Starting Single Session Content Pipeline for: {topic}")
         print("Using ONE continuous session with natural conversation flow")
+        print(f"Job ID: {self.job_id}{' (resuming from checkpoints)' if self.resume else ''}")
         print("=" * 60)
         
         # Initialize the single session
@@ -291,22 +636,21 @@ Please provide:
 
 Make this outline extremely detailed and actionable for content creation."""
 
-        outline_result = await self.run_agent_in_session('outline_generator', outline_prompt)
+        outline_result = await self.run_agent_stage('outline', 'outline_generator', outline_prompt)
         self.workflow_data['outline'] = outline_result
         
         print("\nOUTLINE PREVIEW:")
         print("-" * 30)
         print(outline_result[:500] + "..." if len(outline_result) > 500 else outline_result)
         
-        approval = input("\n✅ Approve outline and continue to content creation? (y/n): ").lower()
-        if approval != 'y':
+        if not self.confirm("\n✅ Approve outline and continue to content creation? (y/n): "):
             print("Pipeline stopped at outline stage")
             return self.workflow_data
         
         # Stage 1.5: Research (optional)
         research_data = None
         if include_research:
-            research_data = await self.run_research_stage(outline_result)
+            research_data = await self.run_research_stage(outline_result, topic)
             
             if research_data['metadata'].get('successful_queries', 0) > 0:
                 print("\nRESEARCH PREVIEW:")
@@ -318,8 +662,7 @@ Make this outline extremely detailed and actionable for content creation."""
                     print(f"Expert quotes: {len(research_data['expert_quotes'])}")
                     print(f"  • \"{research_data['expert_quotes'][0][:100]}...\"")
                 
-                approval = input("\n✅ Approve research data and continue to content creation? (y/n): ").lower()
-                if approval != 'y':
+                if not self.confirm("\n✅ Approve research data and continue to content creation? (y/n): "):
                     print("Pipeline stopped at research stage")
                     return self.workflow_data
         
@@ -359,7 +702,9 @@ Requirements:
 
 Please provide the complete article content now."""
 
-        content_result = await self.run_agent_in_session('research_content_creator', content_prompt)
+        content_result = await self.run_content_stage(
+            topic, content_prompt, outline_result, research_data, research_context
+        )
         self.workflow_data['content'] = content_result
         
         print("\nCONTENT PREVIEW:")
@@ -372,93 +717,74 @@ Please provide the complete article content now."""
         print(f"Contains headers: {'#' in content_result or 'introduction' in content_result.lower()}")
         print(f"Contains questions asking for more: {any(phrase in content_result.lower() for phrase in ['would you like', 'should i', 'please provide', 'let me know'])}")
         
-        approval = input("\n✅ Approve content and continue to citations/SEO? (y/n): ").lower()
-        if approval != 'y':
+        if not self.confirm("\n✅ Approve content and continue to citations/SEO? (y/n): "):
             print("Pipeline stopped at content stage")
             return self.workflow_data
         
-        # Stage 2.5: Citations (optional)
-        citation_result = None
-        final_content = content_result  # Default to original content
-        
-        if include_citations:
-            if not include_research or not research_data or research_data['metadata'].get('successful_queries', 0) == 0:
-                print("\n⚠️  Citations requested but no research data available. Skipping citation stage.")
-            else:
-                citation_result = await self.run_citation_stage(content_result, research_data)
-                
-                if citation_result['citation_count'] > 0:
-                    final_content = citation_result['cited_content']
-                    
-                    print("\nCITATION PREVIEW:")
-                    print("-" * 30)
-                    print(f"Citations added: {citation_result['citation_count']}")
-                    print(f"Bibliography entries: {len(citation_result['bibliography'])}")
-                    if citation_result['uncited_claims']:
-                        print(f"Uncited claims: {len(citation_result['uncited_claims'])}")
-                        for claim in citation_result['uncited_claims'][:3]:
-                            print(f"  • {claim['text'][:80]}...")
-                    
-                    approval = input("\n✅ Approve citations and continue to SEO optimization? (y/n): ").lower()
-                    if approval != 'y':
-                        print("Pipeline stopped at citation stage")
-                        return self.workflow_data
-        
-        # Stage 2.6: Image Generation (optional)
-        image_result = None
-        
-        if generate_images:
-            # Create job ID for image organization
-            pipeline_job_id = f"pipeline_{int(time.time())}"
-            
-            # Use cited content if available, otherwise original content
-            content_for_images = final_content if citation_result else content_result
-            
-            image_result = await self.run_image_generation_stage(content_for_images, outline_result, pipeline_job_id)
-            
-            if image_result['count'] > 0:
-                print("\nIMAGE GENERATION PREVIEW:")
-                print("-" * 30)
-                print(f"Images generated: {image_result['count']}")
-                print(f"Output directory: outputs/images/{pipeline_job_id}")
-                for img in image_result['images'][:3]:
-                    print(f"  🖼️  {img.get('type', 'unknown')}: {img.get('section', 'section')}")
-                
-                approval = input("\n✅ Approve generated images and continue to fact-checking? (y/n): ").lower()
-                if approval != 'y':
-                    print("Pipeline stopped at image generation stage")
-                    return self.workflow_data
-        
-        # Stage 2.7: Fact-Checking (optional)
-        fact_check_result = None
-        
-        if include_fact_check:
-            if not include_research or not research_data or research_data['metadata'].get('successful_queries', 0) == 0:
-                print("\n⚠️  Fact-checking requested but no research data available. Skipping fact-checking stage.")
-            else:
-                # Use final content (with citations if available)
-                content_for_fact_check = final_content if citation_result else content_result
-                
-                fact_check_result = await self.run_fact_check_stage(content_for_fact_check, research_data)
-                
-                if fact_check_result['statistics']['total_claims'] > 0:
-                    print("\nFACT-CHECKING PREVIEW:")
-                    print("-" * 30)
-                    print(f"Claims verified: {fact_check_result['statistics']['verified']}/{fact_check_result['statistics']['total_claims']}")
-                    print(f"Accuracy score: {fact_check_result['accuracy_score']:.2f}")
-                    if fact_check_result['statistics']['unsupported'] > 0:
-                        print(f"⚠️  Unsupported claims: {fact_check_result['statistics']['unsupported']}")
-                        for claim in [c for c in fact_check_result['verified_claims'] if c['status'] == 'unsupported'][:3]:
-                            print(f"  • {claim['claim'][:80]}...")
-                    if fact_check_result['recommendations']:
-                        print(f"📋 Recommendations: {len(fact_check_result['recommendations'])}")
-                        for rec in fact_check_result['recommendations'][:2]:
-                            print(f"  • {rec}")
-                    
-                    approval = input("\n✅ Approve fact-checking results and continue to SEO optimization? (y/n): ").lower()
-                    if approval != 'y':
-                        print("Pipeline stopped at fact-checking stage")
-                        return self.workflow_data
+        # Stages 2.5-2.7: Citations, images and fact-checking (optional, run concurrently)
+        has_research = bool(include_research and research_data and research_data['metadata'].get('successful_queries', 0) > 0)
+        
+        if include_citations and not has_research:
+            print("\n⚠️  Citations requested but no research data available. Skipping citation stage.")
+        if include_fact_check and not has_research:
+            print("\n⚠️  Fact-checking requested but no research data available. Skipping fact-checking stage.")
+        
+        enrichment = await self.run_enrichment_stages(
+            content_result,
+            outline_result,
+            research_data,
+            include_citations=include_citations and has_research,
+            generate_images=generate_images,
+            include_fact_check=include_fact_check and has_research,
+            job_id=self.job_id
+        )
+        citation_result = enrichment['citations']
+        image_result = enrichment['images']
+        fact_check_result = enrichment['fact_check']
+        
+        if citation_result and citation_result['citation_count'] > 0:
+            print("\nCITATION PREVIEW:")
+            print("-" * 30)
+            print(f"Citations added: {citation_result['citation_count']}")
+            print(f"Bibliography entries: {len(citation_result['bibliography'])}")
+            if citation_result['uncited_claims']:
+                print(f"Uncited claims: {len(citation_result['uncited_claims'])}")
+                for claim in citation_result['uncited_claims'][:3]:
+                    print(f"  • {claim['text'][:80]}...")
+            
+            if not self.confirm("\n✅ Approve citations and continue to SEO optimization? (y/n): "):
+                print("Pipeline stopped at citation stage")
+                return self.workflow_data
+        
+        if image_result and image_result['count'] > 0:
+            print("\nIMAGE GENERATION PREVIEW:")
+            print("-" * 30)
+            print(f"Images generated: {image_result['count']}")
+            print(f"Output directory: outputs/images/{self.job_id}")
+            for img in image_result['images'][:3]:
+                print(f"  🖼️  {img.get('type', 'unknown')}: {img.get('section', 'section')}")
+            
+            if not self.confirm("\n✅ Approve generated images and continue to fact-checking? (y/n): "):
+                print("Pipeline stopped at image generation stage")
+                return self.workflow_data
+        
+        if fact_check_result and fact_check_result['statistics']['total_claims'] > 0:
+            print("\nFACT-CHECKING PREVIEW:")
+            print("-" * 30)
+            print(f"Claims verified: {fact_check_result['statistics']['verified']}/{fact_check_result['statistics']['total_claims']}")
+            print(f"Accuracy score: {fact_check_result['accuracy_score']:.2f}")
+            if fact_check_result['statistics']['unsupported'] > 0:
+                print(f"⚠️  Unsupported claims: {fact_check_result['statistics']['unsupported']}")
+                for claim in [c for c in fact_check_result['verified_claims'] if c['status'] == 'unsupported'][:3]:
+                    print(f"  • {claim['claim'][:80]}...")
+            if fact_check_result['recommendations']:
+                print(f"📋 Recommendations: {len(fact_check_result['recommendations'])}")
+                for rec in fact_check_result['recommendations'][:2]:
+                    print(f"  • {rec}")
+            
+            if not self.confirm("\n✅ Approve fact-checking results and continue to SEO optimization? (y/n): "):
+                print("Pipeline stopped at fact-checking stage")
+                return self.workflow_data
         
         # Stage 3: SEO Optimization (same session - outline + content + citations + images + fact-check in conversation history)
         print("\n🎯 Stage 3: SEO optimization analysis...")
@@ -509,7 +835,10 @@ Target keyword: "{topic}"
 
 Please analyze the content from our conversation and provide detailed SEO recommendations."""
 
-        seo_result = await self.run_agent_in_session('seo_optimizer', seo_prompt)
+        seo_result = await self.run_agent_stage(
+            'seo', 'seo_optimizer', seo_prompt,
+            {'content': content_result, 'citations': citation_result}
+        )
         self.workflow_data['seo'] = seo_result
         
         print("\nSEO OPTIMIZATION PREVIEW:")
@@ -522,8 +851,7 @@ Please analyze the content from our conversation and provide detailed SEO recomm
         print(f"Contains SEO elements: {any(term in seo_result.lower() for term in ['meta', 'title', 'schema', 'keywords', 'optimization'])}")
         print(f"References conversation context: {'article' in seo_result.lower() or 'content' in seo_result.lower()}")
         
-        approval = input("\n✅ Approve SEO optimization and continue to publication package? (y/n): ").lower()
-        if approval != 'y':
+        if not self.confirm("\n✅ Approve SEO optimization and continue to publication package? (y/n): "):
             print("Pipeline stopped at SEO stage")
             return self.workflow_data
         
@@ -544,7 +872,10 @@ Requirements:
 
 Please create a comprehensive publication package ready for WordPress."""
 
-        publish_result = await self.run_agent_in_session('publishing_coordinator', publish_prompt)
+        publish_result = await self.run_agent_stage(
+            'publish', 'publishing_coordinator', publish_prompt,
+            {'seo': seo_result}
+        )
         self.workflow_data['publish'] = publish_result
         
         print("\n🎉 PUBLICATION PACKAGE COMPLETE!")
@@ -565,6 +896,21 @@ Please create a comprehensive publication package ready for WordPress."""
         for stage, content in self.workflow_data.items():
             print(f"  - {stage}: {len(content)} characters")
         
+        if self.token_accounting:
+            print(f"\n🧮 TOKEN ACCOUNTING (history estimate before → after compaction, model-reported usage):")
+            for agent_name, usage in self.token_accounting.items():
+                history = f"~{usage['tokens_before']} → ~{usage['tokens_after']}" if 'tokens_before' in usage else "not compacted"
+                print(f"  - {agent_name}: history {history}, prompt tokens {usage['prompt_tokens']}, "
+                      f"output tokens {usage['output_tokens']}, {usage['duration_seconds']}s")
+        
+        trace_summary = self.trace.summary()
+        if trace_summary.get("stages"):
+            print(f"\n⏱️  TRACE ({trace_summary['span_count']} spans):")
+            for stage_name, seconds in trace_summary['stages'].items():
+                print(f"  - {stage_name}: {seconds}s")
+            for kind, totals in trace_summary['by_kind'].items():
+                print(f"  - all {kind} spans: {totals['count']} totalling {totals['seconds']}s")
+        
         return self.workflow_data
     
     def save_results(self, topic):
@@ -594,6 +940,14 @@ Stage Results:
         for stage, content in self.workflow_data.items():
             session_summary += f"- {stage}: {len(content)} characters\n"
         
+        if self.token_accounting:
+            with open(output_dir / "token_accounting.json", 'w', encoding='utf-8') as f:
+                json.dump(self.token_accounting, f, indent=2)
+        
+        if self.trace.spans:
+            with open(output_dir / "trace_summary.json", 'w', encoding='utf-8') as f:
+                json.dump(self.trace.summary(), f, indent=2)
+        
         summary_file = output_dir / "session_summary.txt"
         with open(summary_file, 'w', encoding='utf-8') as f:
             f.write(session_summary)
@@ -608,6 +962,11 @@ async def main():
         print("🚀 Single Session AI Content Pipeline - Natural Conversation Flow")
         print("=" * 60)
         
+        # Checkpointed stages of an earlier run are reused when its inputs still match
+        resume_job_id = input("Resume an earlier run? Enter its job ID (or press Enter to start fresh): ").strip()
+        if resume_job_id:
+            orchestrator = SingleSessionPipelineOrchestrator(job_id=resume_job_id, resume=True)
+        
         topic = input("Enter your content topic: ")
         include_images = input("Include image placeholders? (y/n): ").lower() == 'y'
         include_research = input("Include real-time research? (y/n): ").lower() == 'y'
@@ -620,6 +979,8 @@ async def main():
             include_fact_check = input("Include fact-checking verification? (y/n): ").lower() == 'y'
         
         generate_images = input("Generate AI images with DALL-E 3? (y/n): ").lower() == 'y'
+        if input("Draft article sections in parallel (faster for long articles)? (y/n): ").lower() == 'y':
+            orchestrator.section_parallel = True
         
         print(f"\n🎬 Starting single session pipeline...")
         print("Note: All agents work in ONE continuous conversation")
@@ -649,6 +1010,8 @@ async def main():
         print(f"\n❌ Pipeline failed: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await http_clients.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
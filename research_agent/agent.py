@@ -15,85 +15,94 @@ from typing import Dict, List, Optional, Any
 import httpx
 from dotenv import load_dotenv
 
+from pipeline_core.http_clients import http_clients
+from pipeline_core.retry import RetryPolicy
+from pipeline_core.singleflight import SingleFlight
+from pipeline_core.tracing import current_span, span, traced
+from research_agent.cache import ResearchCache
+from research_agent.corpus import ResearchCorpus
+from research_agent.query_planner import QueryPlan, QueryPlanner
+from research_agent.sources import source_extractor
+
 # Load environment variables
 load_dotenv()
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+RESEARCH_SYSTEM_PROMPT = "You are a research assistant. Provide comprehensive, factual answers with specific data, statistics, and expert insights. Include recent information and cite reliable sources."
+
+# Patterns for statistics
+STATISTIC_PATTERNS = [
+    re.compile(r'\b\d+(?:\.\d+)?%[^.]*', re.IGNORECASE),  # Percentages
+    re.compile(r'\$\d+(?:[\d,]*)?(?:\.\d+)?\s*(?:billion|million|thousand)?[^.]*', re.IGNORECASE),  # Dollar amounts
+    re.compile(r'\b\d+(?:[\d,]*)?(?:\.\d+)?\s*(?:million|billion|thousand|users|customers|companies)[^.]*', re.IGNORECASE),  # Large numbers
+    re.compile(r'(?:grew|increased|decreased|rose|fell)\s+(?:by\s+)?\d+(?:\.\d+)?%[^.]*', re.IGNORECASE),  # Growth statistics
+    re.compile(r'\b(?:in\s+)?20\d{2}[^.]*\d+(?:\.\d+)?%[^.]*', re.IGNORECASE),  # Year-based statistics
+]
+
+# Patterns for quoted text
+QUOTE_PATTERNS = [
+    re.compile(r'"([^"]{30,200})"', re.IGNORECASE | re.DOTALL),  # Direct quotes
+    re.compile(r'according to [^,]+ said[^.]*"([^"]{20,150})"', re.IGNORECASE | re.DOTALL),  # Attribution quotes
+    re.compile(r'[A-Z][^.]*(?:stated|said|noted|explained|commented)[^.]*[.:][\s]*"?([^"]{30,200})"?', re.IGNORECASE | re.DOTALL),  # Expert statements
+]
+
 class PerplexityResearchAgent:
     """Research agent using Perplexity API for real-time information gathering"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 cache: Optional[ResearchCache] = None):
         self.api_key = api_key or os.getenv("PERPLEXITY_API_KEY")
         self.base_url = "https://api.perplexity.ai/chat/completions"
         self.model = "sonar"
-        self.max_retries = 3
-        self.retry_delay = 2
+        self.max_tokens = 1500
+        
+        # Backoff with jitter for 429/5xx/timeouts, shared rules with the other upstream clients
+        self.retry_policy = RetryPolicy("perplexity")
+        
+        # Maximum number of Perplexity queries in flight per research session
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv("RESEARCH_MAX_CONCURRENCY", "3")))
+        
+        # Persistent response cache shared by all jobs
+        self.cache = cache or ResearchCache()
+        
+        # Identical queries already in flight for another job are joined, not re-sent
+        self.singleflight = SingleFlight("perplexity")
+        
+        # Picks fewer, non-overlapping queries within a per-job budget
+        self.query_planner = QueryPlanner()
         
         if not self.api_key:
             logger.warning("PERPLEXITY_API_KEY not found. Research agent will return empty results.")
     
-    def extract_research_queries(self, outline_content: str) -> List[str]:
-        """Extract 3-5 research queries from outline content"""
-        try:
-            # Look for section headers and key topics
-            sections = re.findall(r'#+\s*(.+)', outline_content)
-            
-            # Extract key phrases and topics
-            keywords = []
-            
-            # Find lines with "keywords:" or similar
-            keyword_lines = re.findall(r'(?:keywords?|topics?|focus):\s*(.+)', outline_content, re.IGNORECASE)
-            for line in keyword_lines:
-                keywords.extend([kw.strip() for kw in line.split(',') if kw.strip()])
-            
-            # Generate research queries based on sections and keywords
-            queries = []
-            
-            # Main topic query
-            if sections:
-                main_topic = sections[0] if sections else "content topic"
-                queries.append(f"Latest trends and statistics for {main_topic} in 2024")
-            
-            # Section-specific queries
-            for section in sections[1:4]:  # Take up to 3 main sections
-                clean_section = re.sub(r'[^\w\s]', '', section).strip()
-                if clean_section and len(clean_section) > 3:
-                    queries.append(f"Current best practices and expert insights on {clean_section}")
-            
-            # Keyword-based queries
-            if keywords:
-                primary_keywords = keywords[:2]  # Take top 2 keywords
-                for keyword in primary_keywords:
-                    if len(queries) < 5:
-                        queries.append(f"Recent developments and case studies in {keyword}")
-            
-            # Industry statistics query
-            if len(queries) < 5:
-                topic_match = re.search(r'(?:article|content|guide).*?(?:about|on|for)\s+(.+?)(?:\n|\.|,)', outline_content, re.IGNORECASE)
-                if topic_match:
-                    topic = topic_match.group(1).strip()
-                    queries.append(f"Market size, growth statistics, and industry data for {topic}")
-            
-            # Ensure we have 3-5 queries
-            if len(queries) < 3:
-                queries.extend([
-                    "Current industry trends and market analysis",
-                    "Expert opinions and thought leadership insights",
-                    "Recent case studies and success stories"
-                ])
-            
-            return queries[:5]  # Limit to 5 queries
-            
-        except Exception as e:
-            logger.error(f"Error extracting research queries: {e}")
-            return [
-                "Current industry trends and statistics",
-                "Expert insights and best practices",
-                "Recent developments and case studies"
-            ]
+    def plan_research_queries(self, outline_content: str, topic: Optional[str] = None) -> QueryPlan:
+        """Scored, deduplicated and budgeted queries for an outline (or the topic if the outline failed)"""
+        return self.query_planner.plan(outline_content, topic, estimate_tokens=self.estimate_query_tokens)
     
+    def extract_research_queries(self, outline_content: str, topic: Optional[str] = None) -> List[str]:
+        """Research queries for an outline, as planned by the query planner"""
+        return [candidate.query for candidate in self.plan_research_queries(outline_content, topic).queries]
+    
+    def _build_messages(self, query: str) -> List[Dict[str, str]]:
+        """Chat messages sent to Perplexity for one research question"""
+        return [
+            {
+                "role": "system",
+                "content": RESEARCH_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": f"Research question: {query}\n\nPlease provide:\n1. Key findings and current data\n2. Specific statistics with dates\n3. Expert quotes or insights\n4. Recent trends or developments\n5. Reliable sources"
+            }
+        ]
+    
+    def estimate_query_tokens(self, query: str) -> int:
+        """Worst-case tokens for one query: prompt (~4 chars per token) plus the full answer allowance"""
+        prompt_chars = sum(len(message["content"]) for message in self._build_messages(query))
+        return prompt_chars // 4 + self.max_tokens
+    
+    @traced("perplexity.query", kind="http")
     async def query_perplexity(self, query: str) -> Dict[str, Any]:
         """Query Perplexity API for a single research question"""
         if not self.api_key:
@@ -104,6 +113,28 @@ class PerplexityResearchAgent:
                 "error": "PERPLEXITY_API_KEY not set"
             }
         
+        query_span = current_span()
+        query_span.set("query", query[:200])
+        
+        # SQLite I/O runs off the event loop so a busy cache cannot stall the other queries
+        cached = await asyncio.to_thread(self.cache.get, self.model, query)
+        query_span.set("cached", cached is not None)
+        if cached is not None:
+            logger.info(f"Research cache hit: {query[:50]}...")
+            return {**cached, "query": query, "cached": True}
+        
+        # Concurrent identical queries (same model and normalized text) share one upstream call
+        result, coalesced = await self.singleflight.do(
+            self.cache.make_key(self.model, query), lambda: self._fetch(query)
+        )
+        query_span.set("coalesced", coalesced)
+        if coalesced:
+            return {**result, "query": query, "coalesced": True}
+        return result
+    
+    async def _fetch(self, query: str) -> Dict[str, Any]:
+        """One upstream Perplexity request (with retries); the result is cached on success"""
+        query_span = current_span()
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -111,212 +142,123 @@ class PerplexityResearchAgent:
         
         payload = {
             "model": self.model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a research assistant. Provide comprehensive, factual answers with specific data, statistics, and expert insights. Include recent information and cite reliable sources."
-                },
-                {
-                    "role": "user",
-                    "content": f"Research question: {query}\n\nPlease provide:\n1. Key findings and current data\n2. Specific statistics with dates\n3. Expert quotes or insights\n4. Recent trends or developments\n5. Reliable sources"
-                }
-            ],
+            "messages": self._build_messages(query),
             "temperature": 0.2,
-            "max_tokens": 1500,
+            "max_tokens": self.max_tokens,
             "top_p": 0.9
         }
         
-        for attempt in range(self.max_retries):
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        self.base_url,
-                        headers=headers,
-                        json=payload
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        content = data["choices"][0]["message"]["content"]
-                        
-                        # Extract sources from citations
-                        sources = self._extract_sources(content)
-                        
-                        return {
-                            "query": query,
-                            "answer": content,
-                            "sources": sources,
-                            "token_usage": data.get("usage", {}),
-                            "model": self.model
-                        }
-                    
-                    elif response.status_code == 429:
-                        logger.warning(f"Rate limited on attempt {attempt + 1}, retrying in {self.retry_delay} seconds")
-                        await asyncio.sleep(self.retry_delay)
-                        continue
-                    
-                    else:
-                        logger.error(f"Perplexity API error {response.status_code}: {response.text}")
-                        return {
-                            "query": query,
-                            "answer": f"API Error: {response.status_code}",
-                            "sources": [],
-                            "error": f"HTTP {response.status_code}"
-                        }
+        client = http_clients.get_client("perplexity", timeout=30.0)
+        try:
+            # Rate limits, 5xx, timeouts and connection errors are retried with jittered backoff
+            response = await self.retry_policy.call(
+                lambda: client.post(self.base_url, headers=headers, json=payload)
+            )
             
-            except httpx.TimeoutException:
-                logger.warning(f"Timeout on attempt {attempt + 1}")
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delay)
-                    continue
-                else:
-                    return {
-                        "query": query,
-                        "answer": "Request timed out",
-                        "sources": [],
-                        "error": "Timeout"
-                    }
+            query_span.set("status_code", response.status_code)
+            query_span.add("bytes", len(response.content))
             
-            except Exception as e:
-                logger.error(f"Error querying Perplexity API: {e}")
-                return {
+            if response.status_code == 200:
+                data = response.json()
+                content = data["choices"][0]["message"]["content"]
+                usage = data.get("usage", {})
+                query_span.add("tokens.prompt", usage.get("prompt_tokens", 0))
+                query_span.add("tokens.output", usage.get("completion_tokens", 0))
+                
+                # Extract sources from citations
+                with span("research.extract_sources", kind="deterministic"):
+                    sources = self._extract_sources(content)
+                
+                result = {
                     "query": query,
-                    "answer": f"Research error: {str(e)}",
-                    "sources": [],
-                    "error": str(e)
+                    "answer": content,
+                    "sources": sources,
+                    "token_usage": data.get("usage", {}),
+                    "model": self.model
                 }
+                await asyncio.to_thread(self.cache.set, self.model, query, result)
+                return result
+            
+            logger.error(f"Perplexity API error {response.status_code}: {response.text}")
+            return {
+                "query": query,
+                "answer": f"API Error: {response.status_code}",
+                "sources": [],
+                "error": f"HTTP {response.status_code}"
+            }
         
-        return {
-            "query": query,
-            "answer": "Failed after multiple retries",
-            "sources": [],
-            "error": "Max retries exceeded"
-        }
+        except httpx.TimeoutException:
+            logger.warning(f"Perplexity request timed out: {query[:50]}...")
+            return {
+                "query": query,
+                "answer": "Request timed out",
+                "sources": [],
+                "error": "Timeout"
+            }
+        
+        except Exception as e:
+            logger.error(f"Error querying Perplexity API: {e}")
+            return {
+                "query": query,
+                "answer": f"Research error: {str(e)}",
+                "sources": [],
+                "error": str(e)
+            }
     
     def _extract_sources(self, content: str) -> List[str]:
         """Extract source URLs and citations from Perplexity response"""
-        sources = []
-        
-        # Enhanced URL pattern to capture full URLs
-        url_patterns = [
-            r'https?://[^\s\)\]\}\>]+(?:[^\s\.\,\)\]\}\>])',  # Standard URLs
-            r'(?:Source|Retrieved from|Available at|See):\s*(https?://[^\s\)\]\}\>]+)',  # Labeled URLs
-            r'\[(?:Source|Ref|Link)\]\(([^\)]+)\)',  # Markdown-style links
-        ]
-        
-        for pattern in url_patterns:
-            urls = re.findall(pattern, content, re.IGNORECASE)
-            sources.extend(urls)
-        
-        # Extract domain-based sources from content
-        domain_patterns = [
-            r'According to ([A-Za-z0-9]+(?:\.[A-Za-z]{2,})+)',  # Domain references
-            r'([A-Za-z0-9]+(?:\.[A-Za-z]{2,})+) reports?',  # Site reports
-            r'Study by ([A-Za-z0-9]+(?:\.[A-Za-z]{2,})+)',  # Study sources
-            r'([A-Za-z0-9]+(?:\.[A-Za-z]{2,})+) research',  # Research sources
-        ]
-        
-        for pattern in domain_patterns:
-            domains = re.findall(pattern, content, re.IGNORECASE)
-            # Convert domains to URLs
-            for domain in domains:
-                if not domain.startswith(('http://', 'https://')):
-                    sources.append(f'https://{domain}')
-                else:
-                    sources.append(domain)
-        
-        # Look for organization/publication names that could be sources
-        source_patterns = [
-            r'McKinsey[^,\n]*',
-            r'Deloitte[^,\n]*',
-            r'Boston Consulting Group[^,\n]*',
-            r'BCG[^,\n]*',
-            r'Gartner[^,\n]*',
-            r'Forrester[^,\n]*',
-            r'PwC[^,\n]*',
-            r'Harvard Business Review[^,\n]*',
-            r'MIT[^,\n]*study',
-            r'Stanford[^,\n]*',
-            r'(?:The\s+)?(?:Wall Street Journal|WSJ)[^,\n]*',
-            r'(?:The\s+)?New York Times[^,\n]*',
-            r'(?:The\s+)?Financial Times[^,\n]*',
-            r'Forbes[^,\n]*',
-            r'Bloomberg[^,\n]*',
-            r'Reuters[^,\n]*',
-            r'TechCrunch[^,\n]*',
-            r'Wired[^,\n]*',
-            r'(?:The\s+)?Economist[^,\n]*'
-        ]
-        
-        for pattern in source_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            sources.extend([match.strip() for match in matches])
-        
-        # Clean and deduplicate sources
-        cleaned_sources = []
-        seen = set()
-        
-        for source in sources:
-            if isinstance(source, str):
-                # Clean source
-                source = source.strip().rstrip('.,)]}').strip()
-                
-                # Skip if too short or already seen
-                if len(source) <= 5 or source.lower() in seen:
-                    continue
-                
-                # Validate URLs
-                if source.startswith(('http://', 'https://')):
-                    # Remove fragments and clean URL
-                    source = re.sub(r'#[^\s]*$', '', source)
-                    source = re.sub(r'\?[^\s]*$', '', source)
-                    
-                # Add to cleaned sources
-                cleaned_sources.append(source)
-                seen.add(source.lower())
-        
-        return cleaned_sources[:15]  # Increased limit to 15 sources
+        # One precompiled pass over the answer (URLs, domains, known publishers)
+        return source_extractor.extract(content, limit=15)
     
-    async def conduct_research(self, outline_content: str) -> Dict[str, Any]:
+    async def conduct_research(self, outline_content: str, topic: Optional[str] = None) -> Dict[str, Any]:
         """Main research function - extract queries and get results"""
         start_time = time.time()
         
         logger.info("Starting research phase for content outline")
         
-        # Extract research queries from outline
-        queries = self.extract_research_queries(outline_content)
-        logger.info(f"Extracted {len(queries)} research queries")
+        # Plan research queries from the outline (the topic stands in when the outline failed)
+        with span("research.plan_queries", kind="deterministic") as plan_span:
+            plan = self.plan_research_queries(outline_content, topic)
+            queries = [candidate.query for candidate in plan.queries]
+            plan_span.set("queries", len(queries))
+            plan_span.set("dropped", len(plan.dropped))
+        logger.info(f"Planned {len(queries)} research queries ({len(plan.dropped)} dropped)")
+        
+        # Execute research queries concurrently (bounded by the semaphore)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_query(index: int, query: str) -> Dict[str, Any]:
+            async with semaphore:
+                logger.info(f"Researching query {index+1}/{len(queries)}: {query[:50]}...")
+                return await self.query_perplexity(query)
+        
+        # gather() preserves input order, so merged output stays deterministic
+        research_results = list(await asyncio.gather(*(run_query(i, q) for i, q in enumerate(queries))))
         
-        # Execute research queries
-        research_results = []
         statistics = []
         expert_quotes = []
         all_sources = []
         
-        for i, query in enumerate(queries):
-            logger.info(f"Researching query {i+1}/{len(queries)}: {query[:50]}...")
-            
-            result = await self.query_perplexity(query)
-            research_results.append(result)
-            
-            # Extract statistics and quotes from answers
-            if "error" not in result:
-                stats = self._extract_statistics(result["answer"])
-                quotes = self._extract_quotes(result["answer"])
-                
-                statistics.extend(stats)
-                expert_quotes.extend(quotes)
-                all_sources.extend(result.get("sources", []))
-            
-            # Small delay between requests
-            await asyncio.sleep(0.5)
+        with span("research.extract_findings", kind="deterministic", results=len(research_results)):
+            for result in research_results:
+                # Extract statistics and quotes from answers
+                if "error" not in result:
+                    stats = self._extract_statistics(result["answer"])
+                    quotes = self._extract_quotes(result["answer"])
+                    
+                    statistics.extend(stats)
+                    expert_quotes.extend(quotes)
+                    all_sources.extend(result.get("sources", []))
         
         # Deduplicate sources
         unique_sources = list(dict.fromkeys(all_sources))
         
         processing_time = time.time() - start_time
         
-        research_data = {
+        cache_stats = await asyncio.to_thread(self.cache.stats)
+        
+        # Parsed once here; the citation and fact-check stages reuse the attached corpus
+        research_data = ResearchCorpus.attach({
             "queries": queries,
             "results": research_results,
             "statistics": statistics[:15],  # Limit to 15 best statistics
@@ -327,9 +269,15 @@ class PerplexityResearchAgent:
                 "successful_queries": len([r for r in research_results if "error" not in r]),
                 "processing_time": processing_time,
                 "timestamp": time.time(),
-                "model": self.model
+                "model": self.model,
+                "max_concurrency": self.max_concurrency,
+                "cached_queries": len([r for r in research_results if r.get("cached")]),
+                "coalesced_queries": len([r for r in research_results if r.get("coalesced")]),
+                "cache": cache_stats,
+                "singleflight": self.singleflight.stats(),
+                "query_plan": plan.to_dict()
             }
-        }
+        })
         
         logger.info(f"Research completed: {len(research_results)} queries, {len(statistics)} statistics, {len(expert_quotes)} quotes")
         
@@ -339,18 +287,8 @@ class PerplexityResearchAgent:
         """Extract statistics and data points from research text"""
         statistics = []
         
-        # Patterns for statistics
-        stat_patterns = [
-            r'\b\d+(?:\.\d+)?%[^.]*',  # Percentages
-            r'\$\d+(?:[\d,]*)?(?:\.\d+)?\s*(?:billion|million|thousand)?[^.]*',  # Dollar amounts
-            r'\b\d+(?:[\d,]*)?(?:\.\d+)?\s*(?:million|billion|thousand|users|customers|companies)[^.]*',  # Large numbers
-            r'(?:grew|increased|decreased|rose|fell)\s+(?:by\s+)?\d+(?:\.\d+)?%[^.]*',  # Growth statistics
-            r'\b(?:in\s+)?20\d{2}[^.]*\d+(?:\.\d+)?%[^.]*',  # Year-based statistics
-        ]
-        
-        for pattern in stat_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
+        for pattern in STATISTIC_PATTERNS:
+            for match in pattern.findall(text):
                 clean_stat = match.strip()
                 if len(clean_stat) > 10 and clean_stat not in statistics:
                     statistics.append(clean_stat)
@@ -361,16 +299,8 @@ class PerplexityResearchAgent:
         """Extract expert quotes and insights from research text"""
         quotes = []
         
-        # Look for quoted text
-        quote_patterns = [
-            r'"([^"]{30,200})"',  # Direct quotes
-            r'according to [^,]+ said[^.]*"([^"]{20,150})"',  # Attribution quotes
-            r'[A-Z][^.]*(?:stated|said|noted|explained|commented)[^.]*[.:][\s]*"?([^"]{30,200})"?',  # Expert statements
-        ]
-        
-        for pattern in quote_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
+        for pattern in QUOTE_PATTERNS:
+            for match in pattern.findall(text):
                 clean_quote = match.strip().strip('"')
                 if len(clean_quote) > 20 and clean_quote not in quotes:
                     quotes.append(clean_quote)
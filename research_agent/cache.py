@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Research Cache - Persistent SQLite cache for Perplexity responses
+Entries are keyed by model + normalized query text, expire after a TTL and
+are evicted least-recently-used once the cache grows past its size bound.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "outputs" / "cache" / "research_cache.sqlite3"
+
+
+class ResearchCache:
+    """SQLite-backed TTL + LRU cache for research query results"""
+
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.db_path = Path(db_path or os.getenv("RESEARCH_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("RESEARCH_CACHE_TTL", "604800"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "1000"))
+        self.enabled = enabled if enabled is not None else os.getenv("RESEARCH_CACHE_ENABLED", "true").lower() == "true"
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize query text so trivially different phrasings share a key"""
+        text = re.sub(r'[^\w\s]', ' ', query.lower())
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def make_key(self, model: str, query: str) -> str:
+        """Cache key for a model/query pair"""
+        return hashlib.sha256(f"{model}\n{self.normalize_query(query)}".encode('utf-8')).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS research_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_research_cache_accessed ON research_cache(last_accessed)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, model: str, query: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(model, query)
+        now = time.time()
+
+        try:
+            with self._lock:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        "SELECT result, created_at FROM research_cache WHERE key = ?", (key,)
+                    ).fetchone()
+
+                    if row is None or now - row[1] > self.ttl_seconds:
+                        self.misses += 1
+                        return None
+
+                    conn.execute(
+                        "UPDATE research_cache SET last_accessed = ?, hit_count = hit_count + 1 WHERE key = ?",
+                        (now, key)
+                    )
+                    conn.commit()
+                    self.hits += 1
+                    return json.loads(row[0])
+                finally:
+                    conn.close()
+
+        except Exception as e:
+            logger.warning(f"Research cache read failed: {e}")
+            self.misses += 1
+            return None
+
+    def set(self, model: str, query: str, result: Dict[str, Any]) -> None:
+        """Store a result and enforce TTL and size bounds"""
+        if not self.enabled:
+            return
+
+        key = self.make_key(model, query)
+        now = time.time()
+
+        try:
+            with self._lock:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO research_cache (key, model, query, result, created_at, last_accessed, hit_count) "
+                        "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                        (key, model, self.normalize_query(query), json.dumps(result), now, now)
+                    )
+
+                    # Drop expired entries, then least-recently-used beyond the size bound
+                    conn.execute("DELETE FROM research_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                    conn.execute("""
+                        DELETE FROM research_cache WHERE key IN (
+                            SELECT key FROM research_cache ORDER BY last_accessed DESC LIMIT -1 OFFSET ?
+                        )
+                    """, (self.max_entries,))
+                    conn.commit()
+                finally:
+                    conn.close()
+
+        except Exception as e:
+            logger.warning(f"Research cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus current entry count"""
+        entries = 0
+        if self.enabled and self.db_path.exists():
+            try:
+                with self._lock:
+                    conn = self._connect()
+                    try:
+                        entries = conn.execute("SELECT COUNT(*) FROM research_cache").fetchone()[0]
+                    finally:
+                        conn.close()
+            except Exception as e:
+                logger.warning(f"Research cache stats failed: {e}")
+
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries
+        }
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        if not self.db_path.exists():
+            return
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM research_cache")
+                conn.commit()
+            finally:
+                conn.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Research Corpus - Parsed research data shared by downstream agents
+conduct_research() returns plain JSON (checkpoints, API results and stage
+inputs depend on that shape). ResearchCorpus parses it once per job: statistic
+values and units with their position in the answer they came from, quotes,
+sources with canonical URLs, sentence offsets per answer, and the lowercased
+tokens and numbers the citation and fact-check agents match claims against.
+conduct_research() returns a ResearchData dict that carries its corpus, so the
+stages of one job share a single parse; ResearchCorpus.of() returns that
+corpus, or parses a plain dict (e.g. one loaded from JSON). to_dict() gives
+back the JSON shape.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from research_agent.sources import source_extractor
+
+WORD_PATTERN = re.compile(r'\b[a-z]{3,}\b')
+NUMBER_TOKEN_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+SENTENCE_PATTERN = re.compile(r'[^\s.!?][^.!?\n]*(?:[.!?]+|(?=\n)|$)')
+
+# Numeric mentions as the fact-checker compares them ("45%", "$2.5 billion", "3x", "2024")
+NUMBER_MENTION_PATTERNS = [
+    re.compile(r'\d+(?:\.\d+)?%', re.IGNORECASE),
+    re.compile(r'\$\d+(?:[\d,]*)?(?:\.\d+)?(?:\s*(?:billion|million|thousand|k))?', re.IGNORECASE),
+    re.compile(r'\d+(?:[\d,]*)?(?:\.\d+)?(?:\s*(?:billion|million|thousand|k))?', re.IGNORECASE),
+    re.compile(r'\d+(?:\.\d+)?x', re.IGNORECASE),
+    re.compile(r'20\d{2}', re.IGNORECASE),
+]
+
+STATISTIC_VALUE_PATTERN = re.compile(
+    r'(?P<currency>\$)?(?P<number>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<fraction>\d+))?\s*'
+    r'(?P<unit>%|x\b|trillion\b|billion\b|million\b|thousand\b|users\b|customers\b|companies\b)?',
+    re.IGNORECASE
+)
+MAGNITUDES = {"thousand": 1e3, "million": 1e6, "billion": 1e9, "trillion": 1e12}
+YEAR_PATTERN = re.compile(r'(?:19|20)\d{2}')
+
+
+def extract_number_mentions(text: str) -> List[str]:
+    """Distinct numeric mentions in a text"""
+    numbers = []
+    for pattern in NUMBER_MENTION_PATTERNS:
+        numbers.extend(pattern.findall(text))
+    return list(set(numbers))
+
+
+def canonical_url(url: str) -> str:
+    """Lowercase scheme and host, no www., query, fragment or trailing slash"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return urlunsplit((parts.scheme.lower() or "https", host, parts.path.rstrip("/"), "", ""))
+
+
+def parse_statistic_value(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """Headline number of a statistic and its unit ("%", "USD", "x", "users", ...)"""
+    fallback = (None, None)
+    for match in STATISTIC_VALUE_PATTERN.finditer(text):
+        number = match.group("number").replace(",", "")
+        value = float(f"{number}.{match.group('fraction')}" if match.group("fraction") else number)
+        unit = (match.group("unit") or "").lower() or None
+
+        if unit in MAGNITUDES:
+            value *= MAGNITUDES[unit]
+            unit = None
+        if match.group("currency"):
+            unit = "USD"
+
+        # A bare year is only the headline number when nothing else is
+        if unit is None and not match.group("currency") and YEAR_PATTERN.fullmatch(match.group(0).strip()):
+            fallback = fallback if fallback[0] is not None else (value, "year")
+            continue
+        return value, unit
+    return fallback
+
+
+@dataclass(slots=True)
+class Source:
+    text: str
+    url: Optional[str] = None
+    domain: Optional[str] = None
+    organization: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Statistic:
+    text: str
+    value: Optional[float]
+    unit: Optional[str]
+    span: Optional[Tuple[int, int]]
+    result_index: Optional[int]
+    source: Optional[str]
+
+
+@dataclass(slots=True)
+class Quote:
+    text: str
+    span: Optional[Tuple[int, int]]
+    result_index: Optional[int]
+    source: Optional[str]
+
+
+@dataclass(slots=True)
+class ResearchResult:
+    query: str
+    answer: str
+    sources: List[str]
+    sentence_offsets: List[Tuple[int, int]]
+    # Remaining keys (token_usage, model, cached, error, ...) kept for the round trip
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return "error" not in self.extra
+
+    def sentences(self) -> List[str]:
+        return [self.answer[start:end] for start, end in self.sentence_offsets]
+
+
+@dataclass(slots=True)
+class Passage:
+    """A piece of research text claims are matched against, pre-tokenized"""
+    kind: str  # statistic, expert_quote or result
+    text: str
+    lower: str
+    tokens: List[str]
+    words: Set[str]
+    number_tokens: Set[str]
+    result_index: Optional[int]
+    query: str = ""
+    _numbers: Optional[List[str]] = field(default=None, repr=False)
+
+    def number_mentions(self) -> List[str]:
+        """Numeric mentions, parsed on first use"""
+        if self._numbers is None:
+            self._numbers = extract_number_mentions(self.text)
+        return self._numbers
+
+
+class ResearchData(dict):
+    """Research data in the conduct_research() JSON shape, carrying its parsed corpus"""
+
+    __slots__ = ("corpus",)
+
+
+@dataclass(slots=True)
+class ResearchCorpus:
+    queries: List[str]
+    results: List[ResearchResult]
+    statistics: List[Statistic]
+    quotes: List[Quote]
+    sources: List[Source]
+    metadata: Dict[str, Any]
+    passages: List[Passage]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ResearchCorpus":
+        """Parse research data in the conduct_research() JSON shape"""
+        results = []
+        for raw in data.get("results", []):
+            answer = raw.get("answer", "")
+            results.append(ResearchResult(
+                query=raw.get("query", ""),
+                answer=answer,
+                sources=list(raw.get("sources", [])),
+                sentence_offsets=[m.span() for m in SENTENCE_PATTERN.finditer(answer)],
+                extra={key: value for key, value in raw.items() if key not in ("query", "answer", "sources")}
+            ))
+
+        def locate(text: str) -> Tuple[Optional[Tuple[int, int]], Optional[int], Optional[str]]:
+            # Statistics and quotes are verbatim slices of the first successful answer containing them
+            for index, result in enumerate(results):
+                if not result.ok:
+                    continue
+                start = result.answer.find(text)
+                if start != -1:
+                    return (start, start + len(text)), index, result.sources[0] if result.sources else None
+            return None, None, None
+
+        statistics = []
+        for text in data.get("statistics", []):
+            value, unit = parse_statistic_value(text)
+            span, index, source = locate(text)
+            statistics.append(Statistic(text, value, unit, span, index, source))
+
+        quotes = [Quote(text, *locate(text)) for text in data.get("expert_quotes", [])]
+
+        sources = []
+        for text in data.get("sources", []):
+            record = next(source_extractor.iter_sources(text), None)
+            if record is not None and record.url:
+                sources.append(Source(text, canonical_url(record.url), record.domain, record.organization))
+            else:
+                sources.append(Source(text, organization=record.organization if record else None))
+
+        passages = [_passage("statistic", s.text, s.result_index) for s in statistics]
+        passages += [_passage("expert_quote", q.text, q.result_index) for q in quotes]
+        passages += [_passage("result", r.answer, i, r.query) for i, r in enumerate(results)]
+
+        return cls(
+            queries=list(data.get("queries", [])),
+            results=results,
+            statistics=statistics,
+            quotes=quotes,
+            sources=sources,
+            metadata=dict(data.get("metadata", {})),
+            passages=passages
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The conduct_research() JSON shape"""
+        return {
+            "queries": list(self.queries),
+            "results": [{"query": r.query, "answer": r.answer, "sources": list(r.sources), **r.extra} for r in self.results],
+            "statistics": [s.text for s in self.statistics],
+            "expert_quotes": [q.text for q in self.quotes],
+            "sources": [s.text for s in self.sources],
+            "metadata": dict(self.metadata)
+        }
+
+    @classmethod
+    def of(cls, data: Any) -> "ResearchCorpus":
+        """Corpus for research data: the one it carries, otherwise a fresh parse"""
+        if isinstance(data, cls):
+            return data
+        if isinstance(data, ResearchData):
+            return data.corpus
+        return cls.from_dict(data)
+
+    @classmethod
+    def attach(cls, data: Dict[str, Any]) -> ResearchData:
+        """Research data carrying its corpus, so the job's stages share one parse"""
+        if isinstance(data, ResearchData):
+            return data
+        research = ResearchData(data)
+        research.corpus = cls.from_dict(research)
+        return research
+
+
+def _passage(kind: str, text: str, result_index: Optional[int], query: str = "") -> Passage:
+    lower = text.lower()
+    return Passage(
+        kind=kind,
+        text=text,
+        lower=lower,
+        tokens=WORD_PATTERN.findall(lower),
+        words=set(lower.split()),
+        number_tokens=set(NUMBER_TOKEN_PATTERN.findall(lower)),
+        result_index=result_index,
+        query=query
+    )
+
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Query Planner - Chooses which research queries a job sends to Perplexity
+Candidates come from the outline's headings and keyword lines, or from the
+topic when the outline is missing or an upstream error message. Each is scored
+by relevance (its place in the outline) and novelty (how little it overlaps
+queries issued by recent jobs). The highest-scoring candidates are picked
+greedily. A candidate is skipped when it asks the same kind of question as one
+already picked about a too-similar token set, or when it would exceed the
+job's query or token budget. Words of the topic itself are left out of that
+comparison, since every section shares them. The plan, including what was
+dropped and why, is recorded in the research metadata.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional, Any
+
+from research_agent.cache import ResearchCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Words that say nothing about a query's subject: stop words, the query templates' own
+# wording and generic outline headings
+FILLER_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from',
+    'about', 'into', 'is', 'are', 'be', 'your', 'you', 'our', 'its', 'it', 'this', 'that', 'how', 'what',
+    'why', 'when', 'which', 'who', 'vs', 'versus', 'can', 'do', 'does', 'will',
+    'latest', 'trends', 'statistics', 'current', 'best', 'practices', 'expert', 'insights', 'recent',
+    'developments', 'case', 'studies', 'market', 'size', 'growth', 'industry', 'data',
+    'introduction', 'conclusion', 'overview', 'summary', 'faq', 'faqs', 'frequently', 'asked', 'questions',
+    'key', 'takeaways', 'final', 'thoughts', 'comprehensive', 'guide', 'ultimate', 'complete', 'words'
+})
+
+# Upstream failures surface as stage output text such as "Error running outline_generator: 503 ..."
+ERROR_OUTPUT_PATTERN = re.compile(r'^\s*(?:Error\b|Exception\b|Traceback\b)', re.IGNORECASE)
+
+KEYWORD_LINE_PATTERN = re.compile(r'(?:keywords?|topics?|focus)\s*\**\s*:\s*\**\s*(.+)', re.IGNORECASE)
+TOPIC_PATTERN = re.compile(r'(?:article|content|guide).*?(?:about|on|for)\s+(.+?)(?:\n|\.|,)', re.IGNORECASE)
+YEAR_PATTERN = re.compile(r'\b(?:19|20)\d{2}\b')
+
+
+def query_tokens(text: str) -> FrozenSet[str]:
+    """Subject words of a query or heading, without filler"""
+    return frozenset(token for token in TOKEN_PATTERN.findall(text.lower()) if token not in FILLER_WORDS)
+
+
+def token_set_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two token sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def clean_heading(text: str) -> str:
+    """Heading text without markdown, "H2:"/numbering prefixes, word counts or bracketed notes"""
+    text = re.sub(r'\[[^\]]*\]', '', text)
+    text = re.sub(r'\(\s*(?:approx\.?|approximately|about|~)?\s*[\d,\s\-–]+words?\s*\)', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'[*_`#>"]', '', text)
+    text = re.sub(r'^[^:]*\boutline\b[^:]*:\s*', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'^\s*(?:H[1-6]\s*:|\d+(?:\.\d+)*[.):]?(?=\s))\s*', '', text, flags=re.IGNORECASE)
+    return re.sub(r'\s+', ' ', text).strip(' :-–—.')
+
+
+def is_error_output(text: Optional[str]) -> bool:
+    """Whether an upstream stage output is missing or an error message instead of an outline"""
+    return not text or not text.strip() or bool(ERROR_OUTPUT_PATTERN.match(text))
+
+
+@dataclass(slots=True)
+class QueryCandidate:
+    query: str
+    origin: str  # topic, section, keyword or market; also the kind of question asked
+    relevance: float
+    tokens: FrozenSet[str]
+    distinct: FrozenSet[str]  # tokens not shared with the topic, used for near-duplicate checks
+    novelty: float = 1.0
+    score: float = 0.0
+    estimated_tokens: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "query": self.query,
+            "origin": self.origin,
+            "relevance": round(self.relevance, 3),
+            "novelty": round(self.novelty, 3),
+            "score": round(self.score, 3),
+            "estimated_tokens": self.estimated_tokens
+        }
+
+
+@dataclass(slots=True)
+class QueryPlan:
+    source: str  # outline, topic or none
+    queries: List[QueryCandidate] = field(default_factory=list)
+    dropped: List[Dict[str, Any]] = field(default_factory=list)
+    max_queries: int = 0
+    token_budget: int = 0
+    note: Optional[str] = None
+
+    @property
+    def estimated_tokens(self) -> int:
+        return sum(candidate.estimated_tokens for candidate in self.queries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plan summary for the research metadata"""
+        return {
+            "source": self.source,
+            "note": self.note,
+            "queries": [candidate.to_dict() for candidate in self.queries],
+            "dropped": self.dropped,
+            "budget": {
+                "max_queries": self.max_queries,
+                "token_budget": self.token_budget,
+                "estimated_tokens": self.estimated_tokens
+            }
+        }
+
+
+class RecentQueries:
+    """Queries issued by the last few jobs in this process, for novelty scoring"""
+
+    def __init__(self, max_jobs: Optional[int] = None):
+        self.max_jobs = max_jobs or int(os.getenv("RESEARCH_RECENT_JOBS", "20"))
+        self._jobs: Deque[Dict[str, FrozenSet[str]]] = deque(maxlen=self.max_jobs)
+        self._lock = threading.Lock()
+
+    def record(self, queries: List[str]) -> None:
+        """Remember one job's queries, keyed by normalized text"""
+        if queries:
+            with self._lock:
+                self._jobs.append({ResearchCache.normalize_query(q): query_tokens(q) for q in queries})
+
+    def novelty(self, query: str, tokens: FrozenSet[str]) -> float:
+        """1 minus the highest similarity to a recent query; exact repeats are answered
+        from the research cache, so they are not penalized"""
+        normalized = ResearchCache.normalize_query(query)
+        highest = 0.0
+        with self._lock:
+            for job in self._jobs:
+                if normalized in job:
+                    return 1.0
+                for recent in job.values():
+                    highest = max(highest, token_set_similarity(tokens, recent))
+        return 1.0 - highest
+
+
+class QueryPlanner:
+    """Builds a budgeted, deduplicated research query plan for one job"""
+
+    def __init__(self, max_queries: Optional[int] = None, token_budget: Optional[int] = None,
+                 duplicate_threshold: Optional[float] = None, novelty_weight: Optional[float] = None,
+                 recent: Optional[RecentQueries] = None):
+        self.max_queries = max_queries or int(os.getenv("RESEARCH_MAX_QUERIES", "5"))
+        self.token_budget = token_budget or int(os.getenv("RESEARCH_TOKEN_BUDGET", "9000"))
+        self.duplicate_threshold = duplicate_threshold or float(os.getenv("RESEARCH_DUPLICATE_THRESHOLD", "0.5"))
+        # 0 ignores recent jobs; 1 lets a query repeated by recent jobs score as low as zero
+        self.novelty_weight = novelty_weight if novelty_weight is not None else float(os.getenv("RESEARCH_NOVELTY_WEIGHT", "0.5"))
+        self.recent = recent or RecentQueries()
+
+    def candidates(self, outline_content: Optional[str], topic: Optional[str] = None) -> List[QueryCandidate]:
+        """Candidate queries from the outline (or only the topic when the outline is unusable)"""
+        year = time.strftime("%Y")
+        candidates: List[QueryCandidate] = []
+        usable = not is_error_output(outline_content)
+        sections = re.findall(r'#+\s*(.+)', outline_content) if usable else []
+        topic_tokens = query_tokens(clean_heading(topic or (sections[0] if sections else "")))
+
+        def add(template: str, subject: str, origin: str, relevance: float) -> None:
+            subject = clean_heading(subject)
+            tokens = query_tokens(subject)
+            if len(subject) <= 3 or not tokens:
+                return
+            distinct = tokens - topic_tokens
+            # A heading or keyword that only restates the topic adds nothing to the topic queries
+            if usable and not distinct and origin in ("section", "keyword"):
+                return
+            query = template.format(subject=subject)
+            if origin == "topic" and not YEAR_PATTERN.search(subject):
+                query += f" in {year}"
+            candidates.append(QueryCandidate(query, origin, relevance, tokens, distinct or tokens))
+
+        if topic:
+            add("Latest trends and statistics for {subject}", topic, "topic", 1.0)
+            add("Market size, growth statistics, and industry data for {subject}", topic, "market", 0.7)
+
+        if not usable:
+            if topic:
+                add("Current best practices and expert insights on {subject}", topic, "section", 0.8)
+                add("Recent developments and case studies in {subject}", topic, "keyword", 0.6)
+            return candidates
+
+        if sections and not topic:
+            add("Latest trends and statistics for {subject}", sections[0], "topic", 1.0)
+            sections = sections[1:]
+
+        # Earlier sections rank slightly higher: outlines lead with their core material
+        for position, section in enumerate(sections):
+            add("Current best practices and expert insights on {subject}", section, "section", 0.8 - 0.02 * min(position, 10))
+
+        keywords = []
+        for line in KEYWORD_LINE_PATTERN.findall(outline_content):
+            keywords.extend(kw.strip() for kw in line.split(',') if kw.strip())
+        for position, keyword in enumerate(dict.fromkeys(keywords)):
+            add("Recent developments and case studies in {subject}", keyword, "keyword", 0.6 - 0.01 * min(position, 10))
+
+        if not topic:
+            topic_match = TOPIC_PATTERN.search(outline_content)
+            if topic_match:
+                add("Market size, growth statistics, and industry data for {subject}", topic_match.group(1), "market", 0.7)
+
+        return candidates
+
+    def plan(self, outline_content: Optional[str], topic: Optional[str] = None,
+             estimate_tokens: Optional[Callable[[str], int]] = None) -> QueryPlan:
+        """Pick the queries for one job and remember them for later novelty scoring"""
+        outline_usable = not is_error_output(outline_content)
+        source = "outline" if outline_usable else ("topic" if topic else "none")
+        plan = QueryPlan(source=source, max_queries=self.max_queries, token_budget=self.token_budget)
+        if not outline_usable:
+            plan.note = "Outline missing or an error message; " + ("planned from the topic" if topic else "no research queries")
+
+        candidates = self.candidates(outline_content, topic)
+        for candidate in candidates:
+            candidate.novelty = self.recent.novelty(candidate.query, candidate.tokens)
+            candidate.score = candidate.relevance * (1 - self.novelty_weight * (1 - candidate.novelty))
+            candidate.estimated_tokens = estimate_tokens(candidate.query) if estimate_tokens else 0
+
+        # sorted() is stable, so equal scores keep outline order
+        spent = 0
+        for candidate in sorted(candidates, key=lambda c: c.score, reverse=True):
+            duplicate = next(
+                (chosen for chosen in plan.queries if chosen.origin == candidate.origin
+                 and token_set_similarity(candidate.distinct, chosen.distinct) >= self.duplicate_threshold),
+                None
+            )
+            if duplicate is not None:
+                reason = f"near-duplicate of: {duplicate.query}"
+            elif len(plan.queries) >= self.max_queries:
+                reason = "query budget"
+            elif spent + candidate.estimated_tokens > self.token_budget:
+                reason = "token budget"
+            else:
+                plan.queries.append(candidate)
+                spent += candidate.estimated_tokens
+                continue
+            plan.dropped.append({"query": candidate.query, "score": round(candidate.score, 3), "reason": reason})
+
+        self.recent.record([candidate.query for candidate in plan.queries])
+        logger.info(f"Query plan ({source}): {len(plan.queries)} of {len(candidates)} candidates, ~{spent} tokens")
+        return plan
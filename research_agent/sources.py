@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Source Extractor - Single-pass extraction of URLs, domains and publishers
+One precompiled pattern finds, in a single scan of the text, markdown source
+links, URLs, domain references ("According to example.com", "example.com
+reports") and known publishers. Publisher names come from publishers.json
+(or RESEARCH_PUBLISHERS_PATH) and are compiled into a character trie, so
+adding publishers does not add passes over the text. Research answers and
+citation source lookups share one instance.
+"""
+
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Any
+from urllib.parse import urlparse
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_PUBLISHERS_PATH = Path(__file__).parent / "publishers.json"
+
+# Kind order used when a source list is truncated: URLs first, publishers last
+KIND_RANK = {"url": 0, "domain": 1, "organization": 2}
+
+URL_BODY = r'https?://[^\s\)\]\}\>]+[^\s\.\,\)\]\}\>]'
+DOMAIN_BODY = r'[A-Za-z0-9]+(?:\.[A-Za-z]{2,})+'
+
+
+class SourceRecord:
+    """One source found in a text, with its character span"""
+
+    __slots__ = ('kind', 'text', 'url', 'domain', 'organization', 'start', 'end')
+
+    def __init__(self, kind: str, text: str, start: int, end: int, url: Optional[str] = None,
+                 domain: Optional[str] = None, organization: Optional[str] = None):
+        self.kind = kind
+        self.text = text
+        self.url = url
+        self.domain = domain
+        self.organization = organization
+        self.start = start
+        self.end = end
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"SourceRecord({self.kind!r}, {self.text!r}, span=({self.start}, {self.end}))"
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex alternation shaped as a character trie (shared prefixes matched once)"""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        optional = '' in node
+        if not branches:
+            return ''
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if optional else body
+
+    return emit(trie)
+
+
+def clean_source(source: str) -> str:
+    """Trim trailing punctuation, and URL query strings and fragments"""
+    source = source.strip().rstrip('.,)]}').strip()
+    if source.startswith(('http://', 'https://')):
+        source = re.sub(r'#[^\s]*$', '', source)
+        source = re.sub(r'\?[^\s]*$', '', source)
+    return source
+
+
+class SourceExtractor:
+    """Precompiled single-pass source extractor over a configurable publisher list"""
+
+    def __init__(self, publishers: Optional[List[Dict[str, Any]]] = None, publishers_path: Optional[str] = None):
+        if publishers is None:
+            publishers = self.load_publishers(publishers_path)
+
+        self.publishers = publishers
+        self._by_alias: Dict[str, Dict[str, Any]] = {}
+        self._by_domain: Dict[str, str] = {}
+        for publisher in publishers:
+            for alias in publisher.get("aliases", [publisher["name"]]):
+                self._by_alias[alias.lower()] = publisher
+            for domain in publisher.get("domains", []):
+                self._by_domain[domain.lower()] = publisher["name"]
+
+        aliases = sorted(self._by_alias)
+        publisher_pattern = _trie_pattern(aliases) if aliases else r'(?!)'
+
+        # Alternatives are tried in this order at each position; matches never overlap
+        self.pattern = re.compile(
+            r'\[(?:Source|Ref|Link)\]\((?P<link>[^\)]+)\)'
+            rf'|(?P<url>{URL_BODY})'
+            rf'|\b(?:According to|Study by)\s+(?P<domain_before>{DOMAIN_BODY})'
+            rf'|\b(?P<domain_after>{DOMAIN_BODY})\s+(?:reports?|research)'
+            rf'|(?<![A-Za-z0-9])(?P<org>(?:the\s+)?(?P<alias>{publisher_pattern}))(?![A-Za-z0-9])',
+            re.IGNORECASE
+        )
+
+    @staticmethod
+    def load_publishers(path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Publisher definitions from JSON: {"publishers": [{"name", "aliases", "domains", "requires"?}]}"""
+        path = Path(path or os.getenv("RESEARCH_PUBLISHERS_PATH", str(DEFAULT_PUBLISHERS_PATH)))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)["publishers"]
+        except Exception as e:
+            logger.warning(f"Could not load publishers from {path}: {e}")
+            return []
+
+    def publisher_for_domain(self, domain: str) -> Optional[str]:
+        """Canonical publisher name for a host, matching subdomains too"""
+        host = domain.lower()
+        if host.startswith("www."):
+            host = host[4:]
+        while host:
+            name = self._by_domain.get(host)
+            if name:
+                return name
+            _, _, host = host.partition(".")
+        return None
+
+    def iter_sources(self, text: str) -> Iterator[SourceRecord]:
+        """Yield sources in text order from one scan"""
+        for match in self.pattern.finditer(text):
+            group = next(name for name in ("link", "url", "domain_before", "domain_after", "alias") if match.group(name))
+
+            if group in ("link", "url"):
+                url = match.group(group)
+                domain = urlparse(url).netloc if url.startswith(("http://", "https://")) else None
+                yield SourceRecord("url", url, match.start(group), match.end(group), url=url, domain=domain,
+                                   organization=self.publisher_for_domain(domain) if domain else None)
+
+            elif group in ("domain_before", "domain_after"):
+                domain = match.group(group)
+                yield SourceRecord("domain", f"https://{domain}", match.start(group), match.end(group),
+                                   url=f"https://{domain}", domain=domain, organization=self.publisher_for_domain(domain))
+
+            elif group == "alias":
+                publisher = self._by_alias[match.group("alias").lower()]
+                start = match.start("org")
+
+                # The source text runs from the name to the end of its clause
+                end = len(text)
+                for stop in (",", "\n"):
+                    found = text.find(stop, start)
+                    if found != -1 and found < end:
+                        end = found
+
+                requires = publisher.get("requires")
+                if requires:
+                    last = text[start:end].lower().rfind(requires.lower())
+                    if last == -1:
+                        continue
+                    end = start + last + len(requires)
+
+                yield SourceRecord("organization", text[start:end].strip(), start, end,
+                                   organization=publisher["name"])
+
+    def extract(self, text: str, limit: Optional[int] = 15) -> List[str]:
+        """Cleaned, deduplicated source strings: URLs, then domains, then publishers"""
+        records = sorted(self.iter_sources(text), key=lambda record: KIND_RANK[record.kind])
+
+        sources: List[str] = []
+        seen = set()
+        for record in records:
+            source = clean_source(record.text)
+            key = source.casefold()
+            if len(source) <= 5 or key in seen:
+                continue
+            seen.add(key)
+            sources.append(source)
+            if limit and len(sources) >= limit:
+                break
+        return sources
+
+    def is_known_publisher(self, source: str) -> bool:
+        """Whether a source string names or links to a known publisher"""
+        return any(record.organization for record in self.iter_sources(source))
+
+
+# Shared extractor used by the research and citation agents
+source_extractor = SourceExtractor()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Section Writer Helpers - Outline splitting and stitching for parallel drafting
+The content stage can draft each H2 section of the outline in its own agent
+call. These helpers split the outline into sections, build the per-section
+prompts around shared context, and stitch the drafts back together in outline
+order with a deterministic clean-up of the seams between them.
+"""
+
+import re
+from typing import Dict, List, Optional, Any
+
+HEADING_PATTERN = re.compile(r'^\s*(#{1,6})\s+(.+?)\s*$')
+H1_PATTERN = re.compile(r'^#\s+(.+?)\s*#*\s*$')
+H2_PATTERN = re.compile(r'^##\s+(.+?)\s*#*\s*$')
+LABEL_PATTERN = re.compile(r'^(H[12])\s*:\s*(.+)$', re.IGNORECASE)
+NUMBERED_PATTERN = re.compile(r'^\d+[.)]\s+(.+)$')
+LABELED_BULLET_PATTERN = re.compile(r'^\s*[*-]\s+\*\*(H[12]|Article Title):?\*\*:?\s*(.+?)\s*$', re.IGNORECASE)
+WORD_TARGET_PATTERN = re.compile(r'\(?\s*(?:approx\.?|about|~)?\s*(\d{2,4})(?:\s*[-–]\s*(\d{2,4}))?\s*words\s*\)?', re.IGNORECASE)
+
+# Lines parallel drafts tend to add at their edges that read badly once stitched
+PREAMBLE_PATTERN = re.compile(
+    r"^(?:sure|certainly|of course|here(?:'s| is)|below is|okay)\b.*:?\s*$", re.IGNORECASE
+)
+SIGNPOST_PATTERN = re.compile(
+    r'^(?:in this section|this section (?:will|covers|explores|examines|discusses)|'
+    r'in the (?:next|following) section|the next section)\b[^.]*\.\s*', re.IGNORECASE
+)
+CLOSING_PATTERN = re.compile(
+    r'^(?:let me know|i hope this|feel free to|would you like|shall i)\b.*$', re.IGNORECASE
+)
+
+STYLE_GUIDE = """- Authoritative, helpful tone; second person where it reads naturally
+- Use ### for sub-headings inside the section; never use # or ## except the section heading
+- Short paragraphs (2-4 sentences), bullet lists for steps and comparisons
+- Image placeholders in the form [IMAGE: description], [CHART: data to display] or [INFOGRAPHIC: data points]
+- Attribute statistics to their source inline
+- No meta commentary ("In this section...", "Here is...") and no questions to the reader about next steps"""
+
+
+def _clean_heading(text: str) -> str:
+    """Heading text without markdown emphasis, word targets or trailing punctuation"""
+    text = WORD_TARGET_PATTERN.sub('', text.replace('**', '').replace('__', ''))
+    return text.strip(' *_:#')
+
+
+def _word_target(text: str) -> Optional[int]:
+    match = WORD_TARGET_PATTERN.search(text)
+    if not match:
+        return None
+    low = int(match.group(1))
+    high = int(match.group(2)) if match.group(2) else low
+    return (low + high) // 2
+
+
+def parse_outline_sections(outline: str) -> Dict[str, Any]:
+    """Split an outline into its title, an optional lead (introduction) and H2 sections
+
+    Outlines label sections in a few ways; the first scheme with two or more
+    matches wins: "### **H2: Title** (200 words)", "### **3. Title (300 words)**"
+    (optionally with a "**H2:** Title" bullet inside), or plain "## Title".
+    A lead section has heading None and is stitched in without a heading.
+    """
+    lines = outline.splitlines()
+    headings = []
+    for number, line in enumerate(lines):
+        match = HEADING_PATTERN.match(line)
+        if match:
+            headings.append((number, len(match.group(1)), match.group(2).replace('**', '').strip()))
+
+    schemes = [
+        [h for h in headings if LABEL_PATTERN.match(h[2]) and LABEL_PATTERN.match(h[2]).group(1).upper() == "H2"],
+        [h for h in headings if NUMBERED_PATTERN.match(h[2])],
+        [h for h in headings if h[1] == 2],
+    ]
+    starts = next((scheme for scheme in schemes if len(scheme) >= 2), [])
+    if not starts:
+        return {"title": None, "sections": []}
+
+    title: Optional[str] = None
+    level = starts[0][1]
+    start_lines = {number for number, _, _ in starts}
+
+    # An "H1:" heading opens the article: its notes become the lead section
+    for number, heading_level, text in headings:
+        label = LABEL_PATTERN.match(text)
+        if label and label.group(1).upper() == "H1":
+            title = _clean_heading(label.group(2))
+            if number < starts[0][0]:
+                start_lines.add(number)
+                starts = [(number, heading_level, text)] + starts
+
+    sections: List[Dict[str, Any]] = []
+    seen_headings = set()
+    current: Optional[Dict[str, Any]] = None
+    for number, line in enumerate(lines):
+        if number in start_lines:
+            text = HEADING_PATTERN.match(line).group(2)
+            label = LABEL_PATTERN.match(text.replace('**', '').strip())
+            numbered = NUMBERED_PATTERN.match(text.replace('**', '').strip())
+            heading_text = label.group(2) if label else numbered.group(1) if numbered else text
+            is_lead = bool(label and label.group(1).upper() == "H1")
+            heading = None if is_lead else _clean_heading(heading_text)
+
+            # Models sometimes repeat the whole outline; keep the first copy
+            key = (heading or "").lower()
+            if key in seen_headings:
+                current = None
+                continue
+            seen_headings.add(key)
+
+            current = {"heading": heading, "outline": [], "word_target": _word_target(text)}
+            sections.append(current)
+            continue
+
+        heading = HEADING_PATTERN.match(line)
+        if (heading and len(heading.group(1)) <= level) or line.strip() == '---':
+            # Other section-level headings and horizontal rules end the section,
+            # so trailing notes ("Total Estimated Word Count", JSON blocks) are left out
+            current = None
+            continue
+
+        if current is None:
+            continue
+
+        bullet = LABELED_BULLET_PATTERN.match(line)
+        if bullet:
+            label = bullet.group(1).upper()
+            if label in ("H1", "ARTICLE TITLE"):
+                title = title or _clean_heading(bullet.group(2))
+                current["heading"] = None
+                continue
+            if label == "H2" and current["heading"] is not None:
+                # Numbered outlines carry the publishable heading in an "H2:" bullet
+                current["heading"] = _clean_heading(bullet.group(2))
+                continue
+        current["outline"].append(line)
+
+    if title is None:
+        for line in lines:
+            bullet = LABELED_BULLET_PATTERN.match(line) or re.match(r'^\s*\*\*(Article Title):\*\*\s*(.+)$', line)
+            if bullet and bullet.group(1).upper() in ("H1", "ARTICLE TITLE"):
+                title = _clean_heading(bullet.group(2))
+                break
+
+    for section in sections:
+        section["outline"] = "\n".join(section["outline"]).strip()
+
+    return {"title": title, "sections": sections}
+
+
+def build_section_prompt(topic: str, outline: str, section: Dict[str, Any], index: int, total: int,
+                         research_context: str = "", default_words: int = 400) -> str:
+    """Prompt for drafting one section with the shared article context"""
+    words = section.get("word_target") or default_words
+    position = "the opening section" if index == 0 else "the final section" if index == total - 1 else f"section {index + 1} of {total}"
+
+    if section["heading"] is None:
+        section_header = "The article introduction (it has no heading of its own)"
+        heading_rule = "- Do not start with a heading; write the introduction paragraphs directly"
+    else:
+        section_header = f"## {section['heading']}"
+        heading_rule = f'- Begin with the exact heading line "## {section["heading"]}"'
+
+    return f"""You are writing ONE section of a longer article about "{topic}". The other sections are being written at the same time by other writers, so write only your section.
+
+FULL ARTICLE OUTLINE (for context):
+{outline}
+{research_context}
+STYLE GUIDE:
+{STYLE_GUIDE}
+
+YOUR SECTION ({position}):
+{section_header}
+
+Section outline:
+{section['outline'] or '(no further detail; cover the heading thoroughly)'}
+
+Requirements:
+{heading_rule}
+- Target about {words} words
+- Cover only what this section's outline asks for; do not repeat material that belongs to other sections
+{"- Open the article: hook the reader and set up what follows" if index == 0 else ""}
+{"- Close the article: summarize the key takeaways" if index == total - 1 else ""}
+
+Please provide the section now."""
+
+
+def clean_section(text: str, heading: Optional[str]) -> str:
+    """Normalize one drafted section: its own H2 (none for the lead), no edge chatter"""
+    lines = text.strip().splitlines()
+
+    # Drop chatter before the heading, and any article title the writer added
+    while lines and (not lines[0].strip() or PREAMBLE_PATTERN.match(lines[0].strip())
+                     or H1_PATTERN.match(lines[0].strip())):
+        lines.pop(0)
+    if lines and H2_PATTERN.match(lines[0].strip()):
+        lines.pop(0)
+
+    # Drop sign-off lines after the body
+    while lines and (not lines[-1].strip() or CLOSING_PATTERN.match(lines[-1].strip())):
+        lines.pop()
+
+    body = []
+    for line in lines:
+        stripped = line.strip()
+        if H1_PATTERN.match(stripped) or H2_PATTERN.match(stripped):
+            # Stray top-level headings inside a section become sub-headings
+            line = "### " + stripped.lstrip('#').strip()
+        elif SIGNPOST_PATTERN.match(stripped):
+            # "In this section we..." reads as a seam once sections are joined
+            line = SIGNPOST_PATTERN.sub('', stripped)
+        body.append(line)
+
+    text = "\n".join(body).strip()
+    return f"## {heading}\n\n{text}" if heading else text
+
+
+def stitch_sections(title: Optional[str], sections: List[Dict[str, Any]], drafts: List[str], topic: str) -> str:
+    """Join drafted sections in outline order under the article title"""
+    parts = [f"# {title or topic}"]
+    for section, draft in zip(sections, drafts):
+        parts.append(clean_section(draft, section["heading"]))
+
+    # Collapse runs of blank lines left at the seams
+    return re.sub(r'\n{3,}', '\n\n', "\n\n".join(parts)).strip() + "\n"
@@ -20,6 +20,7 @@ from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
 import uvicorn
 
 from pipeline_orchestrator import demo_orchestrator, generate_content
+from pipeline_core.agent_registry import agent_registry
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -182,6 +183,16 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                                 "stage_name": self.get_current_stage_name(),
                                 "timestamp": datetime.now().isoformat()
                             }, user_id)
+                        
+                        async def _on_text_delta(self, agent_name: str, delta: str):
+                            # Stream agent output to the browser as it is generated
+                            await manager.send_personal_message({
+                                "type": "text_delta",
+                                "stage": self.current_stage,
+                                "stage_name": self.get_current_stage_name(),
+                                "agent": agent_name,
+                                "delta": delta
+                            }, user_id)
                     
                     # Start generation with progress tracking
                     progress_orchestrator = ProgressTrackingOrchestrator()
@@ -259,6 +270,7 @@ async def api_status(username: str = Depends(authenticate)):
             "Fact verification",
             "SEO optimization"
         ],
+        "agents": agent_registry.names(),
         "timestamp": datetime.now().isoformat()
     }
 
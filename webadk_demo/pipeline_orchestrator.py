@@ -99,13 +99,13 @@ class DemoPipelineOrchestrator:
             # Stage 1: Outline Generation
             await self._update_stage(1, "Generating content outline...")
             outline_prompt = f"Create a comprehensive outline for an article about '{topic}' targeting {audience}. Target length: {length} words."
-            outline_result = await self.pipeline_orchestrator.run_agent_in_session('outline_generator', outline_prompt)
+            outline_result = await self._run_stage_agent('outline_generator', outline_prompt)
             logger.info(f"Outline result type: {type(outline_result)}, length: {len(str(outline_result))}")
             self.results['stages']['outline'] = outline_result
             
             # Stage 2: Research Collection
             await self._update_stage(2, "Conducting real-time research...")
-            research_result = await self.pipeline_orchestrator.run_agent_in_session('research_agent', 
+            research_result = await self._run_stage_agent('research_agent', 
                 f"Conduct comprehensive research for the article outline about '{topic}'. Focus on current statistics, expert insights, and reliable sources.")
             logger.info(f"Research result type: {type(research_result)}, length: {len(str(research_result))}")
             self.results['stages']['research'] = research_result
@@ -113,41 +113,41 @@ class DemoPipelineOrchestrator:
             # Stage 3: Content Creation
             await self._update_stage(3, "Writing comprehensive article...")
             content_prompt = f"Write a detailed article based on the outline and research data. Target audience: {audience}. Target length: {length} words. Integrate the research findings naturally."
-            content_result = await self.pipeline_orchestrator.run_agent_in_session('research_content_creator', content_prompt)
+            content_result = await self._run_stage_agent('research_content_creator', content_prompt)
             logger.info(f"Content result type: {type(content_result)}, length: {len(str(content_result))}")
             self.results['stages']['content'] = content_result
             
             # Stage 4: Citation Processing
             await self._update_stage(4, "Adding professional citations...")
             citation_prompt = "Add proper academic citations to the article content using the research data. Use APA style with inline citations and create a comprehensive bibliography."
-            citation_result = await self.pipeline_orchestrator.run_agent_in_session('citation_agent', citation_prompt)
+            citation_result = await self._run_stage_agent('citation_agent', citation_prompt)
             logger.info(f"Citation result type: {type(citation_result)}, length: {len(str(citation_result))}")
             self.results['stages']['citations'] = citation_result
             
             # Stage 5: Image Generation
             await self._update_stage(5, "Generating contextual images...")
             image_prompt = f"Generate contextual images for the article about '{topic}'. Create 3-5 professional images including a hero image and section illustrations."
-            image_result = await self.pipeline_orchestrator.run_agent_in_session('image_agent', image_prompt)
+            image_result = await self._run_stage_agent('image_agent', image_prompt)
             logger.info(f"Image result type: {type(image_result)}, length: {len(str(image_result))}")
             self.results['stages']['images'] = image_result
             
             # Stage 6: Fact Checking
             await self._update_stage(6, "Verifying facts and claims...")
             fact_check_prompt = "Perform comprehensive fact-checking on the article content. Verify statistics, claims, and provide confidence scores."
-            fact_check_result = await self.pipeline_orchestrator.run_agent_in_session('fact_check_agent', fact_check_prompt)
+            fact_check_result = await self._run_stage_agent('fact_check_agent', fact_check_prompt)
             logger.info(f"Fact-check result type: {type(fact_check_result)}, length: {len(str(fact_check_result))}")
             self.results['stages']['fact_check'] = fact_check_result
             
             # Stage 7: SEO Optimization
             await self._update_stage(7, "Optimizing for search engines...")
             seo_prompt = f"Analyze the article for SEO optimization. Generate meta descriptions, keywords, and optimization recommendations for '{topic}'."
-            seo_result = await self.pipeline_orchestrator.run_agent_in_session('seo_optimizer', seo_prompt)
+            seo_result = await self._run_stage_agent('seo_optimizer', seo_prompt)
             self.results['stages']['seo'] = seo_result
             
             # Stage 8: Publishing Preparation
             await self._update_stage(8, "Preparing final publication package...")
             publish_prompt = "Create a complete publication-ready package with WordPress formatting, meta tags, and social media snippets."
-            publish_result = await self.pipeline_orchestrator.run_agent_in_session('publishing_coordinator', publish_prompt)
+            publish_result = await self._run_stage_agent('publishing_coordinator', publish_prompt)
             self.results['stages']['publish'] = publish_result
             
             # Finalize results
@@ -160,6 +160,23 @@ class DemoPipelineOrchestrator:
             self.results['errors'].append(error_msg)
             return self.results
     
+    async def _run_stage_agent(self, agent_name: str, prompt: str) -> str:
+        """Run one stage's agent, passing text deltas to _on_text_delta as they stream"""
+        response_parts = []
+        try:
+            async for delta in self.pipeline_orchestrator.stream_agent_in_session(agent_name, prompt):
+                response_parts.append(delta)
+                await self._on_text_delta(agent_name, delta)
+        except Exception as e:
+            # Same contract as run_agent_in_session: failures come back as text
+            logger.error(f"Error running {agent_name}: {e}")
+            return f"Error running {agent_name}: {e}"
+        return "".join(response_parts)
+    
+    async def _on_text_delta(self, agent_name: str, delta: str):
+        """Hook for live agent output; the base orchestrator only keeps the final text"""
+        pass
+    
     async def _update_stage(self, stage_num: int, status_message: str):
         """Update the current stage and status"""
         self.current_stage = stage_num